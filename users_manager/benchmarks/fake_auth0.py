@@ -0,0 +1,431 @@
+import asyncio
+import gzip
+import itertools
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+class FakeAuth0Config:
+
+    def __init__(
+        self,
+        latency_ms: float = 20.0,
+        latency_jitter_ms: float = 5.0,
+        error_rate: float = 0.0,
+        rate_limit_per_second: float = None,
+        rate_limit_burst: int = 50,
+        users: int = 500,
+        organizations: int = 20,
+        members_per_organization: int = 25,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_per_second = rate_limit_per_second
+        self.rate_limit_burst = rate_limit_burst
+        self.users = users
+        self.organizations = organizations
+        self.members_per_organization = members_per_organization
+
+
+class FakeAuth0:
+    """In-memory stand-in for the parts of the Auth0 APIs this service uses.
+
+    Every response is delayed by ``latency_ms`` (+/- jitter). ``error_rate``
+    of the calls fail with 503 and, when ``rate_limit_per_second`` is set, a
+    token bucket answers 429 with ``Retry-After`` and ``X-RateLimit-*``
+    headers the way the real Management API does. Like upstream, page-based
+    user listing stops at the first 1000 users; users-export jobs complete
+    at once and their file is served from ``/exports/``.
+    """
+
+    USERS_PAGE_LIMIT = 1000
+
+    def __init__(self, config: FakeAuth0Config = None):
+        self.config = config or FakeAuth0Config()
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._ids = itertools.count(1)
+        self._tokens = float(self.config.rate_limit_burst)
+        self._tokens_updated_at = time.monotonic()
+
+        self.export_jobs = {}
+        self.users = {}
+        for number in range(self.config.users):
+            self.add_user(f"user{number}@example.com", f"User {number}")
+
+        self.organizations = {}
+        user_ids = list(self.users)
+        for number in range(self.config.organizations):
+            organization = self.add_organization(f"salon-{number}", f"Salon {number}")
+            organization["members"] = set(
+                user_ids[: self.config.members_per_organization]
+            )
+
+    def add_user(self, email: str, name: str, family_name: str = ""):
+        identity_id = f"{next(self._ids):024x}"
+        user = {
+            "user_id": f"auth0|{identity_id}",
+            "email": email,
+            "name": name,
+            "family_name": family_name,
+            "identities": [{"user_id": identity_id, "provider": "auth0"}],
+            "updated_at": "2024-01-01T00:00:00.000Z",
+        }
+        self.users[user["user_id"]] = user
+        return user
+
+    def add_organization(self, name: str, display_name: str):
+        organization = {
+            "id": f"org_{next(self._ids):016x}",
+            "name": name,
+            "display_name": display_name,
+            "invitations": [],
+            "roles": {},
+        }
+        self.organizations[organization["id"]] = organization
+        return organization
+
+    def add_export_job(self, fields: list):
+        job_id = f"job_{next(self._ids)}"
+        self.export_jobs[job_id] = fields
+        return job_id
+
+    @staticmethod
+    def _public(organization):
+        return {key: organization[key] for key in ("id", "name", "display_name")}
+
+    def _rate_limit_headers(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.config.rate_limit_burst,
+            self._tokens
+            + (now - self._tokens_updated_at) * self.config.rate_limit_per_second,
+        )
+        self._tokens_updated_at = now
+        missing = self.config.rate_limit_burst - self._tokens
+        return {
+            "X-RateLimit-Limit": str(self.config.rate_limit_burst),
+            "X-RateLimit-Remaining": str(int(self._tokens)),
+            "X-RateLimit-Reset": str(
+                int(time.time() + missing / self.config.rate_limit_per_second)
+            ),
+        }
+
+    @web.middleware
+    async def simulate_network(self, request, handler):
+        self.request_count += 1
+
+        delay = self.config.latency_ms + random.uniform(
+            -self.config.latency_jitter_ms, self.config.latency_jitter_ms
+        )
+        await asyncio.sleep(max(delay, 0) / 1000)
+
+        headers = {}
+        if self.config.rate_limit_per_second:
+            headers = self._rate_limit_headers()
+            if self._tokens < 1:
+                self.rate_limited_count += 1
+                return web.json_response(
+                    {"statusCode": 429, "error": "Too Many Requests"},
+                    status=429,
+                    headers={**headers, "Retry-After": "1"},
+                )
+            self._tokens -= 1
+
+        if random.random() < self.config.error_rate:
+            return web.json_response(
+                {"statusCode": 503, "error": "Service Unavailable"}, status=503
+            )
+
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    def _organization(self, request):
+        organization = self.organizations.get(request.match_info["organization_id"])
+        if organization is None:
+            raise web.HTTPNotFound()
+        return organization
+
+    async def issue_token(self, request):
+        return web.json_response({"access_token": "fake-token", "expires_in": 86400})
+
+    async def list_users(self, request):
+        users = list(self.users.values())
+        if "page" not in request.query:
+            return web.json_response(users[:50])
+
+        page = int(request.query["page"])
+        per_page = int(request.query.get("per_page", 50))
+        if (page + 1) * per_page > self.USERS_PAGE_LIMIT:
+            return web.json_response(
+                {
+                    "statusCode": 400,
+                    "error": "Bad Request",
+                    "message": "You can only page through the first 1000 records.",
+                },
+                status=400,
+            )
+        page_users = users[page * per_page : (page + 1) * per_page]
+        if request.query.get("include_totals") != "true":
+            return web.json_response(page_users)
+        return web.json_response(
+            {
+                "start": page * per_page,
+                "limit": per_page,
+                "length": len(page_users),
+                "total": len(users),
+                "users": page_users,
+            }
+        )
+
+    async def create_user(self, request):
+        payload = await request.json()
+        user = self.add_user(
+            payload["email"], payload.get("name", ""), payload.get("family_name", "")
+        )
+        return web.json_response(user, status=201)
+
+    async def users_by_email(self, request):
+        email = request.query.get("email", "")
+        return web.json_response(
+            [user for user in self.users.values() if user["email"] == email]
+        )
+
+    async def modify_user(self, request):
+        user = self.users.get(request.match_info["user_id"])
+        if user is None:
+            raise web.HTTPNotFound()
+        user.update(await request.json())
+        return web.json_response(user)
+
+    async def delete_user(self, request):
+        self.users.pop(request.match_info["user_id"], None)
+        return web.Response(status=204)
+
+    async def change_password(self, request):
+        return web.Response(text="We've just sent you an email to reset your password.")
+
+    async def users_import(self, request):
+        await request.read()
+        return web.json_response(
+            {
+                "id": f"job_{next(self._ids)}",
+                "type": "users_import",
+                "status": "pending",
+            },
+            status=202,
+        )
+
+    async def users_export(self, request):
+        payload = await request.json()
+        job = {
+            "id": self.add_export_job([field["name"] for field in payload["fields"]]),
+            "type": "users_export",
+            "status": "pending",
+            "format": payload.get("format", "csv"),
+        }
+        return web.json_response(job, status=201)
+
+    async def get_job(self, request):
+        job_id = request.match_info["job_id"]
+        job = {"id": job_id, "status": "completed"}
+        if job_id in self.export_jobs:
+            job["location"] = f"{request.url.origin()}/exports/{job_id}.json.gz"
+        return web.json_response(job)
+
+    async def get_job_errors(self, request):
+        return web.Response(status=204)
+
+    @staticmethod
+    def _exported_field(user: dict, name: str):
+        if name.startswith("identities[0]."):
+            return user["identities"][0].get(name.removeprefix("identities[0]."))
+        return user.get(name)
+
+    async def download_export(self, request):
+        fields = self.export_jobs.get(request.match_info["job_id"])
+        if fields is None:
+            raise web.HTTPNotFound()
+        lines = (
+            json.dumps({name: self._exported_field(user, name) for name in fields})
+            for user in self.users.values()
+        )
+        return web.Response(
+            body=gzip.compress("\n".join(lines).encode()),
+            content_type="application/gzip",
+        )
+
+    async def list_organizations(self, request):
+        organizations = [self._public(o) for o in self.organizations.values()]
+        if "page" not in request.query:
+            return web.json_response(organizations)
+
+        page = int(request.query["page"])
+        per_page = int(request.query.get("per_page", 50))
+        return web.json_response(
+            {
+                "organizations": organizations[page * per_page : (page + 1) * per_page],
+                "total": len(organizations),
+            }
+        )
+
+    async def create_organization(self, request):
+        payload = await request.json()
+        organization = self.add_organization(
+            payload["name"], payload.get("display_name", "")
+        )
+        organization["members"] = set()
+        return web.json_response(self._public(organization), status=201)
+
+    async def get_organization_by_name(self, request):
+        for organization in self.organizations.values():
+            if organization["name"] == request.match_info["name"]:
+                return web.json_response(self._public(organization))
+        raise web.HTTPNotFound()
+
+    async def modify_organization(self, request):
+        organization = self._organization(request)
+        payload = await request.json()
+        organization.update(
+            {key: payload[key] for key in ("name", "display_name") if key in payload}
+        )
+        return web.json_response(self._public(organization))
+
+    async def delete_organization(self, request):
+        self.organizations.pop(request.match_info["organization_id"], None)
+        return web.Response(status=204)
+
+    async def list_members(self, request):
+        organization = self._organization(request)
+        member_ids = sorted(organization["members"])
+        take = int(request.query.get("take", 50))
+        start = int(request.query.get("from") or 0)
+        members = [
+            {
+                "user_id": user_id,
+                "email": self.users[user_id]["email"],
+                "name": self.users[user_id]["name"],
+            }
+            for user_id in member_ids[start : start + take]
+            if user_id in self.users
+        ]
+        has_more = start + take < len(member_ids)
+        return web.json_response(
+            {"members": members, "next": str(start + take) if has_more else None}
+        )
+
+    async def remove_members(self, request):
+        organization = self._organization(request)
+        payload = await request.json()
+        organization["members"].difference_update(payload.get("members", []))
+        return web.Response(status=204)
+
+    async def member_roles(self, request):
+        organization = self._organization(request)
+        roles = organization["roles"].setdefault(request.match_info["user_id"], set())
+
+        if request.method == "GET":
+            return web.json_response(
+                [{"id": role, "name": role} for role in sorted(roles)]
+            )
+
+        payload = await request.json()
+        if request.method == "POST":
+            roles.update(payload.get("roles", []))
+        else:
+            roles.difference_update(payload.get("roles", []))
+        return web.Response(status=204)
+
+    async def list_invitations(self, request):
+        organization = self._organization(request)
+        return web.json_response(
+            {
+                "invitations": organization["invitations"],
+                "total": len(organization["invitations"]),
+            }
+        )
+
+    async def create_invitation(self, request):
+        organization = self._organization(request)
+        payload = await request.json()
+        invitation = {
+            "id": f"uinv_{next(self._ids)}",
+            "invitee": payload["invitee"],
+        }
+        organization["invitations"].append(invitation)
+        return web.json_response(invitation, status=201)
+
+    async def modify_client(self, request):
+        return web.json_response(
+            {"client_id": request.match_info["client_id"], **(await request.json())}
+        )
+
+    def build_app(self):
+        app = web.Application(middlewares=[self.simulate_network])
+        organization = "/api/v2/organizations/{organization_id}"
+        app.router.add_routes(
+            [
+                web.post("/oauth/token", self.issue_token),
+                web.post("/dbconnections/change_password", self.change_password),
+                web.get("/api/v2/users", self.list_users),
+                web.post("/api/v2/users", self.create_user),
+                web.get("/api/v2/users-by-email", self.users_by_email),
+                web.patch("/api/v2/users/{user_id}", self.modify_user),
+                web.delete("/api/v2/users/{user_id}", self.delete_user),
+                web.post("/api/v2/jobs/users-imports", self.users_import),
+                web.post("/api/v2/jobs/users-exports", self.users_export),
+                web.get("/exports/{job_id}.json.gz", self.download_export),
+                web.get("/api/v2/jobs/{job_id}", self.get_job),
+                web.get("/api/v2/jobs/{job_id}/errors", self.get_job_errors),
+                web.patch("/api/v2/clients/{client_id}", self.modify_client),
+                web.get("/api/v2/organizations", self.list_organizations),
+                web.post("/api/v2/organizations", self.create_organization),
+                web.get(
+                    "/api/v2/organizations/name/{name}", self.get_organization_by_name
+                ),
+                web.patch(organization, self.modify_organization),
+                web.delete(organization, self.delete_organization),
+                web.get(f"{organization}/members", self.list_members),
+                web.delete(f"{organization}/members", self.remove_members),
+                web.route(
+                    "*", f"{organization}/members/{{user_id}}/roles", self.member_roles
+                ),
+                web.get(f"{organization}/invitations", self.list_invitations),
+                web.post(f"{organization}/invitations", self.create_invitation),
+            ]
+        )
+        return app
+
+
+async def serve(fake: FakeAuth0, host: str = "127.0.0.1", port: int = 0):
+    """Start the fake API and return ``(runner, base_url)``."""
+    runner = web.AppRunner(fake.build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake Auth0 Management API.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    arguments = parser.parse_args()
+
+    config = FakeAuth0Config(
+        latency_ms=arguments.latency_ms,
+        error_rate=arguments.error_rate,
+        rate_limit_per_second=arguments.rate_limit,
+    )
+    print(json.dumps({"port": arguments.port}))
+    web.run_app(FakeAuth0(config).build_app(), port=arguments.port)
@@ -0,0 +1,368 @@
+"""Benchmark every router against a local fake of the Auth0 APIs.
+
+Run from the ``users_manager`` directory::
+
+    python -m benchmarks.run --concurrency 1 10 50 --requests 200 --output run.json
+
+The app is driven in-process through ``httpx.ASGITransport``; upstream calls
+go over real HTTP to ``benchmarks.fake_auth0``. Results (req/s and latency
+percentiles per scenario and concurrency level) are printed as JSON so runs
+on different commits can be diffed.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import subprocess
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.fake_auth0 import FakeAuth0, FakeAuth0Config, serve
+from employees.services.auth0_client import auth0_client_obj
+from employees.services.background import email_queue_obj
+from employees.services.metrics import registered_caches
+from employees.services.rate_limiter import RateLimitScheduler
+from employees.services.resilience import CircuitBreakerRegistry
+from main import app
+from settings import settings
+
+
+def build_scenarios(fake: FakeAuth0):
+    organization_ids = list(fake.organizations)
+    organization_names = [o["name"] for o in fake.organizations.values()]
+    user_ids = list(fake.users)
+    emails = [user["email"] for user in fake.users.values()]
+
+    def pick(items, number):
+        return items[number % len(items)]
+
+    def seeded_user(number):
+        # Users to delete are added to the fake directly, so the scenario
+        # measures a delete that succeeds rather than a lookup that 404s.
+        return fake.add_user(f"gone-{number}@example.com", "Gone")["email"]
+
+    def seeded_organization(number):
+        return fake.add_organization(f"doomed-{number}", "Doomed")["id"]
+
+    export_job_id = fake.add_export_job(["user_id", "email"])
+
+    def new_user(number):
+        return {
+            "email": f"bench-{time.monotonic_ns()}-{number}@example.com",
+            "name": "Bench",
+            "family_name": "User",
+            "username": f"bench{number}",
+        }
+
+    return {
+        "create_user": lambda n: ("POST", "/user", {"json": new_user(n)}),
+        "list_users": lambda n: ("GET", "/users", {}),
+        "list_users_page": lambda n: (
+            "GET",
+            "/users",
+            {"params": {"page": n % 5, "per_page": 50}},
+        ),
+        "list_all_users": lambda n: (
+            "GET",
+            "/users",
+            {"params": {"fetch_all": "true", "per_page": 100}},
+        ),
+        "get_user_id": lambda n: ("GET", f"/user/id/{pick(emails, n)}", {}),
+        "password_reset": lambda n: (
+            "POST",
+            "/user/password-reset/request",
+            {"json": {"user_email": pick(emails, n)}},
+        ),
+        "delete_user": lambda n: (
+            "DELETE",
+            "/user",
+            {"json": {"email": seeded_user(n)}},
+        ),
+        "modify_user": lambda n: (
+            "PUT",
+            "/user",
+            {"json": {"user_id": pick(user_ids, n).split("|")[1], "nickname": f"n{n}"}},
+        ),
+        "invite_user": lambda n: (
+            "POST",
+            "/user/organization/invitation",
+            {
+                "json": {
+                    "email": f"invitee-{n}@example.com",
+                    "organization_id": pick(organization_ids, n),
+                }
+            },
+        ),
+        "invite_users_batch": lambda n: (
+            "POST",
+            "/user/organization/invitations",
+            {
+                "json": {
+                    "organization_id": pick(organization_ids, n),
+                    "emails": [f"batch-{n}-{i}@example.com" for i in range(10)],
+                }
+            },
+        ),
+        "modify_roles_batch": lambda n: (
+            "POST",
+            "/user/roles/batch",
+            {
+                "json": {
+                    "user_ids": [pick(user_ids, n * 10 + i) for i in range(10)],
+                    "organization_id": pick(organization_ids, n),
+                    "roles": ["manager"],
+                    "operation": "add",
+                }
+            },
+        ),
+        "add_roles": lambda n: (
+            "POST",
+            "/user/roles",
+            {
+                "json": {
+                    "user_id": pick(user_ids, n),
+                    "organization": pick(organization_ids, n),
+                    "roles": ["manager"],
+                }
+            },
+        ),
+        "create_users_bulk": lambda n: (
+            "POST",
+            "/users/bulk",
+            {
+                "content": "\n".join(
+                    json.dumps(new_user(n * 10 + i)) for i in range(10)
+                ),
+                "headers": {"Content-Type": "application/x-ndjson"},
+            },
+        ),
+        "import_job_status": lambda n: (
+            "GET",
+            f"/users/bulk/jobs/job_import_{n}",
+            {},
+        ),
+        "export_job_status": lambda n: ("GET", f"/users/bulk/jobs/{export_job_id}", {}),
+        "get_organization": lambda n: (
+            "GET",
+            "/organization",
+            {"json": {"name": pick(organization_names, n)}},
+        ),
+        "list_organizations": lambda n: (
+            "GET",
+            "/organizations",
+            {"json": {"tenant_domain": settings.tenant_domain}},
+        ),
+        "create_organization": lambda n: (
+            "POST",
+            "/organization",
+            {"json": {"name": f"bench-{time.monotonic_ns()}", "display_name": "Bench"}},
+        ),
+        "modify_organization": lambda n: (
+            "PUT",
+            "/organization",
+            {
+                "json": {
+                    "identifier": pick(organization_ids, n),
+                    "display_name": f"S{n}",
+                }
+            },
+        ),
+        "delete_organization": lambda n: (
+            "DELETE",
+            "/organization",
+            {"json": {"identifier": seeded_organization(n)}},
+        ),
+        "list_organization_members": lambda n: (
+            "GET",
+            f"/organization/{pick(organization_ids, n)}/members",
+            {"params": {"limit": 25}},
+        ),
+        "list_organization_members_with_roles": lambda n: (
+            "GET",
+            f"/organization/{pick(organization_ids, n)}/members",
+            {"params": {"limit": 25, "expand": "roles"}},
+        ),
+        "remove_user_from_organization": lambda n: (
+            "DELETE",
+            "/organization/user",
+            {
+                "json": {
+                    "user_id": pick(user_ids, n),
+                    "organization_id": pick(organization_ids, n),
+                }
+            },
+        ),
+        "metrics": lambda n: ("GET", "/metrics", {}),
+    }
+
+
+def percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return None
+    index = min(
+        len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def reset_service_state(keep_caches: bool):
+    auth0_client_obj.circuit_breakers = CircuitBreakerRegistry(
+        failure_threshold=settings.circuit_breaker_failure_threshold,
+        reset_timeout=settings.circuit_breaker_reset_timeout,
+    )
+    if not keep_caches:
+        for cache in registered_caches.values():
+            cache.clear()
+
+
+async def run_level(
+    client, request_factory, concurrency: int, requests: int, first_number: int = 0
+):
+    latencies, statuses = [], {}
+    numbers = itertools.count(first_number)
+
+    async def worker():
+        while (number := next(numbers)) < first_number + requests:
+            method, path, options = request_factory(number)
+            started_at = time.perf_counter()
+            response = await client.request(method, path, **options)
+            await response.aread()
+            latencies.append(time.perf_counter() - started_at)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "requests_per_second": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(
+    config: FakeAuth0Config,
+    concurrency_levels=(1, 10, 50),
+    requests: int = 200,
+    scenarios=None,
+    client_rate_limit: float = 1_000_000,
+    keep_caches: bool = False,
+):
+    fake = FakeAuth0(config)
+    runner, base_url = await serve(fake)
+
+    original_base_url = settings.auth0_base_url_template
+    original_rate_limiter = auth0_client_obj.rate_limiter
+    settings.auth0_base_url_template = base_url
+    auth0_client_obj.rate_limiter = RateLimitScheduler(
+        rate=client_rate_limit, burst=max(1, int(client_rate_limit))
+    )
+
+    all_scenarios = build_scenarios(fake)
+    selected = scenarios or list(all_scenarios)
+    results = []
+
+    try:
+        transport = ASGITransport(app=app, raise_app_exceptions=False)
+        async with AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=None
+        ) as client:
+            for name in selected:
+                for level, concurrency in enumerate(concurrency_levels):
+                    reset_service_state(keep_caches)
+                    upstream_calls_before = fake.request_count
+                    # Each level numbers its requests on from the previous
+                    # one, so writes keyed on the number (invitations, new
+                    # users) are new work rather than repeats of it.
+                    result = await run_level(
+                        client,
+                        all_scenarios[name],
+                        concurrency,
+                        requests,
+                        first_number=level * requests,
+                    )
+                    # Emails queued by this level are part of its upstream
+                    # work, not of whichever level runs next.
+                    await email_queue_obj.join()
+                    result["upstream_calls"] = (
+                        fake.request_count - upstream_calls_before
+                    )
+                    results.append({"scenario": name, **result})
+    finally:
+        settings.auth0_base_url_template = original_base_url
+        auth0_client_obj.rate_limiter = original_rate_limiter
+        await email_queue_obj.close()
+        await auth0_client_obj.close()
+        await runner.cleanup()
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "fake_auth0": vars(config),
+        "requests_per_level": requests,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--scenario", action="append", dest="scenarios")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-rate-limit", type=float, default=None)
+    parser.add_argument("--client-rate-limit", type=float, default=1_000_000)
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--output")
+    arguments = parser.parse_args()
+
+    config = FakeAuth0Config(
+        latency_ms=arguments.latency_ms,
+        latency_jitter_ms=arguments.latency_jitter_ms,
+        error_rate=arguments.error_rate,
+        rate_limit_per_second=arguments.upstream_rate_limit,
+    )
+    report = asyncio.run(
+        run_benchmark(
+            config,
+            concurrency_levels=arguments.concurrency,
+            requests=arguments.requests,
+            scenarios=arguments.scenarios,
+            client_rate_limit=arguments.client_rate_limit,
+            keep_caches=arguments.keep_caches,
+        )
+    )
+
+    output = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
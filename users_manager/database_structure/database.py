@@ -1,9 +1,9 @@
 from database_structure.models import Base
 from settings import settings
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-
 ASYNC_DATABASE_URL = f"postgresql+asyncpg://{settings.postgres_user}:{settings.postgres_password}@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_name}"
 
 async_engine = create_async_engine(ASYNC_DATABASE_URL)
@@ -18,6 +18,24 @@ async def get_db():
         yield session
 
 
+# Key of the Postgres advisory lock that serializes schema changes, so
+# workers starting together do not race on CREATE TABLE.
+SCHEMA_LOCK_KEY = 7_402_114
+
+
+async def lock_schema(conn):
+    """Hold the schema lock until the current transaction ends."""
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY}
+    )
+
+
 async def init_db():
+    """Create the tables that do not exist yet.
+
+    Existing tables are left as they are; ``python -m database_structure.migrate``
+    brings them up to date with the models.
+    """
     async with async_engine.begin() as conn:
+        await lock_schema(conn)
         await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,87 @@
+"""Bring an existing database up to date with the models.
+
+Run once per deploy, before starting the service::
+
+    python -m database_structure.migrate
+
+``init_db`` only creates missing tables; ``create_all`` never alters a table
+that already exists. This adds the columns, indexes and foreign-key actions
+declared since a table was created and drops indexes that were replaced.
+Every step checks the current schema first, so running it again is a no-op.
+"""
+
+import asyncio
+
+from database_structure.database import async_engine, lock_schema
+from database_structure.models import Base
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import AddConstraint
+
+# Indexes replaced by a differently defined one under a new name.
+DROPPED_INDEXES = ("ix_employee_organization_name",)
+
+
+def _add_missing_columns(connection):
+    # create_all never alters an existing table; this adds the columns
+    # declared since it was created, unique ones with their unique index.
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+            )
+            if column.unique:
+                connection.execute(
+                    text(
+                        f"CREATE UNIQUE INDEX {table.name}_{column.name}_key "
+                        f"ON {table.name} ({column.name})"
+                    )
+                )
+
+
+def _update_foreign_key_actions(connection):
+    # Recreates a foreign key whose ON DELETE differs from the model's.
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        reflected = {
+            tuple(foreign_key["constrained_columns"]): foreign_key
+            for foreign_key in inspector.get_foreign_keys(table.name)
+        }
+        for constraint in table.foreign_key_constraints:
+            foreign_key = reflected.get(tuple(constraint.column_keys))
+            if foreign_key is None or (
+                foreign_key["options"].get("ondelete") == constraint.ondelete
+            ):
+                continue
+            connection.execute(
+                text(f"ALTER TABLE {table.name} DROP CONSTRAINT {foreign_key['name']}")
+            )
+            connection.execute(AddConstraint(constraint))
+
+
+def _create_missing_indexes(connection):
+    # create_all only creates indexes together with their table; this adds
+    # the ones declared since the table was created.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+async def migrate():
+    async with async_engine.begin() as conn:
+        await lock_schema(conn)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_update_foreign_key_actions)
+        for name in DROPPED_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        await conn.run_sync(_create_missing_indexes)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -1,5 +1,16 @@
-from sqlalchemy import Column, Integer, String, DATE, ForeignKey
-from sqlalchemy.orm import relationship, backref, validates, DeclarativeBase
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DATE,
+    DateTime,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, validates, DeclarativeBase
 
 
 class Base(DeclarativeBase):
@@ -24,7 +35,11 @@ class Organization(Base):
 
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     name = Column("name", String, nullable=False)
-    employees = relationship("Employee", backref("organization"))
+    auth0_id = Column("auth0_id", String, unique=True)
+    display_name = Column("display_name", String)
+    profile = Column("profile", JSONB)
+    synced_at = Column("synced_at", DateTime(timezone=True))
+    employees = relationship("Employee", backref="organization")
 
 
 class Employee(Base):
@@ -37,7 +52,13 @@ class Employee(Base):
     birthdate = Column("birthdate", DATE)
     role = Column("role", String, default=VALID_ROLE[0])
     employment_status = Column("employment_status", String)
-    organization_id = Column(Integer, ForeignKey("organization.id"))
+    organization_id = Column(
+        Integer, ForeignKey("organization.id", ondelete="SET NULL")
+    )
+    user_id = Column("user_id", String, unique=True)
+    email = Column("email", String, index=True)
+    profile = Column("profile", JSONB)
+    synced_at = Column("synced_at", DateTime(timezone=True))
 
     @validates("role")
     def validate_role(self, key, role):
@@ -52,3 +73,72 @@ class Employee(Base):
                 f"Invalid employment_status {employment_status}. Must be one of {VALID_EMPLOYMENT_STATUS}"
             )
         return employment_status
+
+
+# Name prefix searches compare in the "C" collation, byte order, so the index
+# below serves both ``LIKE 'prefix%'`` and the order of the keyset.
+employee_lower_name = func.lower(Employee.name).collate("C")
+
+# Composite indexes backing the filters of GET /employees when they include
+# organization_id. Each ends with the column the keyset orders by, then the
+# primary key: ``id`` alone for the role and status filters, ``(lower(name),
+# id)`` for a name prefix and ``(birthdate, id)`` for a birthdate range. So a
+# page is a range scan of one index, without a sort.
+Index("ix_employee_organization_id", Employee.organization_id, Employee.id)
+Index(
+    "ix_employee_organization_role_status",
+    Employee.organization_id,
+    Employee.role,
+    Employee.employment_status,
+    Employee.id,
+)
+Index(
+    "ix_employee_organization_lower_name",
+    Employee.organization_id,
+    employee_lower_name,
+    Employee.id,
+)
+Index(
+    "ix_employee_organization_birthdate",
+    Employee.organization_id,
+    Employee.birthdate,
+    Employee.id,
+)
+
+
+class OrganizationMember(Base):
+
+    __tablename__ = "organization_member"
+
+    organization_id = Column(
+        Integer, ForeignKey("organization.id", ondelete="CASCADE"), primary_key=True
+    )
+    employee_id = Column(
+        Integer, ForeignKey("employee.id", ondelete="CASCADE"), primary_key=True
+    )
+
+
+class MirrorSyncState(Base):
+
+    __tablename__ = "mirror_sync_state"
+
+    resource = Column("resource", String, primary_key=True)
+    synced_at = Column("synced_at", DateTime(timezone=True), nullable=False)
+    full_synced_at = Column("full_synced_at", DateTime(timezone=True))
+
+
+class IdempotencyKey(Base):
+
+    __tablename__ = "idempotency_keys"
+
+    tenant = Column("tenant", String, primary_key=True)
+    key = Column("key", String, primary_key=True)
+    fingerprint = Column("fingerprint", String, nullable=False)
+    status = Column("status", String, nullable=False)
+    response_status = Column("response_status", Integer)
+    response_headers = Column("response_headers", JSONB)
+    response_body = Column("response_body", LargeBinary)
+    locked_until = Column("locked_until", DateTime(timezone=True), nullable=False)
+    expires_at = Column(
+        "expires_at", DateTime(timezone=True), nullable=False, index=True
+    )
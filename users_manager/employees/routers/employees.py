@@ -0,0 +1,43 @@
+from datetime import date
+from typing import Optional
+
+from database_structure.database import get_db
+from employees.services.employees import employee_manager_obj
+from employees.services.ingestion import ingest_employees, iter_rows
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter()
+
+
+@router.get("/employees", status_code=200)
+async def search_employees(
+    organization_id: Optional[int] = None,
+    role: Optional[str] = None,
+    employment_status: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    born_after: Optional[date] = None,
+    born_before: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    session: AsyncSession = Depends(get_db),
+):
+    return await employee_manager_obj.search_employees(
+        session,
+        organization_id=organization_id,
+        role=role,
+        employment_status=employment_status,
+        name_prefix=name_prefix,
+        born_after=born_after,
+        born_before=born_before,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+@router.post("/employees/bulk", status_code=201)
+async def ingest_employees_in_bulk(request: Request):
+    media_type = request.headers.get("content-type") or "text/csv"
+    media_type = media_type.split(";")[0].strip().lower()
+
+    return await ingest_employees(iter_rows(request.stream(), media_type))
@@ -0,0 +1,12 @@
+from employees.services.metrics import metrics_registry
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter()
+
+
+@router.get("/metrics", status_code=200, response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics_registry.expose(), media_type="text/plain; version=0.0.4"
+    )
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from employees.schemas import (
     CreateOrganization,
     OrganizationName,
@@ -6,31 +8,60 @@ from employees.schemas import (
     ListOrganizations,
     RemoveUserFromOrganization,
 )
+from employees.routers.responses import conditional_json_response, json_response
+from employees.services.idempotency import idempotency_manager_obj
 from employees.services.organization import organization_manager_obj
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 
 router = APIRouter()
 
 
 @router.get("/organization", status_code=200)
-async def get_organization(organization_request: OrganizationName):
-    return await organization_manager_obj.get_organization_by_name(
+async def get_organization(organization_request: OrganizationName, request: Request):
+    body = await organization_manager_obj.get_organization_by_name(
         organization_request.name
     )
+    return conditional_json_response(request, body)
 
 
 @router.get("/organizations", status_code=200)
-async def list_organizations(organization_request: ListOrganizations):
-    return await organization_manager_obj.get_organizations_list(
+async def list_organizations(organization_request: ListOrganizations, request: Request):
+    body = await organization_manager_obj.get_organizations_list(
         organization_request.tenant_domain
     )
+    return conditional_json_response(request, body)
 
 
-@router.post("/organization", status_code=201)
-async def create_new_organization(organization_request: CreateOrganization):
-    return await organization_manager_obj.create_organization(
-        organization_request.name, organization_request.display_name
+@router.get("/organizations/cache", status_code=200)
+async def get_organization_cache_stats():
+    return organization_manager_obj.cache.stats()
+
+
+@router.get("/organization/{organization_id}/members", status_code=200)
+async def list_organization_members(
+    organization_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=100),
+    expand: Optional[Literal["roles"]] = None,
+):
+    body = await organization_manager_obj.list_members(
+        organization_id, cursor=cursor, limit=limit, expand_roles=expand == "roles"
     )
+    return conditional_json_response(request, body)
+
+
+@router.post("/organization", status_code=201)
+async def create_new_organization(
+    organization_request: CreateOrganization, request: Request
+):
+    async def handle():
+        body = await organization_manager_obj.create_organization(
+            organization_request.name, organization_request.display_name
+        )
+        return json_response(body, status_code=201)
+
+    return await idempotency_manager_obj.execute(request, handle)
 
 
 @router.delete("/organization", status_code=204)
@@ -42,7 +73,7 @@ async def delete_organization(organization_request: OrganizationIdentifier):
 
 @router.put("/organization", status_code=200)
 async def modify_organization_router(organization_request: ModifyOrganization):
-    return await organization_manager_obj.modify_organization(
+    body = await organization_manager_obj.modify_organization(
         identifier=organization_request.identifier,
         name=organization_request.name,
         display_name=organization_request.display_name,
@@ -50,10 +81,12 @@ async def modify_organization_router(organization_request: ModifyOrganization):
         primary_color=organization_request.primary_color,
         background_color=organization_request.background_color,
     )
+    return json_response(body)
 
 
 @router.delete("/organization/user", status_code=201)
 async def remove_user_from_organization(user_request: RemoveUserFromOrganization):
-    return await organization_manager_obj.remove_user_from_organization(
+    body = await organization_manager_obj.remove_user_from_organization(
         user_id=user_request.user_id, organization_id=user_request.organization_id
     )
+    return json_response(body, status_code=201)
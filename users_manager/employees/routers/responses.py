@@ -0,0 +1,55 @@
+import hashlib
+
+import orjson
+from fastapi import Request, Response
+
+
+def _encode(body):
+    if isinstance(body, str):
+        return body.encode()
+    if not isinstance(body, bytes):
+        return orjson.dumps(body)
+    return body
+
+
+def json_response(body, status_code: int = 200, headers: dict = None):
+    """Build a JSON response from a service result.
+
+    Upstream bodies arrive as raw JSON bytes and are sent to the client
+    untouched; returning them from a route would make FastAPI encode them a
+    second time as a JSON string. Anything else is encoded with orjson.
+    """
+    return Response(
+        content=_encode(body),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def etag_for(content: bytes):
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str):
+    # If-None-Match uses the weak comparison, so a W/ prefix is ignored.
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def conditional_json_response(request: Request, body):
+    """Like ``json_response`` but with a strong ETag derived from the content.
+
+    A request whose ``If-None-Match`` matches gets an empty 304 instead.
+    """
+    content = _encode(body)
+    headers = {"ETag": etag_for(content), "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=content, headers=headers, media_type="application/json")
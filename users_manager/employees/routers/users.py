@@ -1,30 +1,110 @@
+from typing import Optional
+
+import orjson
 from employees.schemas import (
     CreateUser,
     SetUserPasswordEmail,
     DeleteUserAccount,
     ModifyUser,
     NewMember,
+    NewMembers,
     AddRolesToUser,
+    ModifyRolesInBatch,
 )
+from employees.routers.responses import conditional_json_response, json_response
+from employees.services.background import email_queue_obj
+from employees.services.bulk import parse_rows
+from employees.services.idempotency import idempotency_manager_obj
 from employees.services.users import user_manager_obj
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from settings import settings
 
 router = APIRouter()
 
 
 @router.post("/user", status_code=201)
-async def create_user(user_request: CreateUser):
-    return await user_manager_obj.create_user(
-        email=user_request.email,
-        name=user_request.name,
-        family_name=user_request.family_name,
-        username=user_request.username,
+async def create_user(user_request: CreateUser, request: Request):
+    async def handle():
+        body = await user_manager_obj.create_user(
+            email=user_request.email,
+            name=user_request.name,
+            family_name=user_request.family_name,
+            username=user_request.username,
+            send_password_email=False,
+        )
+        job_id = await user_manager_obj.schedule_password_email(user_request.email)
+        return json_response(
+            body, status_code=201, headers={"X-Password-Email-Job": job_id}
+        )
+
+    return await idempotency_manager_obj.execute(request, handle)
+
+
+@router.post("/users/bulk", status_code=201)
+async def create_users_in_bulk(
+    request: Request,
+    concurrency: Optional[int] = Query(default=None, ge=1),
+    use_import_job: Optional[bool] = None,
+):
+    rows = parse_rows(request.headers.get("content-type"), await request.body())
+
+    if use_import_job is None:
+        use_import_job = len(rows) >= settings.bulk_users_import_threshold
+
+    if use_import_job:
+        body = await user_manager_obj.import_users(rows)
+        job_id = await user_manager_obj.schedule_import_password_emails(
+            orjson.loads(body)["id"], [row["email"] for row in rows]
+        )
+        return json_response(
+            body, status_code=201, headers={"X-Password-Email-Job": job_id}
+        )
+
+    concurrency = min(
+        concurrency or settings.bulk_users_concurrency,
+        settings.bulk_users_max_concurrency,
+    )
+
+    async def stream_results():
+        async for result in user_manager_obj.create_users_in_bulk(rows, concurrency):
+            yield orjson.dumps(result) + b"\n"
+
+    return StreamingResponse(
+        stream_results(), status_code=201, media_type="application/x-ndjson"
     )
 
 
+@router.get("/users/bulk/jobs/{job_id}", status_code=200)
+async def get_bulk_import_job(job_id: str):
+    return json_response(await user_manager_obj.get_job(job_id))
+
+
 @router.get("/users", status_code=200)
-async def get_all_users():
-    return await user_manager_obj.list_users()
+async def get_all_users(
+    request: Request,
+    page: Optional[int] = Query(default=None, ge=0),
+    per_page: Optional[int] = Query(default=None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fetch_all: bool = False,
+):
+    if fetch_all:
+        return StreamingResponse(
+            await user_manager_obj.list_all_users(per_page),
+            media_type="application/json",
+        )
+
+    if cursor is not None or (per_page is not None and page is None):
+        body = await user_manager_obj.list_users_by_cursor(cursor, per_page)
+    else:
+        body = await user_manager_obj.list_users(page, per_page)
+
+    return conditional_json_response(request, body)
+
+
+@router.get("/user/password-email/jobs/{job_id}", status_code=200)
+async def get_password_email_job(job_id: str):
+    return email_queue_obj.status(job_id)
 
 
 @router.get("/user/id/{email}", status_code=200)
@@ -34,9 +114,10 @@ async def get_user_id_by_email(email: str):
 
 @router.post("/user/password-reset/request", status_code=201)
 async def send_password_email_ticket(user_request: SetUserPasswordEmail):
-    return await user_manager_obj.send_email_with_password_change(
+    body = await user_manager_obj.send_email_with_password_change(
         email=user_request.user_email
     )
+    return json_response(body, status_code=201)
 
 
 @router.delete("/user", status_code=204)
@@ -46,7 +127,7 @@ async def delete_user(user_request: DeleteUserAccount):
 
 @router.put("/user", status_code=200)
 async def modify_user(user_request: ModifyUser):
-    return await user_manager_obj.modify_user(
+    body = await user_manager_obj.modify_user(
         user_id=user_request.user_id,
         given_name=user_request.given_name,
         family_name=user_request.family_name,
@@ -58,19 +139,42 @@ async def modify_user(user_request: ModifyUser):
         password=user_request.password,
         username=user_request.username,
     )
+    return json_response(body)
 
 
 @router.post("/user/organization/invitation", status_code=200)
-async def send_invitation(user_request: NewMember):
-    return await user_manager_obj.invite_user_to_organization(
-        user_request.email, user_request.organization_id
+async def send_invitation(user_request: NewMember, request: Request):
+    async def handle():
+        body = await user_manager_obj.invite_user_to_organization(
+            user_request.email, user_request.organization_id
+        )
+        return json_response(body)
+
+    return await idempotency_manager_obj.execute(request, handle)
+
+
+@router.post("/user/organization/invitations", status_code=200)
+async def send_invitations(user_request: NewMembers):
+    return await user_manager_obj.invite_users_to_organization(
+        user_request.emails, user_request.organization_id
     )
 
 
 @router.post("/user/roles", status_code=200)
 async def add_roles_to_user(user_request: AddRolesToUser):
-    return await user_manager_obj.add_roles_to_already_assigned_user(
+    body = await user_manager_obj.add_roles_to_already_exsisting_user_in_organization(
         user_id=user_request.user_id,
         organization_id=user_request.organization,
         roles=user_request.roles,
     )
+    return json_response(body)
+
+
+@router.post("/user/roles/batch", status_code=200)
+async def modify_roles_in_batch(user_request: ModifyRolesInBatch):
+    return await user_manager_obj.modify_roles_in_batch(
+        user_request.user_ids,
+        user_request.organization_id,
+        user_request.roles,
+        user_request.operation,
+    )
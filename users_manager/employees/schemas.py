@@ -1,6 +1,7 @@
-from typing import Optional
+from datetime import date
+from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class CreateOrganization(BaseModel):
@@ -58,6 +59,11 @@ class NewMember(BaseModel):
     organization_id: str
 
 
+class NewMembers(BaseModel):
+    emails: list[str]
+    organization_id: str
+
+
 class ListOrganizations(BaseModel):
     tenant_domain: str
 
@@ -68,6 +74,27 @@ class AddRolesToUser(BaseModel):
     roles: list
 
 
+class ModifyRolesInBatch(BaseModel):
+    user_ids: list[str]
+    organization_id: str
+    roles: list[str]
+    operation: Literal["add", "remove", "replace"] = "add"
+
+
 class RemoveUserFromOrganization(BaseModel):
     user_id: str
     organization_id: str
+
+
+class EmployeeDetails(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    birthdate: Optional[date] = None
+    role: Optional[str] = None
+    employment_status: Optional[str] = None
+    organization_id: Optional[int] = None
+    user_id: Optional[str] = None
+    email: Optional[str] = None
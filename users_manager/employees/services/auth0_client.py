@@ -0,0 +1,305 @@
+import asyncio
+import time
+
+import aiohttp
+from employees.services.cache import TTLCache
+from employees.services.coalescing import SingleFlight
+from employees.services.deadline import (
+    deadline_exceeded,
+    deadline_exceeded_error,
+    remaining_time,
+    request_deadline,
+    upstream_timeout,
+)
+from employees.services.metrics import (
+    register_cache,
+    upstream_coalesced_requests_total,
+    upstream_request_duration_seconds,
+)
+from employees.services.resilience import (
+    IDEMPOTENT_METHODS,
+    RETRYABLE_STATUSES,
+    CircuitBreakerRegistry,
+    backoff_delay,
+    template_path,
+)
+from employees.services.rate_limiter import (
+    PRIORITY_READ,
+    PRIORITY_WRITE,
+    RateLimitScheduler,
+    request_priority,
+    retry_after_seconds,
+)
+from employees.services.token_provider import build_token_provider
+from fastapi import HTTPException
+from settings import settings
+
+
+class Auth0Client:
+    """Shared, app-lifetime HTTP client used for every call to the Auth0 APIs.
+
+    Keeping a single ``aiohttp.ClientSession`` lets connections to the tenant
+    be kept alive and reused instead of paying a TCP+TLS handshake per call.
+    The ``Authorization`` header is filled in from ``token_provider``; a 401
+    from upstream invalidates the token and the call is retried once. Every
+    call goes through ``rate_limiter`` and a 429 is waited out and retried
+    rather than handed to the caller. GET responses carrying an ``ETag`` are
+    kept in ``validators`` and revalidated with ``If-None-Match``; a 304 is
+    answered from the stored body.
+    """
+
+    def __init__(self, token_provider=None, rate_limiter=None, tenant=None):
+        tenant = tenant or settings.tenant(settings.tenant_domain)
+        self._session = None
+        self._loop = None
+        self.token_provider = token_provider or build_token_provider(self, tenant)
+        self.rate_limiter = rate_limiter or RateLimitScheduler(
+            rate=tenant.rate_limit_requests_per_second,
+            burst=tenant.rate_limit_burst,
+        )
+        self.circuit_breakers = CircuitBreakerRegistry(
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            reset_timeout=settings.circuit_breaker_reset_timeout,
+        )
+        self.validators = TTLCache(
+            max_size=settings.upstream_etag_cache_max_size,
+            ttl=settings.upstream_etag_cache_ttl,
+        )
+
+    def _create_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=settings.auth0_connection_limit,
+            limit_per_host=settings.auth0_connection_limit_per_host,
+            ttl_dns_cache=settings.auth0_dns_cache_ttl,
+            keepalive_timeout=settings.auth0_keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    @property
+    def session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    async def start(self):
+        return self.session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def _send(self, method: str, url: str, token: str, headers=None, data=None):
+        headers = {**(headers or {}), "Authorization": f"Bearer {token}"}
+        timeout = aiohttp.ClientTimeout(total=upstream_timeout())
+        return self.session.request(
+            method, url, headers=headers, data=data, timeout=timeout
+        )
+
+    async def request(self, method: str, url: str, headers=None, data=None):
+        priority = request_priority.get()
+        if priority is None:
+            priority = PRIORITY_READ if method == "GET" else PRIORITY_WRITE
+
+        validator = self.validators.get(url) if method == "GET" else None
+        if validator is not None:
+            headers = {**(headers or {}), "If-None-Match": validator["etag"]}
+
+        token = await asyncio.wait_for(
+            self.token_provider.get_token(), remaining_time()
+        )
+        token_refreshed = False
+        rate_limited_attempts = 0
+
+        while True:
+            await asyncio.wait_for(
+                self.rate_limiter.acquire(priority), remaining_time()
+            )
+
+            async with self._send(method, url, token, headers, data) as response:
+                self.rate_limiter.update_from_headers(response.headers)
+
+                if response.status == 429:
+                    retry_after = retry_after_seconds(response.headers)
+                    max_wait = min(
+                        settings.rate_limit_max_wait,
+                        remaining_time() or settings.rate_limit_max_wait,
+                    )
+                    if (
+                        rate_limited_attempts < settings.rate_limit_max_retries
+                        and retry_after <= max_wait
+                    ):
+                        rate_limited_attempts += 1
+                        self.rate_limiter.pause(retry_after)
+                        continue
+
+                if (
+                    response.status == 401
+                    and not token_refreshed
+                    and self.token_provider.invalidate(token)
+                ):
+                    token_refreshed = True
+                    token = await asyncio.wait_for(
+                        self.token_provider.get_token(), remaining_time()
+                    )
+                    continue
+
+                if response.status == 304 and validator is not None:
+                    return {**validator["response"], "status": 200}
+
+                result = await _read_response(response)
+                if method == "GET" and "ETag" in response.headers:
+                    self.validators.set(
+                        url, {"etag": response.headers["ETag"], "response": result}
+                    )
+                return result
+
+
+async def _read_response(response):
+    response.raise_for_status()
+
+    return {
+        "status": response.status,
+        "headers": dict(response.headers),
+        "body": await response.read(),
+    }
+
+
+class TenantClients:
+    """``Auth0Client`` per tenant.
+
+    Each tenant gets its own connection pool, token and rate-limit budget, so
+    a busy tenant cannot starve the others. The default tenant uses
+    ``auth0_client_obj``; clients of registered tenants are created on first
+    use.
+    """
+
+    def __init__(self):
+        self._clients = {}
+
+    def get(self, name: str = None):
+        name = name or settings.tenant_name
+        if name == settings.tenant_domain and name not in settings.tenants:
+            return auth0_client_obj
+
+        client = self._clients.get(name)
+        if client is None:
+            client = self._clients[name] = Auth0Client(tenant=settings.tenant(name))
+        return client
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+
+
+auth0_client_obj = Auth0Client()
+register_cache("upstream_etag", auth0_client_obj.validators)
+tenant_clients_obj = TenantClients()
+
+
+upstream_reads = SingleFlight()
+
+
+async def make_request_with_error_handling(
+    method: str, url: str, headers=None, data=None
+):
+    if method != "GET" or data:
+        return await _timed_request(method, url, headers, data)
+
+    key = (url, tuple(sorted((headers or {}).items())))
+    if key in upstream_reads:
+        upstream_coalesced_requests_total.inc(path=template_path(url))
+
+    async def shared_request():
+        # The call is shared with other requests, so it must not be cut short
+        # by the deadline of whichever request happened to start it; each
+        # caller stops waiting at its own deadline instead.
+        request_deadline.set(None)
+        return await _timed_request(method, url, headers, data)
+
+    try:
+        return await asyncio.wait_for(
+            upstream_reads.do(key, shared_request), remaining_time()
+        )
+    except asyncio.TimeoutError:
+        raise deadline_exceeded_error()
+
+
+async def _timed_request(method: str, url: str, headers=None, data=None):
+    started_at = time.perf_counter()
+    status = "error"
+    try:
+        response = await _request_with_retries(method, url, headers, data)
+        status = response["status"]
+        return response
+    except HTTPException as exc:
+        status = exc.status_code
+        raise
+    finally:
+        upstream_request_duration_seconds.observe(
+            time.perf_counter() - started_at,
+            method=method,
+            path=template_path(url),
+            status=status,
+        )
+
+
+async def _request_with_retries(method: str, url: str, headers=None, data=None):
+    client = tenant_clients_obj.get()
+    breaker = client.circuit_breakers.get(method, url)
+    attempts = settings.retry_max_attempts if method in IDEMPOTENT_METHODS else 1
+
+    for attempt in range(attempts):
+        breaker.before_call()
+        retry = attempt + 1 < attempts
+
+        try:
+            response = await client.request(method, url, headers=headers, data=data)
+        except aiohttp.ClientResponseError as http_err:
+            if http_err.status < 500:
+                breaker.record_success()
+                raise HTTPException(
+                    status_code=http_err.status, detail=http_err.message
+                )
+            breaker.record_failure()
+            if not retry or http_err.status not in RETRYABLE_STATUSES:
+                raise HTTPException(
+                    status_code=http_err.status, detail=http_err.message
+                )
+        except asyncio.TimeoutError:
+            # Running out of our own budget says nothing about the upstream.
+            if deadline_exceeded():
+                raise deadline_exceeded_error()
+            breaker.record_failure()
+            if not retry:
+                raise HTTPException(
+                    status_code=504, detail="Upstream request timed out"
+                )
+        except aiohttp.ClientConnectionError as conn_err:
+            breaker.record_failure()
+            if not retry:
+                raise HTTPException(
+                    status_code=502, detail=f"Upstream connection failed: {conn_err}"
+                )
+        except aiohttp.ClientError as client_err:
+            breaker.record_failure()
+            raise HTTPException(status_code=502, detail=f"Upstream error: {client_err}")
+        except HTTPException:
+            raise
+        except Exception as err:
+            breaker.record_failure()
+            raise HTTPException(status_code=500, detail=str(err))
+        else:
+            breaker.record_success()
+            return response
+
+        delay = backoff_delay(
+            attempt, settings.retry_backoff_base, settings.retry_backoff_max
+        )
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            raise deadline_exceeded_error()
+        await asyncio.sleep(delay)
@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import time
+import uuid
+from contextlib import suppress
+
+from fastapi import HTTPException
+
+from employees.services.cache import TTLCache
+from employees.services.deadline import request_deadline
+from employees.services.metrics import register_queue
+from employees.services.resilience import backoff_delay
+from settings import settings
+
+
+class BackgroundQueue:
+    """Bounded in-process work queue drained by a fixed pool of workers.
+
+    ``submit`` returns a job id straight away, or raises ``asyncio.QueueFull``
+    when ``max_size`` jobs are already waiting; ``record_failed`` then keeps
+    a failed job for the work that was turned away, while ``put`` waits for
+    room instead. ``spawn`` runs a job in its own task rather than on a
+    worker, for jobs that mostly wait. Failed jobs are retried with
+    backoff up to ``max_attempts`` times; a 4xx ``HTTPException`` is final.
+    Job records are kept in a ``TTLCache`` so ``status`` can be polled after
+    the job has finished.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        workers: int,
+        max_attempts: int,
+        history_size: int,
+        history_ttl: float,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.jobs = TTLCache(max_size=history_size, ttl=history_ttl)
+        self._queue = None
+        self._workers = []
+        self._spawned = set()
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._workers = [
+                asyncio.create_task(self._work()) for _ in range(self.workers)
+            ]
+            self._spawned = set()
+            self._loop = loop
+
+    async def start(self):
+        self._ensure_started()
+
+    async def join(self):
+        """Wait until every job submitted or spawned so far has finished."""
+        if self._loop is asyncio.get_running_loop():
+            # Spawned jobs may still put jobs on the queue.
+            while self._spawned:
+                await asyncio.gather(*self._spawned, return_exceptions=True)
+            await self._queue.join()
+
+    async def close(self, timeout: float = None):
+        if self._loop is not asyncio.get_running_loop():
+            return
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.join(), timeout)
+        tasks = [*self._workers, *self._spawned]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+        self._workers = []
+        self._spawned = set()
+        self._loop = None
+
+    def _new_job(self, status: str, error=None):
+        return {
+            "id": str(uuid.uuid4()),
+            "queue": self.name,
+            "status": status,
+            "attempts": 0,
+            "error": error,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+        }
+
+    @staticmethod
+    def _job_context():
+        # Jobs run with the context of the request that submitted them, so
+        # e.g. the tenant it was made for carries over to the worker, but not
+        # bound by that request's deadline.
+        context = contextvars.copy_context()
+        context.run(request_deadline.set, None)
+        return context
+
+    def submit(self, function, *args):
+        self._ensure_started()
+
+        job = self._new_job(self.QUEUED)
+        self._queue.put_nowait((job, self._job_context(), function, args))
+        self.jobs.set(job["id"], job)
+        return job["id"]
+
+    async def put(self, function, *args):
+        self._ensure_started()
+
+        job = self._new_job(self.QUEUED)
+        self.jobs.set(job["id"], job)
+        await self._queue.put((job, self._job_context(), function, args))
+        return job["id"]
+
+    def spawn(self, function, *args):
+        self._ensure_started()
+
+        job = self._new_job(self.QUEUED)
+        task = self._job_context().run(
+            asyncio.ensure_future, self._run(job, function, args)
+        )
+        self._spawned.add(task)
+        task.add_done_callback(self._spawned.discard)
+        self.jobs.set(job["id"], job)
+        return job["id"]
+
+    def record_failed(self, error: str):
+        job = self._new_job(self.FAILED, error)
+        self.jobs.set(job["id"], job)
+        return job["id"]
+
+    def status(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "workers": len(self._workers),
+        }
+
+    async def _work(self):
+        while True:
+            job, context, function, args = await self._queue.get()
+            try:
+                await context.run(asyncio.ensure_future, self._run(job, function, args))
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job, function, args):
+        while True:
+            job["attempts"] += 1
+            self._update(job, self.RUNNING)
+            try:
+                await function(*args)
+            except asyncio.CancelledError:
+                self._update(job, self.FAILED, "cancelled")
+                raise
+            except Exception as exc:
+                error = exc.detail if isinstance(exc, HTTPException) else str(exc)
+                final = isinstance(exc, HTTPException) and exc.status_code < 500
+                if final or job["attempts"] >= self.max_attempts:
+                    self._update(job, self.FAILED, error)
+                    return
+                self._update(job, self.RETRYING, error)
+                await asyncio.sleep(
+                    backoff_delay(
+                        job["attempts"],
+                        settings.retry_backoff_base,
+                        settings.retry_backoff_max,
+                    )
+                )
+            else:
+                self._update(job, self.SUCCEEDED)
+                return
+
+    def _update(self, job, status: str, error=None):
+        job["status"] = status
+        job["error"] = error
+        job["updated_at"] = time.time()
+
+
+email_queue_obj = BackgroundQueue(
+    name="email",
+    max_size=settings.email_queue_max_size,
+    workers=settings.email_queue_workers,
+    max_attempts=settings.email_queue_max_attempts,
+    history_size=settings.background_job_history_size,
+    history_ttl=settings.background_job_history_ttl,
+)
+register_queue(email_queue_obj)
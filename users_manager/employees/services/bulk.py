@@ -0,0 +1,65 @@
+import asyncio
+import csv
+import io
+import json
+
+from employees.services.rate_limiter import request_priority
+from fastapi import HTTPException
+
+
+def parse_rows(content_type: str, body: bytes):
+    """Parse a JSON array, NDJSON or CSV upload into a list of dicts."""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    text = body.decode("utf-8-sig")
+
+    try:
+        if media_type in ("application/x-ndjson", "application/ndjson"):
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        if media_type == "text/csv":
+            return list(csv.DictReader(io.StringIO(text)))
+        if media_type == "application/json":
+            rows = json.loads(text)
+            if not isinstance(rows, list):
+                raise ValueError("Expected a JSON array")
+            return rows
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {exc}")
+
+    raise HTTPException(
+        status_code=415, detail=f"Unsupported content type: {media_type}"
+    )
+
+
+def error_result(exc: Exception):
+    if isinstance(exc, HTTPException):
+        return {"status": "error", "status_code": exc.status_code, "detail": exc.detail}
+    return {"status": "error", "status_code": 422, "detail": str(exc)}
+
+
+async def run_with_concurrency(items, function, concurrency: int, priority: int = None):
+    """Run ``function(item)`` for every item, at most ``concurrency`` at a time.
+
+    Yields ``(index, result, exception)`` tuples in completion order. Pending
+    calls are cancelled if the consumer stops iterating early. ``priority``
+    is the rate-limiter priority used for the upstream calls they make.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index, item):
+        if priority is not None:
+            request_priority.set(priority)
+        async with semaphore:
+            try:
+                return index, await function(item), None
+            except Exception as exc:
+                return index, None, exc
+
+    tasks = [
+        asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+
+from employees.services.shared_cache import SharedTTLCache
+from settings import settings
+
+
+class TTLCache:
+    """In-process cache with a per-entry time-to-live and LRU eviction.
+
+    Hit and miss counters are kept so they can be exposed by the routers.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def delete_matching(self, predicate, prefix: tuple = ()):
+        for key in [
+            k
+            for k, (_, v) in self._entries.items()
+            if (not prefix or (isinstance(k, tuple) and k[: len(prefix)] == prefix))
+            and predicate(k, v)
+        ]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
+
+
+class LocalTTLCache(TTLCache):
+    """``TTLCache`` with the interface of ``SharedTTLCache``.
+
+    ``set``, ``delete`` and ``delete_matching`` are coroutines there, so they
+    are here too and callers of ``make_cache`` work with either backend.
+    """
+
+    async def set(self, key, value, ttl: float = None):
+        super().set(key, value, ttl)
+
+    async def delete(self, key):
+        super().delete(key)
+
+    async def delete_matching(self, predicate, prefix: tuple = ()):
+        super().delete_matching(predicate, prefix)
+
+
+def make_cache(name: str, max_size: int, ttl: float):
+    """Create a cache for ``name`` with the backend chosen by ``cache_backend``.
+
+    ``memory`` keeps a ``LocalTTLCache`` per process; ``shared`` stores
+    entries in a ``SharedTTLCache`` that every worker on the host sees.
+    """
+    if settings.cache_backend == "shared":
+        return SharedTTLCache(
+            namespace=name,
+            path=settings.shared_cache_path,
+            max_size=max_size,
+            ttl=ttl,
+            mmap_size=settings.shared_cache_mmap_size,
+            touch_interval=settings.shared_cache_touch_interval,
+        )
+    return LocalTTLCache(max_size=max_size, ttl=ttl)
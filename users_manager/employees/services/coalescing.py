@@ -0,0 +1,53 @@
+import asyncio
+
+
+class _Call:
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one.
+
+    The first caller for a key starts ``function()``; callers arriving while
+    it runs await the same task and get the same result or exception. A
+    caller that is cancelled only stops waiting; the shared call is cancelled
+    once every caller waiting for it has gone.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, function):
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(function()))
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Everybody waiting gave up; later callers start a fresh call.
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _finish(self, key, call):
+        self._forget(key, call)
+        if not call.task.cancelled():
+            # Mark the exception as retrieved when nobody was left to await it.
+            call.task.exception()
@@ -0,0 +1,149 @@
+import asyncio
+from contextvars import ContextVar
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from settings import settings
+from starlette.routing import Match
+
+# Event-loop time by which the current request has to be answered; None when
+# the work is not bound to a request (mirror sync, background jobs).
+request_deadline = ContextVar("request_deadline", default=None)
+
+
+def remaining_time():
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+def deadline_exceeded():
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def deadline_exceeded_error():
+    return HTTPException(status_code=504, detail="Request deadline exceeded")
+
+
+def upstream_timeout():
+    """Timeout for the next upstream call.
+
+    ``upstream_request_timeout`` shrunk to what is left of the request
+    deadline; raises a 504 once nothing is left.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return settings.upstream_request_timeout
+    if remaining <= 0:
+        raise deadline_exceeded_error()
+    return min(remaining, settings.upstream_request_timeout)
+
+
+# Routes whose work grows with the request body or the tenant and that answer
+# only once it is done. POST /employees/bulk runs without a deadline; GET
+# /users may wait for a users-export job, so it gets that job's own timeout on
+# top of the usual one. ``route_timeouts`` and the deadline header override
+# both. Callables are read per request, so they follow the settings.
+DEFAULT_ROUTE_TIMEOUTS = {
+    "POST /employees/bulk": 0,
+    "GET /users": lambda: settings.users_export_timeout + settings.request_timeout,
+}
+
+
+def _iter_routes(routes):
+    for route in routes:
+        # Routers added with include_router are wrapped; look inside them.
+        if hasattr(route, "original_router"):
+            yield from _iter_routes(route.original_router.routes)
+        else:
+            yield route
+
+
+def _route_timeout(scope):
+    for route in _iter_routes(scope["app"].router.routes):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            key = f"{scope['method']} {route.path}"
+            if key in settings.route_timeouts:
+                return settings.route_timeouts[key]
+            timeout = DEFAULT_ROUTE_TIMEOUTS.get(key, settings.request_timeout)
+            return timeout() if callable(timeout) else timeout
+    return settings.request_timeout
+
+
+def _header_timeout(scope):
+    header = settings.deadline_header.lower().encode()
+    for name, value in scope["headers"]:
+        if name == header:
+            try:
+                timeout = float(value)
+            except ValueError:
+                return None
+            return min(timeout, settings.request_timeout_max) if timeout > 0 else None
+    return None
+
+
+class DeadlineMiddleware:
+    """Bounds each request by a deadline and answers 504 when it runs out.
+
+    The deadline comes from the deadline header, else ``route_timeouts``
+    (keyed by ``"METHOD /route/path"``), else ``DEFAULT_ROUTE_TIMEOUTS``,
+    else ``request_timeout``; a timeout of 0 disables it. It bounds the time
+    until the response starts. A started response can no longer turn into a
+    504, so cutting it would only hand the client a truncated 2xx body; the
+    deadline is lifted instead and a streamed body (bulk results, fetch_all)
+    runs to the end, each upstream call bounded by
+    ``upstream_request_timeout``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timeout = _header_timeout(scope) or _route_timeout(scope)
+        if not timeout:
+            return await self.app(scope, receive, send)
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        response_started = timed_out = False
+
+        def expire():
+            nonlocal timed_out
+            timed_out = True
+            task.cancel()
+
+        # A cancel scope around the app: asyncio.timeout would do, but the
+        # service still runs on Python 3.10.
+        expiry = loop.call_later(timeout, expire)
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                expiry.cancel()
+                # Runs in the task that produces the body, so the upstream
+                # calls made for it see no deadline either.
+                request_deadline.set(None)
+            await send(message)
+
+        token = request_deadline.set(loop.time() + timeout)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            if not timed_out:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+            error = deadline_exceeded_error()
+            await JSONResponse(
+                status_code=error.status_code, content={"detail": error.detail}
+            )(scope, receive, send)
+        finally:
+            expiry.cancel()
+            request_deadline.reset(token)
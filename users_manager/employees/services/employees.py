@@ -0,0 +1,135 @@
+import base64
+from datetime import date
+
+import orjson
+from database_structure.models import (
+    Employee,
+    VALID_EMPLOYMENT_STATUS,
+    VALID_ROLE,
+    employee_lower_name,
+)
+from employees.schemas import EmployeeDetails
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+
+# Keyset sort keys as (column, parse cursor value) pairs. Each one matches the
+# trailing columns of an index in database_structure.models, so a page is read
+# off the index in order instead of sorting every match.
+ID_SORT_KEY = ((Employee.id, int),)
+NAME_SORT_KEY = ((employee_lower_name, str), (Employee.id, int))
+BIRTHDATE_SORT_KEY = ((Employee.birthdate, date.fromisoformat), (Employee.id, int))
+
+
+def encode_employees_cursor(*key):
+    return base64.urlsafe_b64encode(orjson.dumps(key)).decode()
+
+
+def decode_employees_cursor(cursor: str, sort_key=ID_SORT_KEY):
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(sort_key):
+            raise ValueError("Cursor does not match the sort order")
+        return [parse(value) for (_, parse), value in zip(sort_key, values)]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(sort_key, values):
+    columns = [column for column, _ in sort_key]
+    if len(columns) == 1:
+        return columns[0] > values[0]
+    return tuple_(*columns) > tuple_(*values)
+
+
+def _escape_like(value: str):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class EmployeeManager:
+
+    def build_search_query(
+        self,
+        organization_id: int = None,
+        role: str = None,
+        employment_status: str = None,
+        name_prefix: str = None,
+        born_after: date = None,
+        born_before: date = None,
+        cursor: str = None,
+        limit: int = 50,
+    ):
+        if role is not None and role not in VALID_ROLE:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid role: {role}. Must be one of {VALID_ROLE}",
+            )
+        if (
+            employment_status is not None
+            and employment_status not in VALID_EMPLOYMENT_STATUS
+        ):
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid employment_status {employment_status}. Must be one of {VALID_EMPLOYMENT_STATUS}",
+            )
+
+        query = select(Employee)
+
+        if organization_id is not None:
+            query = query.where(Employee.organization_id == organization_id)
+        if role is not None:
+            query = query.where(Employee.role == role)
+        if employment_status is not None:
+            query = query.where(Employee.employment_status == employment_status)
+        if name_prefix:
+            query = query.where(
+                employee_lower_name.like(
+                    f"{_escape_like(name_prefix.lower())}%", escape="\\"
+                )
+            )
+        if born_after is not None:
+            query = query.where(Employee.birthdate >= born_after)
+        if born_before is not None:
+            query = query.where(Employee.birthdate <= born_before)
+
+        # Order by the column the most selective index filter is on, so the
+        # organization's name or birthdate index also supplies the order.
+        if name_prefix:
+            sort_key = NAME_SORT_KEY
+        elif born_after is not None or born_before is not None:
+            sort_key = BIRTHDATE_SORT_KEY
+        else:
+            sort_key = ID_SORT_KEY
+
+        if cursor is not None:
+            query = query.where(
+                _after(sort_key, decode_employees_cursor(cursor, sort_key))
+            )
+
+        # The sort key is selected after the employee so the next cursor can
+        # be taken from the last row as the database computed it. One extra
+        # row tells whether there is a next page.
+        return (
+            query.add_columns(*(column for column, _ in sort_key))
+            .order_by(*(column for column, _ in sort_key))
+            .limit(limit + 1)
+        )
+
+    async def search_employees(self, session, limit: int = 50, **filters):
+        query = self.build_search_query(limit=limit, **filters)
+        rows = list(await session.execute(query))
+
+        has_next_page = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            "employees": [
+                EmployeeDetails.model_validate(row[0]).model_dump(mode="json")
+                for row in rows
+            ],
+            "next_cursor": (
+                encode_employees_cursor(*rows[-1][1:]) if has_next_page else None
+            ),
+        }
+
+
+employee_manager_obj = EmployeeManager()
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from database_structure.database import SesionLocal
+from database_structure.models import IdempotencyKey
+from fastapi import HTTPException, Request, Response
+from settings import settings
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# Headers that describe the stored body and are recomputed on replay.
+_UNSTORED_HEADERS = frozenset({"content-length"})
+
+# Client errors that say "try again later" rather than "this request is wrong".
+TRANSIENT_STATUSES = frozenset({408, 429})
+
+
+def is_final_status(status_code: int):
+    return status_code < 500 and status_code not in TRANSIENT_STATUSES
+
+
+def request_fingerprint(method: str, path: str, body: bytes):
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyManager:
+    """Makes retried POSTs replay their first response instead of re-running.
+
+    The first request with a given ``Idempotency-Key`` claims it in the
+    ``idempotency_keys`` table and runs; its response is stored when it is
+    final (2xx-4xx). A duplicate arriving while the first one runs polls the
+    table until that response is stored and replays it. A 5xx, 408, 429 or a
+    crash releases the key so the next retry runs again; a key whose owner stopped
+    without releasing it can be claimed again after ``idempotency_lock_timeout``.
+    Stored responses expire after ``idempotency_key_ttl``.
+    """
+
+    @property
+    def enabled(self):
+        return settings.idempotency_enabled
+
+    def claim_statement(self, tenant: str, key: str, fingerprint: str, now: datetime):
+        statement = insert(IdempotencyKey).values(
+            tenant=tenant,
+            key=key,
+            fingerprint=fingerprint,
+            status=IN_PROGRESS,
+            locked_until=now + timedelta(seconds=settings.idempotency_lock_timeout),
+            expires_at=now + timedelta(seconds=settings.idempotency_key_ttl),
+        )
+        # Expired keys and abandoned claims are taken over in the same statement.
+        return statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.tenant, IdempotencyKey.key],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "status": statement.excluded.status,
+                "response_status": None,
+                "response_headers": None,
+                "response_body": None,
+                "locked_until": statement.excluded.locked_until,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=or_(
+                IdempotencyKey.expires_at <= now,
+                and_(
+                    IdempotencyKey.status == IN_PROGRESS,
+                    IdempotencyKey.locked_until <= now,
+                ),
+            ),
+        ).returning(IdempotencyKey.key)
+
+    async def _claim(self, tenant: str, key: str, fingerprint: str):
+        """Return ``None`` if the key was claimed, else the existing record."""
+        now = datetime.now(timezone.utc)
+        async with SesionLocal() as session, session.begin():
+            claimed = await session.scalar(
+                self.claim_statement(tenant, key, fingerprint, now)
+            )
+            if claimed is not None:
+                return None
+            return await session.scalar(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.tenant == tenant, IdempotencyKey.key == key
+                )
+            )
+
+    async def _complete(self, tenant: str, key: str, response: Response):
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in _UNSTORED_HEADERS
+        }
+        try:
+            async with SesionLocal() as session, session.begin():
+                await session.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.tenant == tenant, IdempotencyKey.key == key)
+                    .values(
+                        status=COMPLETED,
+                        response_status=response.status_code,
+                        response_headers=headers,
+                        response_body=response.body,
+                        expires_at=datetime.now(timezone.utc)
+                        + timedelta(seconds=settings.idempotency_key_ttl),
+                    )
+                )
+        except (SQLAlchemyError, OSError):
+            logger.exception("Could not store response for idempotency key %s", key)
+            await self._release(tenant, key)
+
+    async def _release(self, tenant: str, key: str):
+        try:
+            async with SesionLocal() as session, session.begin():
+                await session.execute(
+                    delete(IdempotencyKey).where(
+                        IdempotencyKey.tenant == tenant,
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.status == IN_PROGRESS,
+                    )
+                )
+        except (SQLAlchemyError, OSError):
+            # The claim then lapses after idempotency_lock_timeout.
+            logger.exception("Could not release idempotency key %s", key)
+
+    async def _wait_for_record(self, tenant: str, key: str, fingerprint: str):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.idempotency_wait_timeout
+        delay = 0.05
+
+        while True:
+            record = await self._claim(tenant, key, fingerprint)
+            if record is None:
+                return None
+            if record.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request",
+                )
+            if record.status == COMPLETED:
+                return record
+            if loop.time() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "1"},
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    async def execute(self, request: Request, handler):
+        """Run ``handler()`` once per idempotency key and replay its response."""
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not self.enabled or key is None:
+            return await handler()
+        if not key or len(key) > 255:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        tenant = settings.tenant_name
+        fingerprint = request_fingerprint(
+            request.method, request.url.path, await request.body()
+        )
+
+        try:
+            record = await self._wait_for_record(tenant, key, fingerprint)
+        except (SQLAlchemyError, OSError):
+            # Without the table requests still work, just not idempotently.
+            logger.exception("Could not claim idempotency key %s", key)
+            return await handler()
+        if record is not None:
+            return Response(
+                content=record.response_body,
+                status_code=record.response_status,
+                headers={**record.response_headers, "Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = await handler()
+        except HTTPException as exc:
+            if not is_final_status(exc.status_code):
+                await asyncio.shield(self._release(tenant, key))
+            else:
+                await self._complete(
+                    tenant,
+                    key,
+                    Response(
+                        content=orjson.dumps({"detail": exc.detail}),
+                        status_code=exc.status_code,
+                        headers=exc.headers,
+                        media_type="application/json",
+                    ),
+                )
+            raise
+        except BaseException:
+            await asyncio.shield(self._release(tenant, key))
+            raise
+
+        if not is_final_status(response.status_code):
+            await self._release(tenant, key)
+        else:
+            await self._complete(tenant, key, response)
+        return response
+
+    async def purge_expired(self):
+        async with SesionLocal() as session, session.begin():
+            result = await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.expires_at <= datetime.now(timezone.utc)
+                )
+            )
+        return result.rowcount
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.purge_expired()
+            except (SQLAlchemyError, OSError):
+                logger.exception("Could not purge expired idempotency keys")
+            await asyncio.sleep(settings.idempotency_purge_interval)
+
+
+idempotency_manager_obj = IdempotencyManager()
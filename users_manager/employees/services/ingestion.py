@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import csv
+import json
+from datetime import date
+
+from database_structure.database import async_engine
+from database_structure.models import VALID_EMPLOYMENT_STATUS, VALID_ROLE
+from fastapi import HTTPException
+from settings import settings
+
+STAGING_COLUMNS = (
+    "line",
+    "user_id",
+    "name",
+    "surname",
+    "birthdate",
+    "role",
+    "employment_status",
+    "organization_id",
+)
+
+CREATE_STAGING_TABLE = """
+CREATE TEMP TABLE employee_staging (
+    line bigint,
+    user_id text,
+    name text,
+    surname text,
+    birthdate date,
+    role text,
+    employment_status text,
+    organization_id integer
+) ON COMMIT DROP
+"""
+
+# Rows with a user_id are upserted on it (last occurrence in a batch wins);
+# rows without one are plain inserts. Unknown organizations are skipped.
+UPSERT_FROM_STAGING = """
+WITH staged AS (
+    SELECT DISTINCT ON (user_id) * FROM employee_staging
+    WHERE user_id IS NOT NULL
+    ORDER BY user_id, line DESC
+)
+INSERT INTO employee (user_id, name, surname, birthdate, role, employment_status, organization_id)
+SELECT user_id, name, surname, birthdate, role, employment_status, organization_id
+FROM staged
+WHERE organization_id IS NULL OR organization_id IN (SELECT id FROM organization)
+ON CONFLICT (user_id) DO UPDATE SET
+    name = EXCLUDED.name,
+    surname = EXCLUDED.surname,
+    birthdate = EXCLUDED.birthdate,
+    role = EXCLUDED.role,
+    employment_status = EXCLUDED.employment_status,
+    organization_id = EXCLUDED.organization_id
+"""
+
+INSERT_FROM_STAGING = """
+INSERT INTO employee (name, surname, birthdate, role, employment_status, organization_id)
+SELECT name, surname, birthdate, role, employment_status, organization_id
+FROM employee_staging
+WHERE user_id IS NULL
+AND (organization_id IS NULL OR organization_id IN (SELECT id FROM organization))
+"""
+
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer.strip():
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+async def iter_csv_records(lines):
+    """Group lines into CSV records and parse them.
+
+    A quoted field may contain newlines, so a record is only complete once
+    its quotes are balanced; until then the following lines are collected
+    and the reader gets them all at once.
+    """
+    pending, quotes = [], 0
+    async for line in lines:
+        if not pending and not line.strip():
+            continue
+        pending.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        yield next(csv.reader(pending))
+        pending, quotes = [], 0
+    if pending:
+        yield next(csv.reader(pending))
+
+
+async def iter_rows(chunks, media_type: str):
+    lines = iter_lines(chunks)
+
+    if media_type in ("application/x-ndjson", "application/ndjson"):
+        async for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+        return
+
+    if media_type == "text/csv":
+        header = None
+        async for values in iter_csv_records(lines):
+            if header is None:
+                header = [column.strip() for column in values]
+                continue
+            yield dict(zip(header, values))
+        return
+
+    raise HTTPException(
+        status_code=415, detail=f"Unsupported content type: {media_type}"
+    )
+
+
+def _to_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def _to_int(value):
+    return int(value) if value not in (None, "") else None
+
+
+def validate_batch(rows: list, first_line: int):
+    """Check a batch of rows and turn the valid ones into COPY records.
+
+    Role and employment status are checked for the whole batch at once with
+    set operations; rows are only looked at one by one when the batch holds
+    a value outside ``VALID_ROLE`` / ``VALID_EMPLOYMENT_STATUS``.
+    """
+    rows = [row if isinstance(row, dict) else {} for row in rows]
+    roles = [row.get("role") or VALID_ROLE[0] for row in rows]
+    statuses = [row.get("employment_status") or None for row in rows]
+
+    invalid_roles = set(roles).difference(VALID_ROLE)
+    invalid_statuses = set(statuses).difference(VALID_EMPLOYMENT_STATUS + (None,))
+
+    records, errors = [], []
+    for offset, (row, role, status) in enumerate(zip(rows, roles, statuses)):
+        line = first_line + offset
+
+        if not row:
+            errors.append({"line": line, "detail": "Row could not be parsed"})
+            continue
+        if invalid_roles and role in invalid_roles:
+            errors.append(
+                {
+                    "line": line,
+                    "detail": f"Invalid role: {role}. Must be one of {VALID_ROLE}",
+                }
+            )
+            continue
+        if invalid_statuses and status in invalid_statuses:
+            errors.append(
+                {
+                    "line": line,
+                    "detail": f"Invalid employment_status {status}. Must be one of {VALID_EMPLOYMENT_STATUS}",
+                }
+            )
+            continue
+
+        try:
+            records.append(
+                (
+                    line,
+                    row.get("user_id") or None,
+                    row.get("name"),
+                    row.get("surname"),
+                    _to_date(row.get("birthdate")),
+                    role,
+                    status,
+                    _to_int(row.get("organization_id")),
+                )
+            )
+        except (TypeError, ValueError) as exc:
+            errors.append({"line": line, "detail": str(exc)})
+
+    return records, errors
+
+
+def _affected_rows(status: str):
+    # asyncpg returns the command tag, e.g. "INSERT 0 1250".
+    return int(status.split()[-1])
+
+
+async def ingest_employees(rows, batch_size: int = None):
+    """Load employee rows into the ``employee`` table with ``COPY``.
+
+    ``rows`` is an async iterable of dicts. Rows are validated and copied in
+    batches into a temporary staging table and moved into ``employee`` with
+    one upsert per batch, so memory use does not grow with the input size.
+    The whole load runs in one transaction.
+    """
+    batch_size = batch_size or settings.employee_ingest_batch_size
+    summary = {"received": 0, "loaded": 0, "skipped": 0, "invalid": 0, "errors": []}
+
+    async with async_engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        asyncpg_connection = raw_connection.driver_connection
+
+        async with asyncpg_connection.transaction():
+            await asyncpg_connection.execute(CREATE_STAGING_TABLE)
+
+            async def load(batch):
+                records, errors = validate_batch(batch, summary["received"] + 1)
+                summary["received"] += len(batch)
+                summary["invalid"] += len(errors)
+                room = MAX_REPORTED_ERRORS - len(summary["errors"])
+                summary["errors"].extend(errors[:room])
+
+                if not records:
+                    return
+
+                await asyncpg_connection.copy_records_to_table(
+                    "employee_staging", records=records, columns=STAGING_COLUMNS
+                )
+                loaded = _affected_rows(
+                    await asyncpg_connection.execute(UPSERT_FROM_STAGING)
+                ) + _affected_rows(
+                    await asyncpg_connection.execute(INSERT_FROM_STAGING)
+                )
+                await asyncpg_connection.execute("TRUNCATE employee_staging")
+
+                summary["loaded"] += loaded
+                summary["skipped"] += len(records) - loaded
+
+            batch = []
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    await load(batch)
+                    batch = []
+            await load(batch)
+
+    return summary
+
+
+async def _read_file(path: str, chunk_size: int = 1 << 16):
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+async def _main(arguments):
+    media_type = "text/csv" if arguments.format == "csv" else "application/x-ndjson"
+    summary = await ingest_employees(
+        iter_rows(_read_file(arguments.path), media_type), arguments.batch_size
+    )
+    await async_engine.dispose()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bulk load an employee roster (CSV or NDJSON) into Postgres."
+    )
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--batch-size", type=int, default=None)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,188 @@
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def expose(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        # For counts kept elsewhere (e.g. cache statistics) and copied on scrape.
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # One slot per bucket plus a last one for values above them all.
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bucket, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, [("le", bucket)])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable run right before every scrape, e.g. to copy
+        cache statistics into gauges."""
+        self._collectors.append(collector)
+
+    def expose(self):
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = Registry()
+
+http_request_duration_seconds = metrics_registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Latency of requests handled by this service.",
+        ("method", "route"),
+    )
+)
+http_requests_total = metrics_registry.register(
+    Counter(
+        "http_requests_total",
+        "Requests handled by this service.",
+        ("method", "route", "status"),
+    )
+)
+http_requests_in_flight = metrics_registry.register(
+    Gauge(
+        "http_requests_in_flight",
+        "Requests currently being handled by this service.",
+        ("method",),
+    )
+)
+upstream_request_duration_seconds = metrics_registry.register(
+    Histogram(
+        "upstream_request_duration_seconds",
+        "Latency of Auth0 calls, retries included.",
+        ("method", "path", "status"),
+    )
+)
+upstream_coalesced_requests_total = metrics_registry.register(
+    Counter(
+        "upstream_coalesced_requests_total",
+        "Auth0 reads served by joining an identical in-flight request.",
+        ("path",),
+    )
+)
+cache_hits_total = metrics_registry.register(
+    Counter("cache_hits_total", "Cache hits since start.", ("cache",))
+)
+cache_misses_total = metrics_registry.register(
+    Counter("cache_misses_total", "Cache misses since start.", ("cache",))
+)
+cache_size = metrics_registry.register(
+    Gauge("cache_size", "Entries currently held by a cache.", ("cache",))
+)
+background_queue_size = metrics_registry.register(
+    Gauge("background_queue_size", "Jobs waiting in a work queue.", ("queue",))
+)
+
+registered_caches = {}
+
+
+def register_cache(name: str, cache):
+    registered_caches[name] = cache
+
+    def collect():
+        stats = cache.stats()
+        cache_hits_total.set(stats["hits"], cache=name)
+        cache_misses_total.set(stats["misses"], cache=name)
+        cache_size.set(stats["size"], cache=name)
+
+    metrics_registry.add_collector(collect)
+
+
+def register_queue(queue):
+    def collect():
+        background_queue_size.set(queue.stats()["queued"], queue=queue.name)
+
+    metrics_registry.add_collector(collect)
@@ -0,0 +1,479 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+from database_structure.database import SesionLocal, async_engine
+from database_structure.models import (
+    Employee,
+    MirrorSyncState,
+    Organization,
+    OrganizationMember,
+)
+from employees.services.auth0_client import make_request_with_error_handling
+from employees.services.user_export import (
+    AUTH0_USERS_PAGE_LIMIT,
+    iter_exported_users,
+    user_exporter_obj,
+)
+import orjson
+from settings import settings
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+MIRROR_RESOURCE = "auth0"
+
+# Key of the Postgres advisory lock that elects the worker running the sync.
+MIRROR_LOCK_KEY = 7_402_113
+
+INSERT_CHUNK_SIZE = 1000
+
+
+def _chunks(items, size: int = INSERT_CHUNK_SIZE):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class UpdatesPastPageLimit(Exception):
+    """More users changed since the last sync than page-based listing reaches."""
+
+
+def _identity_user_id(profile: dict):
+    try:
+        return str(profile["identities"][0]["user_id"])
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class MirrorSynchronizer:
+    """Keeps the ``organization`` and ``employee`` tables in sync with Auth0.
+
+    The first run (and every ``mirror_full_sync_interval`` seconds after it)
+    loads all organizations, memberships and, through a users-export job,
+    users, and drops mirrored rows that no longer exist upstream. Runs in
+    between only fetch users updated since the previous sync and refresh
+    organizations and memberships; when more users changed than page-based
+    listing reaches they do a full sync instead. Only the worker holding a
+    Postgres advisory lock syncs; every worker can read. Writes made through
+    this service upsert or delete their own row straight away.
+
+    Read helpers return upstream-shaped JSON, or ``None`` when the mirror has
+    no answer, in which case callers fall back to the Management API.
+    """
+
+    def __init__(self):
+        self._synced_at = None
+        self._checked_at = None
+
+    @property
+    def enabled(self):
+        return settings.mirror_enabled
+
+    def _mirrors_current_tenant(self):
+        # Only the default tenant is mirrored.
+        return self.enabled and settings.tenant_name == settings.tenant_domain
+
+    async def _get_json(self, path: str, query: dict):
+        url = settings.auth0_url(f"/api/v2/{path}?{urlencode(query)}")
+        headers = {
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "GET", url, headers=headers, data={}
+        )
+        return orjson.loads(response.get("body"))
+
+    async def _fetch_pages(
+        self, path: str, key: str, query: dict = None, max_total: int = None
+    ):
+        items, page, per_page = [], 0, 100
+        while True:
+            received_payload = await self._get_json(
+                path,
+                {
+                    **(query or {}),
+                    "page": page,
+                    "per_page": per_page,
+                    "include_totals": "true",
+                },
+            )
+            if max_total is not None and received_payload.get("total", 0) > max_total:
+                raise UpdatesPastPageLimit(received_payload["total"])
+            items.extend(received_payload.get(key, []))
+
+            page += 1
+            if not received_payload.get(key) or page * per_page >= received_payload.get(
+                "total", 0
+            ):
+                return items
+
+    async def fetch_organizations(self):
+        return await self._fetch_pages("organizations", "organizations")
+
+    async def fetch_updated_users(self, updated_since: datetime):
+        # Page-based listing only reaches the first AUTH0_USERS_PAGE_LIMIT
+        # users of a query; past that UpdatesPastPageLimit is raised.
+        query = {
+            "sort": "updated_at:1",
+            "q": f"updated_at:[{updated_since.isoformat()} TO *]",
+            "search_engine": "v3",
+        }
+        return await self._fetch_pages(
+            "users", "users", query, max_total=AUTH0_USERS_PAGE_LIMIT
+        )
+
+    async def fetch_member_ids(self, organization_id: str):
+        member_ids, query = [], {"take": 100}
+        while True:
+            received_payload = await self._get_json(
+                f"organizations/{organization_id}/members", query
+            )
+            member_ids.extend(
+                member["user_id"] for member in received_payload.get("members", [])
+            )
+
+            if not received_payload.get("next"):
+                return member_ids
+            query = {"take": 100, "from": received_payload["next"]}
+
+    async def fetch_memberships(self, organizations: list):
+        semaphore = asyncio.Semaphore(settings.mirror_sync_concurrency)
+
+        async def fetch(organization):
+            async with semaphore:
+                return organization["id"], await self.fetch_member_ids(
+                    organization["id"]
+                )
+
+        return dict(
+            await asyncio.gather(
+                *(fetch(organization) for organization in organizations)
+            )
+        )
+
+    async def _upsert_organizations(self, session, organizations: list, synced_at):
+        for chunk in _chunks(organizations):
+            statement = insert(Organization).values(
+                [
+                    {
+                        "auth0_id": organization["id"],
+                        "name": organization["name"],
+                        "display_name": organization.get("display_name"),
+                        "profile": organization,
+                        "synced_at": synced_at,
+                    }
+                    for organization in chunk
+                ]
+            )
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[Organization.auth0_id],
+                    set_={
+                        "name": statement.excluded.name,
+                        "display_name": statement.excluded.display_name,
+                        "profile": statement.excluded.profile,
+                        "synced_at": statement.excluded.synced_at,
+                    },
+                )
+            )
+
+    async def _upsert_users(self, session, users: list, synced_at):
+        for chunk in _chunks(users):
+            statement = insert(Employee).values(
+                [
+                    {
+                        "user_id": user["user_id"],
+                        "email": (user.get("email") or "").lower() or None,
+                        "name": user.get("given_name") or user.get("name"),
+                        "surname": user.get("family_name"),
+                        "profile": user,
+                        "synced_at": synced_at,
+                    }
+                    for user in chunk
+                ]
+            )
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[Employee.user_id],
+                    set_={
+                        "email": statement.excluded.email,
+                        "name": statement.excluded.name,
+                        "surname": statement.excluded.surname,
+                        "profile": statement.excluded.profile,
+                        "synced_at": statement.excluded.synced_at,
+                    },
+                )
+            )
+
+    async def _replace_memberships(self, session, memberships: dict):
+        for organization_id, member_ids in memberships.items():
+            organization_pk = (
+                select(Organization.id)
+                .where(Organization.auth0_id == organization_id)
+                .scalar_subquery()
+            )
+            await session.execute(
+                delete(OrganizationMember).where(
+                    OrganizationMember.organization_id == organization_pk
+                )
+            )
+            for chunk in _chunks(member_ids):
+                await session.execute(
+                    insert(OrganizationMember)
+                    .from_select(
+                        ["organization_id", "employee_id"],
+                        select(organization_pk, Employee.id).where(
+                            Employee.user_id.in_(chunk)
+                        ),
+                    )
+                    .on_conflict_do_nothing()
+                )
+
+    async def _store_state(self, session, synced_at, full: bool):
+        values = {"resource": MIRROR_RESOURCE, "synced_at": synced_at}
+        if full:
+            values["full_synced_at"] = synced_at
+
+        statement = insert(MirrorSyncState).values(values)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[MirrorSyncState.resource],
+                set_={key: value for key, value in values.items() if key != "resource"},
+            )
+        )
+
+    async def full_sync(self):
+        synced_at = datetime.now(timezone.utc)
+
+        organizations = await self.fetch_organizations()
+        memberships = await self.fetch_memberships(organizations)
+        export = await user_exporter_obj.export()
+
+        user_count = 0
+        with export:
+            async with SesionLocal() as session, session.begin():
+                await self._upsert_organizations(session, organizations, synced_at)
+                for users in _chunks(iter_exported_users(export)):
+                    await self._upsert_users(session, users, synced_at)
+                    user_count += len(users)
+                await session.execute(
+                    delete(Organization).where(
+                        Organization.auth0_id.is_not(None),
+                        Organization.synced_at < synced_at,
+                    )
+                )
+                await session.execute(
+                    delete(Employee).where(
+                        Employee.user_id.is_not(None), Employee.synced_at < synced_at
+                    )
+                )
+                await self._replace_memberships(session, memberships)
+                await self._store_state(session, synced_at, full=True)
+
+        logger.info(
+            "Mirror full sync: %s organizations, %s users",
+            len(organizations),
+            user_count,
+        )
+
+    async def incremental_sync(self, since: datetime):
+        synced_at = datetime.now(timezone.utc)
+
+        # A small overlap guards against clock skew between us and upstream.
+        users = await self.fetch_updated_users(since - timedelta(seconds=60))
+        organizations = await self.fetch_organizations()
+        memberships = await self.fetch_memberships(organizations)
+
+        async with SesionLocal() as session, session.begin():
+            await self._upsert_organizations(session, organizations, synced_at)
+            await self._upsert_users(session, users, synced_at)
+            await self._replace_memberships(session, memberships)
+            await self._store_state(session, synced_at, full=False)
+
+    async def _load_state(self):
+        async with SesionLocal() as session:
+            return await session.get(MirrorSyncState, MIRROR_RESOURCE)
+
+    async def sync_once(self):
+        async with async_engine.connect() as lock_connection:
+            acquired = await lock_connection.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": MIRROR_LOCK_KEY}
+            )
+            if not acquired:
+                return False
+
+            try:
+                state = await self._load_state()
+                full_sync_due = (
+                    state is None
+                    or state.full_synced_at is None
+                    or datetime.now(timezone.utc) - state.full_synced_at
+                    > timedelta(seconds=settings.mirror_full_sync_interval)
+                )
+
+                if not full_sync_due:
+                    try:
+                        await self.incremental_sync(state.synced_at)
+                    except UpdatesPastPageLimit as exc:
+                        logger.info(
+                            "%s users changed since the last mirror sync; "
+                            "running a full sync",
+                            exc.args[0],
+                        )
+                        full_sync_due = True
+                if full_sync_due:
+                    await self.full_sync()
+            finally:
+                await lock_connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": MIRROR_LOCK_KEY}
+                )
+
+        return True
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.sync_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Mirror sync failed")
+
+            await asyncio.sleep(settings.mirror_sync_interval)
+
+    async def is_fresh(self):
+        if not self._mirrors_current_tenant():
+            return False
+
+        now = time.monotonic()
+        if (
+            self._checked_at is None
+            or now - self._checked_at >= settings.mirror_freshness_check_interval
+        ):
+            try:
+                state = await self._load_state()
+            except (SQLAlchemyError, OSError):
+                logger.exception("Could not read mirror sync state")
+                state = None
+            self._synced_at = state.synced_at if state is not None else None
+            self._checked_at = now
+
+        return (
+            self._synced_at is not None
+            and (datetime.now(timezone.utc) - self._synced_at).total_seconds()
+            <= settings.mirror_max_staleness
+        )
+
+    async def get_organization_by_name(self, name: str):
+        async with SesionLocal() as session:
+            profile = await session.scalar(
+                select(Organization.profile).where(
+                    Organization.auth0_id.is_not(None), Organization.name == name
+                )
+            )
+        return orjson.dumps(profile) if profile is not None else None
+
+    async def list_organizations(self):
+        async with SesionLocal() as session:
+            profiles = await session.scalars(
+                select(Organization.profile)
+                .where(Organization.auth0_id.is_not(None))
+                .order_by(Organization.name)
+            )
+            return orjson.dumps(list(profiles))
+
+    async def get_user_id_by_email(self, email: str):
+        async with SesionLocal() as session:
+            profile = await session.scalar(
+                select(Employee.profile)
+                .where(Employee.profile.is_not(None), Employee.email == email.lower())
+                .limit(1)
+            )
+        return _identity_user_id(profile) if profile is not None else None
+
+    async def stream_users(self, limit: int = None):
+        # Roster rows (POST /employees/bulk) may carry a user_id too; only
+        # rows written by a sync or a write through this service have a
+        # profile.
+        async with SesionLocal() as session:
+            profiles = await session.stream_scalars(
+                select(Employee.profile)
+                .where(Employee.profile.is_not(None))
+                .order_by(Employee.id)
+                .limit(limit)
+                .execution_options(yield_per=INSERT_CHUNK_SIZE)
+            )
+
+            separator = b"["
+            async for profile in profiles:
+                yield separator + orjson.dumps(profile)
+                separator = b","
+            yield b"[]" if separator == b"[" else b"]"
+
+    async def list_users(self):
+        # GET /api/v2/users without paging parameters answers with its first
+        # page, a bare array of users_per_page users; so does the mirror.
+        return b"".join(
+            [chunk async for chunk in self.stream_users(settings.users_per_page)]
+        )
+
+    async def _write(self, write):
+        # A failed mirror write must not fail the upstream write it follows;
+        # the next sync corrects the row.
+        if not self._mirrors_current_tenant():
+            return
+        try:
+            async with SesionLocal() as session, session.begin():
+                await write(session)
+        except (SQLAlchemyError, OSError):
+            logger.exception("Could not update the mirror after a write")
+
+    async def refresh_organization(self, body: bytes):
+        """Upsert an organization from the body of a Management API write.
+
+        The row is updated in place, so its id and memberships are kept.
+        """
+        await self._write(
+            lambda session: self._upsert_organizations(
+                session, [orjson.loads(body)], datetime.now(timezone.utc)
+            )
+        )
+
+    async def refresh_user(self, body: bytes):
+        """Upsert a user from the body of a Management API write.
+
+        The row is updated in place, so its id and memberships are kept.
+        """
+        await self._write(
+            lambda session: self._upsert_users(
+                session, [orjson.loads(body)], datetime.now(timezone.utc)
+            )
+        )
+
+    async def forget_organization(self, organization_id: str):
+        await self._write(
+            lambda session: session.execute(
+                delete(Organization).where(Organization.auth0_id == organization_id)
+            )
+        )
+
+    async def forget_user(self, user_id: str):
+        await self._write(
+            lambda session: session.execute(
+                delete(Employee).where(Employee.user_id == user_id)
+            )
+        )
+
+
+mirror_synchronizer_obj = MirrorSynchronizer()
@@ -1,37 +1,52 @@
 import json
-
-import aiohttp
+from urllib.parse import urlencode
+
+import orjson
+from employees.services.auth0_client import make_request_with_error_handling
+from employees.services.bulk import run_with_concurrency
+from employees.services.cache import make_cache
+from employees.services.metrics import register_cache
+from employees.services.mirror import mirror_synchronizer_obj
 from fastapi import HTTPException
-from settings import settings
+from settings import current_tenant, settings
 
 
-async def make_request_with_error_handling(
-    method: str, url: str, headers=None, data=None
-):
+def _organization_id(body):
     try:
-        async with aiohttp.ClientSession() as session:
-            response = await session.request(method, url, headers=headers, data=data)
-            response.raise_for_status()
-
-            result = {
-                "status": response.status,
-                "headers": dict(response.headers),
-                "body": await response.text(),
-            }
-
-            return result
-    except aiohttp.ClientResponseError as http_err:
-        raise HTTPException(status_code=http_err.status, detail=http_err.message)
-    except aiohttp.ClientConnectionError as conn_err:
-        raise HTTPException(conn_err)
-    except aiohttp.ClientError as client_err:
-        raise HTTPException(client_err)
-    except Exception as err:
-        raise HTTPException(status_Code=500, detail=err)
+        if isinstance(body, (str, bytes)):
+            body = json.loads(body)
+        return body.get("id")
+    except (ValueError, AttributeError):
+        return None
 
 
 class OrganizationManager:
 
+    def __init__(self):
+        self.cache = make_cache(
+            "organization",
+            max_size=settings.organization_cache_max_size,
+            ttl=settings.organization_cache_ttl,
+        )
+        self.members_cache = make_cache(
+            "organization_members",
+            max_size=settings.organization_members_cache_max_size,
+            ttl=settings.organization_members_cache_ttl,
+        )
+
+    async def invalidate_organization(self, identifier: str = None, name: str = None):
+        await self.cache.delete(("list", settings.tenant_name))
+
+        if name is not None:
+            await self.cache.delete(("name", settings.tenant_name, name))
+
+        if identifier is not None:
+            # Entries whose id cannot be read are dropped too, to stay on the safe side.
+            await self.cache.delete_matching(
+                lambda key, body: _organization_id(body) in (identifier, None),
+                prefix=("name", settings.tenant_name),
+            )
+
     async def create_organization(
         self,
         name: str,
@@ -40,7 +55,7 @@ class OrganizationManager:
         background_color: str = "#e0b9b6",
     ):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations"
+        url = settings.auth0_url("/api/v2/organizations")
 
         payload = json.dumps(
             {
@@ -55,7 +70,7 @@ class OrganizationManager:
                 "metadata": {},
                 "enabled_connections": [
                     {
-                        "connection_id": f"{settings.database_id_connection}",
+                        "connection_id": f"{settings.tenant().database_id_connection}",
                         "assign_membership_on_login": True,
                         "show_as_button": True,
                         "is_signup_enabled": True,
@@ -66,40 +81,59 @@ class OrganizationManager:
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "POST", url, headers=headers, data=payload
         )
 
+        await self.invalidate_organization(name=name)
+
         return response.get("body")
 
     async def get_organization_by_name(self, name: str = "nowy-polski-salon"):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations/name/{name}"
+        cache_key = ("name", settings.tenant_name, name)
+        cached_body = self.cache.get(cache_key)
+        if cached_body is not None:
+            return cached_body
+
+        if await mirror_synchronizer_obj.is_fresh():
+            mirrored_body = await mirror_synchronizer_obj.get_organization_by_name(name)
+            if mirrored_body is not None:
+                await self.cache.set(cache_key, mirrored_body)
+                return mirrored_body
+
+        url = settings.auth0_url(f"/api/v2/organizations/name/{name}")
 
         payload = {}
         headers = {
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "GET", url, headers=headers, data=payload
         )
+
+        await self.cache.set(cache_key, response.get("body"))
+
         return response.get("body")
 
     async def delete_organization_by_identifier(self, identifier: str):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations/{identifier}"
+        url = settings.auth0_url(f"/api/v2/organizations/{identifier}")
 
         payload = {}
-        headers = {"Authorization": f"Bearer {settings.management_api_token}"}
+        headers = {}
 
         response = await make_request_with_error_handling(
             "DELETE", url, headers=headers, data=payload
         )
+
+        await self.invalidate_organization(identifier=identifier)
+        await self.invalidate_members(identifier)
+        await mirror_synchronizer_obj.forget_organization(identifier)
+
         return response.get("body")
 
     async def modify_organization(
@@ -112,7 +146,7 @@ class OrganizationManager:
         background_color: str = None,
     ):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations/{identifier}"
+        url = settings.auth0_url(f"/api/v2/organizations/{identifier}")
 
         payload = {
             "name": name,
@@ -136,24 +170,24 @@ class OrganizationManager:
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "PATCH", url, headers=headers, data=json.dumps(payload)
         )
+
+        await self.invalidate_organization(identifier=identifier, name=name)
+        await mirror_synchronizer_obj.refresh_organization(response.get("body"))
+
         return response.get("body")
 
     async def change_client_type(self, client_id: str, app_type: str):
-        url = (
-            f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/clients/{client_id}"
-        )
+        url = settings.auth0_url(f"/api/v2/clients/{client_id}")
 
         payload = json.dumps({"app_type": f"{app_type}"})
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
@@ -162,34 +196,136 @@ class OrganizationManager:
 
         return response.get("body")
 
-    async def get_organizations_list(self, tenant):
-        url = f"https://{tenant}.eu.auth0.com/api/v2/organizations"
+    async def get_organizations_list(self, tenant: str = None):
+        tenant = tenant or settings.tenant_name
+        if tenant != settings.tenant_name:
+            # Another tenant's list is read with that tenant's own client.
+            if not settings.is_known_tenant(tenant):
+                raise HTTPException(status_code=400, detail="Unknown tenant")
+            token = current_tenant.set(tenant)
+            try:
+                return await self.get_organizations_list(tenant)
+            finally:
+                current_tenant.reset(token)
+
+        cache_key = ("list", tenant)
+        cached_body = self.cache.get(cache_key)
+        if cached_body is not None:
+            return cached_body
+
+        if await mirror_synchronizer_obj.is_fresh():
+            mirrored_body = await mirror_synchronizer_obj.list_organizations()
+            await self.cache.set(cache_key, mirrored_body)
+            return mirrored_body
+
+        url = settings.auth0_url("/api/v2/organizations")
 
         payload = {}
         headers = {
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "GET", url, headers=headers, data=payload
         )
 
+        await self.cache.set(cache_key, response.get("body"))
+
         return response.get("body")
 
-    async def remove_user_from_organization(self, user_id: str, organization_id: str):
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations/{organization_id}/members/{user_id}"
+    async def invalidate_members(self, organization_id: str):
+        await self.members_cache.delete_matching(
+            lambda key, _: True, prefix=(settings.tenant_name, organization_id)
+        )
+
+    async def list_members(
+        self,
+        organization_id: str,
+        cursor: str = None,
+        limit: int = None,
+        expand_roles: bool = False,
+    ):
+        """List one page of organization members.
+
+        Paging follows Auth0's checkpoint pagination: ``next_cursor`` is the
+        upstream ``next`` checkpoint and is passed back as ``cursor``. With
+        ``expand_roles`` every member's roles are fetched concurrently, at
+        most ``organization_members_roles_concurrency`` at a time.
+        """
+        limit = limit or settings.organization_members_per_page
+        cache_key = (
+            settings.tenant_name,
+            organization_id,
+            cursor,
+            limit,
+            expand_roles,
+        )
+        cached_page = self.members_cache.get(cache_key)
+        if cached_page is not None:
+            return cached_page
+
+        query = {"take": limit}
+        if cursor is not None:
+            query["from"] = cursor
+        url = settings.auth0_url(
+            f"/api/v2/organizations/{organization_id}/members?{urlencode(query)}"
+        )
 
         payload = {}
         headers = {
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
+
         response = await make_request_with_error_handling(
             "GET", url, headers=headers, data=payload
         )
 
+        received_payload = orjson.loads(response.get("body"))
+        members = received_payload.get("members", [])
+
+        if expand_roles:
+            await self._expand_member_roles(organization_id, members)
+
+        page = {"members": members, "next_cursor": received_payload.get("next")}
+        await self.members_cache.set(cache_key, page)
+
+        return page
+
+    async def _expand_member_roles(self, organization_id: str, members: list):
+        async def fetch_roles(member):
+            url = settings.auth0_url(
+                f"/api/v2/organizations/{organization_id}"
+                f"/members/{member['user_id']}/roles"
+            )
+            response = await make_request_with_error_handling(
+                "GET", url, headers={"Accept": "application/json"}, data={}
+            )
+            return orjson.loads(response.get("body"))
+
+        async for index, roles, exc in run_with_concurrency(
+            members, fetch_roles, settings.organization_members_roles_concurrency
+        ):
+            if exc is not None:
+                raise exc
+            members[index]["roles"] = roles
+
+    async def remove_user_from_organization(self, user_id: str, organization_id: str):
+        url = settings.auth0_url(f"/api/v2/organizations/{organization_id}/members")
+
+        payload = json.dumps({"members": [user_id]})
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        response = await make_request_with_error_handling(
+            "DELETE", url, headers=headers, data=payload
+        )
+
+        await self.invalidate_members(organization_id)
+
         return response.get("body")
 
 
 organization_manager_obj = OrganizationManager()
+register_cache("organization", organization_manager_obj.cache)
+register_cache("organization_members", organization_manager_obj.members_cache)
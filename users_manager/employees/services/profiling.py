@@ -0,0 +1,83 @@
+import asyncio
+import cProfile
+import hmac
+import random
+import re
+import time
+from pathlib import Path
+
+from settings import settings
+
+
+def _should_profile(scope):
+    if settings.profiling_token:
+        header = settings.profiling_header.lower().encode()
+        for name, value in scope["headers"]:
+            if name == header and hmac.compare_digest(
+                value, settings.profiling_token.encode()
+            ):
+                return True
+    return random.random() < settings.profiling_sample_rate
+
+
+def _profile_name(scope):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")[:80] or "root"
+    timestamp = time.strftime("%Y%m%dT%H%M%S")
+    unique = f"{time.time_ns() % 10**6:06d}"
+    return f"{timestamp}-{unique}-{scope['method']}-{slug}.prof"
+
+
+def _write_profile(profiler: cProfile.Profile, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(path)
+
+    profiles = sorted(path.parent.glob("*.prof"), key=lambda file: file.stat().st_mtime)
+    for old_profile in profiles[: -settings.profiling_max_files]:
+        old_profile.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Profiles selected requests with cProfile.
+
+    A request is profiled when it carries ``profiling_header`` set to
+    ``profiling_token`` or is picked at ``profiling_sample_rate``. The stats
+    are written in pstats format to ``profiling_dir`` (open them with e.g.
+    ``snakeviz`` or ``flameprof``), keeping the newest ``profiling_max_files``;
+    the file name is returned in ``X-Profile-File``.
+
+    cProfile sees the whole event-loop thread, so coroutines of concurrent
+    requests show up in a profile too, and only one request is profiled at a
+    time. The middleware is only installed when ``profiling_enabled`` is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy or not _should_profile(scope):
+            return await self.app(scope, receive, send)
+
+        file_name = _profile_name(scope)
+        path = Path(settings.profiling_dir) / file_name
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile-file", file_name.encode()),
+                    ],
+                }
+            await send(message)
+
+        self._busy = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._busy = False
+            await asyncio.to_thread(_write_profile, profiler, path)
@@ -0,0 +1,127 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+PRIORITY_READ = 0
+PRIORITY_WRITE = 1
+PRIORITY_BULK = 2
+
+request_priority = ContextVar("request_priority", default=None)
+
+
+class RateLimitScheduler:
+    """Client-side token bucket shared by every call to the Management API.
+
+    Calls wait for a token instead of being sent straight away. Waiting calls
+    are released by priority (lower first) and in arrival order within a
+    priority, so interactive reads go ahead of bulk jobs. The bucket size and
+    refill rate follow the ``X-RateLimit-*`` headers of upstream responses,
+    and a 429 pauses the whole bucket until ``Retry-After`` has passed.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.default_rate = rate
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._dispatcher = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+        return now
+
+    def _delay(self):
+        now = self._refill()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self, priority: int = PRIORITY_WRITE):
+        if not self._waiters and self._delay() == 0:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            delay = self._delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            # Waiters cancelled while queued are dropped without using a token.
+            if not future.done():
+                self._tokens -= 1
+                future.set_result(None)
+
+    def pause(self, seconds: float):
+        now = self._refill()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+
+    def update_from_headers(self, headers):
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset = float(headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        self._refill()
+        self.capacity = max(limit, 1)
+        self._tokens = min(self._tokens, float(remaining))
+
+        seconds_to_reset = reset - time.time()
+        if remaining < limit and seconds_to_reset > 0:
+            self.rate = (limit - remaining) / seconds_to_reset
+        else:
+            self.rate = self.default_rate
+
+    def stats(self):
+        self._refill()
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": self._tokens,
+            "waiting": len(self._waiters),
+        }
+
+
+def retry_after_seconds(headers, default: float = 1.0):
+    retry_after = headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            try:
+                return max(
+                    parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0
+                )
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0.0)
+    except (KeyError, ValueError):
+        return default
@@ -0,0 +1,130 @@
+import random
+import time
+from urllib.parse import urlparse
+
+from fastapi import HTTPException
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+_STATIC_PATH_SEGMENTS = frozenset(
+    {
+        "api",
+        "v2",
+        "users",
+        "users-by-email",
+        "organizations",
+        "name",
+        "members",
+        "roles",
+        "invitations",
+        "clients",
+        "jobs",
+        "users-imports",
+        "dbconnections",
+        "change_password",
+        "oauth",
+        "token",
+    }
+)
+
+
+def template_path(url: str):
+    """Turn an upstream URL into a low-cardinality path template.
+
+    ``/api/v2/organizations/org_123/members`` becomes
+    ``/api/v2/organizations/{id}/members``; query strings are dropped.
+    """
+    segments = urlparse(url).path.split("/")
+    return "/".join(
+        segment if not segment or segment in _STATIC_PATH_SEGMENTS else "{id}"
+        for segment in segments
+    )
+
+
+def backoff_delay(attempt: int, base: float, cap: float):
+    # "Full jitter": spreads retries of concurrent callers over the window.
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """Fails calls fast while an upstream endpoint keeps failing.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds. It then lets a single trial
+    call through; its outcome closes the breaker or opens it again. A trial
+    that never reports back (e.g. cancelled) stops blocking further trials
+    after another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = None
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            retry_after = self._opened_at + self.reset_timeout - time.monotonic()
+            if retry_after > 0:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Upstream is unavailable, circuit breaker is open",
+                    headers={"Retry-After": str(max(1, round(retry_after)))},
+                )
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            now = time.monotonic()
+            if (
+                self._trial_started_at is not None
+                and now - self._trial_started_at < self.reset_timeout
+            ):
+                raise HTTPException(
+                    status_code=503,
+                    detail="Upstream is unavailable, circuit breaker is half-open",
+                )
+            self._trial_started_at = now
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_started_at = None
+
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class CircuitBreakerRegistry:
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+
+    def get(self, method: str, url: str):
+        key = (method, urlparse(url).netloc, template_path(url))
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+        return breaker
+
+    def states(self):
+        return {
+            f"{method} {host}{path}": breaker.state
+            for (method, host, path), breaker in self._breakers.items()
+        }
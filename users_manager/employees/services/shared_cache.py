@@ -0,0 +1,275 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+import orjson
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_last_used
+    ON cache_entries (namespace, last_used);
+"""
+
+
+# Seconds a write waits for another worker's write lock.
+_BUSY_TIMEOUT = 5
+
+# Keys per DELETE statement, under SQLite's bound-parameter limit.
+_DELETE_BATCH_SIZE = 500
+
+
+def _encode_key(key):
+    return orjson.dumps(list(key) if isinstance(key, tuple) else key).decode()
+
+
+def _decode_key(raw: str):
+    key = orjson.loads(raw)
+    return tuple(key) if isinstance(key, list) else key
+
+
+def _encode_value(value):
+    # Raw upstream bodies are stored as-is; everything else as JSON.
+    if isinstance(value, bytes):
+        return b"b" + value
+    return b"j" + orjson.dumps(value)
+
+
+def _decode_value(raw: bytes):
+    raw = bytes(raw)
+    return raw[1:] if raw[:1] == b"b" else orjson.loads(raw[1:])
+
+
+class SharedTTLCache:
+    """``TTLCache`` look-alike shared by every worker process on the host.
+
+    Entries live in a SQLite database that defaults to ``/dev/shm`` (tmpfs),
+    opened in WAL mode with a memory-mapped file, so workers read each
+    other's entries without any server and a ``delete`` in one worker is
+    seen by all of them. Each cache uses its own ``namespace`` in the file.
+    Expiry uses wall-clock time; eviction drops the least recently used
+    entries. Recency is approximate: a hit only writes ``last_used`` back
+    when the stored value is older than ``touch_interval`` seconds, and
+    skips it if another worker holds the write lock, so reads do not
+    serialise on SQLite's write lock. Writes are coroutines that run in a
+    thread on a connection of their own, so waiting for another worker's
+    write lock never blocks the event loop or the reads on it. Hit and miss
+    counters are per process.
+
+    Values must be bytes or JSON-serialisable, keys strings or tuples of
+    JSON scalars.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str,
+        max_size: int,
+        ttl: float,
+        mmap_size: int,
+        touch_interval: float = 10.0,
+    ):
+        self.namespace = namespace
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.mmap_size = mmap_size
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._connection = None
+        self._write_connection = None
+        self._pid = None
+
+    def _ensure_connected(self):
+        # Connections must not be shared with a forked child.
+        with self._connect_lock:
+            if self._pid != os.getpid():
+                self._connection = self._connect()
+                self._write_connection = self._connect()
+                self._pid = os.getpid()
+
+    @property
+    def connection(self):
+        """Connection for reads, used on the event loop."""
+        self._ensure_connected()
+        return self._connection
+
+    @property
+    def write_connection(self):
+        """Connection for writes, used from ``asyncio.to_thread``."""
+        self._ensure_connected()
+        return self._write_connection
+
+    def _connect(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        os.close(fd)
+
+        connection = sqlite3.connect(
+            self.path,
+            timeout=_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _execute(self, statement: str, parameters=()):
+        with self._lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def _write(self, write, *args):
+        with self._write_lock:
+            connection = self.write_connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                write(connection, *args)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def __len__(self):
+        return self._execute(
+            "SELECT COUNT(*) FROM cache_entries"
+            " WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, time.time()),
+        )[0][0]
+
+    def get(self, key, default=None):
+        now = time.time()
+        encoded_key = _encode_key(key)
+
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value, last_used FROM cache_entries"
+                " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, encoded_key, now),
+            ).fetchone()
+            if row is not None and now - row[1] >= self.touch_interval:
+                self._touch(encoded_key, now)
+
+        if row is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return _decode_value(row[0])
+
+    def _touch(self, encoded_key: str, now: float):
+        connection = self.connection
+        connection.execute("PRAGMA busy_timeout = 0")
+        try:
+            connection.execute(
+                "UPDATE cache_entries SET last_used = ?"
+                " WHERE namespace = ? AND key = ? AND last_used < ?",
+                (now, self.namespace, encoded_key, now),
+            )
+        except sqlite3.OperationalError:
+            # Another worker is writing; eviction order just stays coarser.
+            pass
+        finally:
+            connection.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT * 1000}")
+
+    async def set(self, key, value, ttl: float = None):
+        await asyncio.to_thread(self._write, self._set, key, value, ttl)
+
+    def _set(self, connection, key, value, ttl: float):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries"
+            " (namespace, key, value, expires_at, last_used)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, _encode_key(key), _encode_value(value), expires_at, now),
+        )
+        self._evict(connection, now)
+
+    def _evict(self, connection, now: float):
+        count = (
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,),
+        )
+        if connection.execute(*count).fetchone()[0] <= self.max_size:
+            return
+
+        connection.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, now),
+        )
+        excess = connection.execute(*count).fetchone()[0] - self.max_size
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ?"
+                " ORDER BY last_used LIMIT ?)",
+                (self.namespace, self.namespace, excess),
+            )
+
+    async def delete(self, key):
+        await asyncio.to_thread(self._write, self._delete_keys, [_encode_key(key)])
+
+    def _delete_keys(self, connection, encoded_keys: list):
+        for start in range(0, len(encoded_keys), _DELETE_BATCH_SIZE):
+            batch = encoded_keys[start : start + _DELETE_BATCH_SIZE]
+            connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ?"
+                f" AND key IN ({', '.join('?' * len(batch))})",
+                (self.namespace, *batch),
+            )
+
+    async def delete_matching(self, predicate, prefix: tuple = ()):
+        """Delete the entries for which ``predicate(key, value)`` is true.
+
+        Only keys that are tuples starting with ``prefix`` are read and
+        decoded; they are found through the primary key, not a scan of the
+        namespace. The matches are deleted in the same transaction.
+        """
+        await asyncio.to_thread(self._write, self._delete_matching, predicate, prefix)
+
+    def _delete_matching(self, connection, predicate, prefix: tuple):
+        query = "SELECT key, value FROM cache_entries WHERE namespace = ?"
+        parameters = [self.namespace]
+        if prefix:
+            # Encoded tuples starting with the prefix share this text prefix.
+            lower = _encode_key(prefix)[:-1]
+            query += " AND key >= ? AND key < ?"
+            parameters += [lower, lower + "\U0010ffff"]
+
+        self._delete_keys(
+            connection,
+            [
+                raw_key
+                for raw_key, raw_value in connection.execute(query, parameters)
+                if predicate(_decode_key(raw_key), _decode_value(raw_value))
+            ],
+        )
+
+    def clear(self):
+        self._execute(
+            "DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        )
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+from fastapi import HTTPException
+from settings import settings
+
+
+class StaticTokenProvider:
+    """Hands out a fixed Management API token, e.g. one pasted into ``.env``."""
+
+    def __init__(self, token: str):
+        self.token = token
+
+    async def get_token(self):
+        return self.token
+
+    def invalidate(self, token: str):
+        return False
+
+
+class ClientCredentialsTokenProvider:
+    """Obtains Management API tokens with the client-credentials grant.
+
+    Tokens are cached in memory and refreshed ``refresh_margin`` seconds before
+    they expire. Only one refresh runs at a time; every coroutine asking for a
+    token while it is in flight waits for that same refresh.
+    """
+
+    def __init__(
+        self,
+        client,
+        token_url: str,
+        client_id: str,
+        client_secret: str,
+        audience: str,
+        refresh_margin: int = 300,
+    ):
+        self.client = client
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.audience = audience
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_task = None
+
+    async def get_token(self):
+        now = time.monotonic()
+
+        if self._token is None or now >= self._expires_at:
+            return await self._refresh()
+
+        if now >= self._expires_at - self.refresh_margin:
+            self._start_refresh()
+
+        return self._token
+
+    def invalidate(self, token: str):
+        if token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+        return True
+
+    def _start_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._fetch_and_store())
+            self._refresh_task.add_done_callback(_consume_exception)
+        return self._refresh_task
+
+    async def _refresh(self):
+        return await asyncio.shield(self._start_refresh())
+
+    async def _fetch_and_store(self):
+        token, expires_in = await self._fetch_token()
+        self._token = token
+        self._expires_at = time.monotonic() + expires_in
+        return token
+
+    async def _fetch_token(self):
+        payload = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "audience": self.audience,
+        }
+
+        async with self.client.session.post(self.token_url, json=payload) as response:
+            if response.status >= 400:
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Could not obtain Management API token, upstream returned {response.status}",
+                )
+            received_payload = await response.json()
+
+        return received_payload["access_token"], int(received_payload["expires_in"])
+
+
+def _consume_exception(task):
+    # Background refreshes may fail with nobody awaiting them.
+    if not task.cancelled():
+        task.exception()
+
+
+def build_token_provider(client, tenant=None):
+    tenant = tenant or settings.tenant(settings.tenant_domain)
+
+    if tenant.management_api_client_id and tenant.management_api_client_secret:
+        return ClientCredentialsTokenProvider(
+            client,
+            token_url=settings.auth0_url("/oauth/token", tenant.domain),
+            client_id=tenant.management_api_client_id,
+            client_secret=tenant.management_api_client_secret,
+            audience=tenant.management_api_audience
+            or settings.auth0_url("/api/v2/", tenant.domain),
+            refresh_margin=settings.management_api_token_refresh_margin,
+        )
+
+    return StaticTokenProvider(tenant.management_api_token)
@@ -0,0 +1,176 @@
+import asyncio
+import gzip
+import json
+import tempfile
+
+import aiohttp
+import orjson
+from employees.services.auth0_client import (
+    make_request_with_error_handling,
+    tenant_clients_obj,
+)
+from employees.services.deadline import deadline_exceeded_error, remaining_time
+from fastapi import HTTPException
+from settings import settings
+
+# Page-based GET /api/v2/users only reaches the first 1000 users of a query
+# (page * per_page + per_page <= 1000); anything past it needs an export job.
+AUTH0_USERS_PAGE_LIMIT = 1000
+
+EXPORT_FIELDS = (
+    "user_id",
+    "email",
+    "email_verified",
+    "username",
+    "name",
+    "given_name",
+    "family_name",
+    "nickname",
+    "picture",
+    "blocked",
+    "created_at",
+    "updated_at",
+    "last_login",
+    "logins_count",
+    "app_metadata",
+    "user_metadata",
+    "identities[0].connection",
+    "identities[0].provider",
+    "identities[0].user_id",
+    "identities[0].isSocial",
+)
+
+_IDENTITY_PREFIX = "identities[0]."
+
+FAILED_JOB_STATUSES = frozenset({"failed", "expired"})
+
+
+def normalize_exported_user(record: dict):
+    """Give an exported user the shape GET /api/v2/users has.
+
+    The export flattens nested fields into keys like
+    ``"identities[0].user_id"``; they are folded back into ``identities``.
+    """
+    identity = {
+        key.removeprefix(_IDENTITY_PREFIX): record.pop(key)
+        for key in [key for key in record if key.startswith(_IDENTITY_PREFIX)]
+    }
+    if identity:
+        record["identities"] = [identity]
+    return record
+
+
+def iter_exported_users(file):
+    """Yield the users of a downloaded export file (gzipped NDJSON)."""
+    with gzip.GzipFile(fileobj=file, mode="rb") as lines:
+        for line in lines:
+            if line.strip():
+                yield normalize_exported_user(orjson.loads(line))
+
+
+class UserExporter:
+    """Reads every user of the tenant through a users-export job.
+
+    The job is created, polled every ``users_export_poll_interval`` seconds
+    until it completes and its file is downloaded into a spooled temporary
+    file, all before anything is handed to the caller, so a failure can still
+    be reported as an error. Waiting is bounded by the request deadline when
+    there is one, else by ``users_export_timeout``.
+    """
+
+    async def _create_job(self):
+        url = settings.auth0_url("/api/v2/jobs/users-exports")
+
+        payload = json.dumps(
+            {"format": "json", "fields": [{"name": name} for name in EXPORT_FIELDS]}
+        )
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "POST", url, headers=headers, data=payload
+        )
+        return orjson.loads(response.get("body"))
+
+    async def _get_job(self, job_id: str):
+        url = settings.auth0_url(f"/api/v2/jobs/{job_id}")
+
+        payload = {}
+        headers = {
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "GET", url, headers=headers, data=payload
+        )
+        return orjson.loads(response.get("body"))
+
+    async def _wait_for_location(self, job: dict):
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + settings.users_export_timeout
+        interval = settings.users_export_poll_interval
+
+        while job.get("status") != "completed":
+            if job.get("status") in FAILED_JOB_STATUSES:
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Users export job {job['id']} {job['status']}",
+                )
+            remaining = remaining_time()
+            if remaining is not None and remaining <= interval:
+                raise deadline_exceeded_error()
+            if loop.time() + interval > give_up_at:
+                raise HTTPException(
+                    status_code=504, detail="Users export job did not finish in time"
+                )
+            await asyncio.sleep(interval)
+            job = await self._get_job(job["id"])
+
+        return job["location"]
+
+    async def _download_into(self, file, location: str):
+        # The location is a pre-signed URL; it must not get our bearer token.
+        timeout = aiohttp.ClientTimeout(
+            total=remaining_time() or settings.users_export_timeout
+        )
+        session = tenant_clients_obj.get().session
+        try:
+            async with session.get(location, timeout=timeout) as response:
+                if response.status >= 400:
+                    raise HTTPException(
+                        status_code=502,
+                        detail=f"Could not download users export, upstream returned {response.status}",
+                    )
+                async for chunk in response.content.iter_chunked(1 << 16):
+                    file.write(chunk)
+        except asyncio.TimeoutError:
+            if remaining_time() is not None:
+                raise deadline_exceeded_error()
+            raise HTTPException(
+                status_code=504, detail="Users export download timed out"
+            )
+        except aiohttp.ClientError as client_err:
+            raise HTTPException(
+                status_code=502, detail=f"Could not download users export: {client_err}"
+            )
+
+    async def export(self):
+        """Run an export job and return its file, rewound, for ``iter_exported_users``."""
+        job = await self._create_job()
+        location = await self._wait_for_location(job)
+
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.users_export_spool_max_size
+        )
+        try:
+            await self._download_into(file, location)
+        except BaseException:
+            file.close()
+            raise
+        file.seek(0)
+        return file
+
+
+user_exporter_obj = UserExporter()
@@ -1,41 +1,109 @@
+import asyncio
+import base64
 import json
+import math
 import secrets
+from urllib.parse import urlencode
 
 import aiohttp
+import orjson
+from employees.schemas import CreateUser
+from employees.services.auth0_client import make_request_with_error_handling
+from employees.services.background import email_queue_obj
+from employees.services.bulk import error_result, run_with_concurrency
+from employees.services.mirror import mirror_synchronizer_obj
+from employees.services.organization import organization_manager_obj
+from employees.services.rate_limiter import PRIORITY_BULK
+from employees.services.cache import make_cache
+from employees.services.metrics import register_cache
+from employees.services.user_export import (
+    AUTH0_USERS_PAGE_LIMIT,
+    FAILED_JOB_STATUSES,
+    iter_exported_users,
+    user_exporter_obj,
+)
 from fastapi import HTTPException
+from pydantic import ValidationError
 from settings import settings
 
+USER_NOT_FOUND = "__user_not_found__"
 
-async def make_request_with_error_handling(
-    method: str, url: str, headers=None, data=None
-):
+
+def _user_id_from_created_user(body):
     try:
-        async with aiohttp.ClientSession() as session:
-            response = await session.request(method, url, headers=headers, data=data)
-            response.raise_for_status()
-
-            result = {
-                "status": response.status,
-                "headers": dict(response.headers),
-                "body": await response.text(),
-            }
+        return str(json.loads(body)["identities"][0]["user_id"])
+    except (ValueError, TypeError, KeyError, IndexError):
+        return None
+
+
+def _user_id_cache_key(email: str):
+    return (settings.tenant_name, email.lower())
+
 
-            return result
-    except aiohttp.ClientResponseError as http_err:
-        raise HTTPException(status_code=http_err.status, detail=http_err.message)
-    except aiohttp.ClientConnectionError as conn_err:
-        raise HTTPException(conn_err)
-    except aiohttp.ClientError as client_err:
-        raise HTTPException(client_err)
-    except Exception as err:
-        raise HTTPException(status_Code=500, detail=err)
+def _json_array_items(body):
+    # b'[{"a":1},{"b":2}]' -> b'{"a":1},{"b":2}', without decoding the items.
+    if isinstance(body, str):
+        body = body.encode()
+    return body.strip()[1:-1].strip()
+
+
+def _reachable_by_pages(total: int, per_page: int):
+    # Upstream refuses pages that end past AUTH0_USERS_PAGE_LIMIT.
+    return min(total, AUTH0_USERS_PAGE_LIMIT // per_page * per_page)
+
+
+async def _stream_exported_users(file, batch_size: int = 1000):
+    try:
+        separator, batch = b"[", []
+        for user in iter_exported_users(file):
+            batch.append(orjson.dumps(user))
+            if len(batch) == batch_size:
+                yield separator + b",".join(batch)
+                separator, batch = b",", []
+        if batch:
+            yield separator + b",".join(batch)
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+    finally:
+        file.close()
+
+
+def encode_users_cursor(page: int, per_page: int):
+    raw = json.dumps({"page": page, "per_page": per_page}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_users_cursor(cursor: str):
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        page, per_page = int(decoded["page"]), int(decoded["per_page"])
+        # Same bounds as the page and per_page query parameters.
+        if page < 0 or not 1 <= per_page <= 100:
+            raise ValueError("Cursor out of range")
+        return page, per_page
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 class UserManager:
 
-    async def create_user(self, email: str, name: str, family_name: str, username: str):
+    def __init__(self):
+        self.user_id_cache = make_cache(
+            "user_id",
+            max_size=settings.user_id_cache_max_size,
+            ttl=settings.user_id_cache_ttl,
+        )
+
+    async def create_user(
+        self,
+        email: str,
+        name: str,
+        family_name: str,
+        username: str,
+        send_password_email: bool = True,
+    ):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/users"
+        url = settings.auth0_url("/api/v2/users")
         new_password = secrets.token_urlsafe(8)
         payload = json.dumps(
             {
@@ -54,24 +122,197 @@ class UserManager:
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "POST", url, headers=headers, data=payload
         )
 
-        await self.send_email_with_password_change(email)
+        user_id = _user_id_from_created_user(response.get("body"))
+        if user_id is not None:
+            await self.user_id_cache.set(_user_id_cache_key(email), user_id)
+        else:
+            await self.user_id_cache.delete(_user_id_cache_key(email))
+
+        if send_password_email:
+            await self.schedule_password_email(email)
 
         return response.get("body")
 
-    async def list_users(self):
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/users"
+    async def schedule_password_email(self, email: str):
+        # The user exists by now, so a full queue must not fail the request;
+        # the job is recorded as failed instead and the email can be requested
+        # again through POST /user/password-reset/request.
+        try:
+            return email_queue_obj.submit(self.send_email_with_password_change, email)
+        except asyncio.QueueFull:
+            return email_queue_obj.record_failed("Email queue is full")
+
+    async def schedule_import_password_emails(self, job_id: str, emails: list):
+        return email_queue_obj.spawn(
+            self.queue_password_emails_after_import, job_id, list(emails)
+        )
+
+    async def queue_password_emails_after_import(self, job_id: str, emails: list):
+        """Queue the password-change email for the users an import job created.
+
+        Import jobs create users without a password, the same as
+        ``create_user``, but Auth0 sends them nothing. This is spawned rather
+        than queued, so waiting up to ``users_import_timeout`` for the job
+        does not hold an email worker. Once it completes, every user it did
+        not report as failed gets an email job of their own, queued as
+        there is room.
+        """
+        await self._wait_for_import_job(job_id)
+        errors = await self.get_job_errors(job_id)
+        not_imported = {
+            error.get("user", {}).get("email")
+            for error in orjson.loads(errors or b"[]")
+        }
+
+        for email in emails:
+            if email not in not_imported:
+                await email_queue_obj.put(self.send_email_with_password_change, email)
+
+    async def _wait_for_import_job(self, job_id: str):
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + settings.users_import_timeout
+
+        while True:
+            job = orjson.loads(await self.get_job(job_id))
+            if job.get("status") == "completed":
+                return job
+            if job.get("status") in FAILED_JOB_STATUSES:
+                # 424 rather than 5xx: the email queue must not retry a job
+                # that can no longer complete.
+                raise HTTPException(
+                    status_code=424,
+                    detail=f"Users import job {job_id} {job['status']}",
+                )
+            if loop.time() + settings.users_import_poll_interval > give_up_at:
+                raise HTTPException(
+                    status_code=504, detail="Users import job did not finish in time"
+                )
+            await asyncio.sleep(settings.users_import_poll_interval)
+
+    async def create_users_in_bulk(self, rows: list, concurrency: int = None):
+        async def create(row):
+            user = CreateUser.model_validate(row)
+            body = await self.create_user(
+                email=user.email,
+                name=user.name,
+                family_name=user.family_name,
+                username=user.username,
+            )
+            return {"status": "created", "user_id": _user_id_from_created_user(body)}
+
+        async for index, result, exc in run_with_concurrency(
+            rows,
+            create,
+            concurrency or settings.bulk_users_concurrency,
+            priority=PRIORITY_BULK,
+        ):
+            email = rows[index].get("email") if isinstance(rows[index], dict) else None
+            yield {"row": index, "email": email, **(result or error_result(exc))}
+
+    async def import_users(self, rows: list):
+        url = settings.auth0_url("/api/v2/jobs/users-imports")
+
+        users, invalid_rows = [], []
+        for index, row in enumerate(rows):
+            try:
+                user = CreateUser.model_validate(row)
+            except ValidationError as exc:
+                invalid_rows.append({"row": index, "detail": str(exc)})
+                continue
+            users.append(
+                {
+                    "email": user.email,
+                    "email_verified": False,
+                    "name": user.name,
+                    "family_name": user.family_name,
+                    "username": user.username,
+                }
+            )
+
+        if invalid_rows:
+            raise HTTPException(status_code=422, detail=invalid_rows)
+
+        with aiohttp.MultipartWriter("form-data") as payload:
+            part = payload.append(
+                json.dumps(users), {"Content-Type": "application/json"}
+            )
+            part.set_content_disposition(
+                "form-data", name="users", filename="users.json"
+            )
+            for name, value in (
+                ("connection_id", settings.tenant().database_id_connection),
+                ("upsert", "false"),
+                ("send_completion_email", "false"),
+            ):
+                payload.append(value).set_content_disposition("form-data", name=name)
+
+        headers = {
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "POST", url, headers=headers, data=payload
+        )
+
+        return response.get("body")
+
+    async def get_job(self, job_id: str):
+        url = settings.auth0_url(f"/api/v2/jobs/{job_id}")
+
+        payload = {}
+        headers = {
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "GET", url, headers=headers, data=payload
+        )
+
+        return response.get("body")
+
+    async def get_job_errors(self, job_id: str):
+        url = settings.auth0_url(f"/api/v2/jobs/{job_id}/errors")
+
+        payload = {}
+        headers = {
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "GET", url, headers=headers, data=payload
+        )
+
+        return response.get("body")
+
+    async def list_users(
+        self, page: int = None, per_page: int = None, include_totals: bool = True
+    ):
+        if (
+            page is None
+            and per_page is None
+            and await mirror_synchronizer_obj.is_fresh()
+        ):
+            return await mirror_synchronizer_obj.list_users()
+
+        url = settings.auth0_url("/api/v2/users")
+
+        if page is not None or per_page is not None:
+            query = {
+                "page": page or 0,
+                "per_page": per_page or settings.users_per_page,
+                "include_totals": "true" if include_totals else "false",
+            }
+            url = f"{url}?{urlencode(query)}"
 
         payload = {}
         headers = {
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
@@ -80,16 +321,114 @@ class UserManager:
 
         return response.get("body")
 
+    async def list_users_by_cursor(self, cursor: str = None, per_page: int = None):
+        """One page of users and the cursor of the next one.
+
+        Paging stops where upstream does, within the first
+        ``AUTH0_USERS_PAGE_LIMIT`` users; ``truncated`` then says the rest is
+        only available through ``list_all_users``.
+        """
+        if cursor is not None:
+            page, per_page = decode_users_cursor(cursor)
+        else:
+            page, per_page = 0, per_page or settings.users_per_page
+
+        if (page + 1) * per_page > AUTH0_USERS_PAGE_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Only the first {AUTH0_USERS_PAGE_LIMIT} users can be paged "
+                "through; use fetch_all=true for the rest",
+            )
+
+        received_payload = orjson.loads(await self.list_users(page, per_page))
+        users = received_payload["users"]
+
+        total = received_payload["total"]
+        reachable = _reachable_by_pages(total, per_page)
+        has_next_page = (page + 1) * per_page < reachable
+
+        return {
+            "users": users,
+            "total": total,
+            "truncated": total > reachable,
+            "next_cursor": (
+                encode_users_cursor(page + 1, per_page) if has_next_page else None
+            ),
+        }
+
+    async def list_all_users(self, per_page: int = None):
+        """Fetch every user of the tenant.
+
+        Everything that talks to upstream happens before this returns, so a
+        failure is still an error response rather than a truncated 200. Up to
+        ``AUTH0_USERS_PAGE_LIMIT`` users the pages are fetched concurrently,
+        at most ``users_fetch_concurrency`` at a time, without totals so that
+        each upstream body is a bare JSON array whose items are passed
+        through undecoded. Past that limit page-based listing cannot reach the
+        rest, so the users come from a users-export job instead. The returned
+        async generator yields the combined array chunk by chunk.
+        """
+        if await mirror_synchronizer_obj.is_fresh():
+            return mirror_synchronizer_obj.stream_users()
+
+        per_page = per_page or settings.users_per_page
+
+        first_page = orjson.loads(await self.list_users(0, per_page))
+        if first_page["total"] > _reachable_by_pages(first_page["total"], per_page):
+            return _stream_exported_users(await user_exporter_obj.export())
+
+        page_count = math.ceil(first_page["total"] / per_page)
+        semaphore = asyncio.Semaphore(settings.users_fetch_concurrency)
+
+        async def fetch_page(page: int):
+            async with semaphore:
+                body = await self.list_users(page, per_page, include_totals=False)
+                return _json_array_items(body)
+
+        pending_pages = [
+            asyncio.ensure_future(fetch_page(page)) for page in range(1, page_count)
+        ]
+        try:
+            pages = [_json_array_items(orjson.dumps(first_page["users"]))]
+            pages.extend(await asyncio.gather(*pending_pages))
+        finally:
+            for task in pending_pages:
+                task.cancel()
+
+        async def stream_users():
+            yield b"["
+            separator = b""
+            for users in pages:
+                if users:
+                    yield separator + users
+                    separator = b","
+            yield b"]"
+
+        return stream_users()
+
     async def get_user_id_by_email(self, email: str):
+        cached_user_id = self.user_id_cache.get(_user_id_cache_key(email))
+        if cached_user_id == USER_NOT_FOUND:
+            raise HTTPException(status_code=404, detail="User not found")
+        if cached_user_id is not None:
+            return cached_user_id
+
+        if await mirror_synchronizer_obj.is_fresh():
+            mirrored_user_id = await mirror_synchronizer_obj.get_user_id_by_email(email)
+            if mirrored_user_id is not None:
+                await self.user_id_cache.set(
+                    _user_id_cache_key(email), mirrored_user_id
+                )
+                return mirrored_user_id
+
         payload = {}
         headers = {
             "content-type": "application/json",
-            "authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "GET",
-            f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/users-by-email?email={email}",
+            settings.auth0_url(f"/api/v2/users-by-email?email={email}"),
             headers=headers,
             data=payload,
         )
@@ -99,10 +438,18 @@ class UserManager:
         try:
             user_id = received_payload[0]["identities"][0]["user_id"]
         except IndexError as exc:
+            await self.user_id_cache.set(
+                _user_id_cache_key(email),
+                USER_NOT_FOUND,
+                ttl=settings.user_id_not_found_cache_ttl,
+            )
             raise HTTPException(
                 status_code=404,
                 detail=f"User not found and system raise IndexError = {exc}",
             )
+
+        await self.user_id_cache.set(_user_id_cache_key(email), str(user_id))
+
         return str(user_id)
 
     async def send_email_with_password_change(self, email: str):
@@ -115,12 +462,11 @@ class UserManager:
         payload = json.dumps(payload)
         headers = {
             "content-type": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "POST",
-            f"https://{settings.tenant_domain}.eu.auth0.com/dbconnections/change_password",
+            settings.auth0_url("/dbconnections/change_password"),
             data=payload,
             headers=headers,
         )
@@ -129,22 +475,25 @@ class UserManager:
 
     async def delete_user(self, email: str):
 
-        user_id = await user_manager_obj.get_user_id_by_email(email=email)
+        user_id = await self.get_user_id_by_email(email=email)
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/users/auth0|{user_id}"
+        url = settings.auth0_url(f"/api/v2/users/auth0|{user_id}")
 
         payload = {}
-        headers = {"Authorization": f"Bearer {settings.management_api_token}"}
+        headers = {}
 
         response = await make_request_with_error_handling(
             "DELETE", url, headers=headers, data=payload
         )
 
+        await self.user_id_cache.delete(_user_id_cache_key(email))
+        await mirror_synchronizer_obj.forget_user(f"auth0|{user_id}")
+
         return response.get("body")
 
     async def modify_user(self, **kwargs):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/users/auth0|{kwargs.get('user_id')}"
+        url = settings.auth0_url(f"/api/v2/users/auth0|{kwargs.get('user_id')}")
 
         payload = {
             "given_name": kwargs.get("given_name", None),
@@ -163,13 +512,18 @@ class UserManager:
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "PATCH", url, headers=headers, data=payload
         )
 
+        user_id = str(kwargs.get("user_id"))
+        await self.user_id_cache.delete_matching(
+            lambda key, cached: cached == user_id, prefix=(settings.tenant_name,)
+        )
+        await mirror_synchronizer_obj.refresh_user(response.get("body"))
+
         return response.get("body")
 
     async def invite_user_to_organization(
@@ -178,14 +532,14 @@ class UserManager:
         organization_id: str,
     ):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations/{organization_id}/invitations"
+        url = settings.auth0_url(f"/api/v2/organizations/{organization_id}/invitations")
 
         payload = json.dumps(
             {
                 "inviter": {"name": "Brodacz TEAM"},
                 "invitee": {"email": f"{user_email}"},
-                "client_id": f"{settings.client_id}",
-                "connection_id": f"{settings.database_id_connection}",
+                "client_id": f"{settings.tenant().client_id}",
+                "connection_id": f"{settings.tenant().database_id_connection}",
                 "app_metadata": {},
                 "user_metadata": {},
                 "ttl_sec": 0,
@@ -196,7 +550,6 @@ class UserManager:
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
@@ -205,23 +558,196 @@ class UserManager:
 
         return response.get("body")
 
+    async def list_pending_invitation_emails(self, organization_id: str):
+        url = settings.auth0_url(f"/api/v2/organizations/{organization_id}/invitations")
+
+        payload = {}
+        headers = {
+            "Accept": "application/json",
+        }
+
+        emails, page, per_page = set(), 0, 100
+        while True:
+            query = urlencode(
+                {"page": page, "per_page": per_page, "include_totals": "true"}
+            )
+            response = await make_request_with_error_handling(
+                "GET", f"{url}?{query}", headers=headers, data=payload
+            )
+            received_payload = json.loads(response.get("body"))
+
+            invitations = received_payload.get("invitations", [])
+            emails.update(
+                invitation["invitee"]["email"].lower() for invitation in invitations
+            )
+
+            page += 1
+            if not invitations or page * per_page >= received_payload.get("total", 0):
+                return emails
+
+    async def invite_users_to_organization(
+        self, user_emails: list, organization_id: str, concurrency: int = None
+    ):
+        pending_emails = await self.list_pending_invitation_emails(organization_id)
+
+        report, emails_to_invite, seen_emails = [], [], set()
+        for user_email in user_emails:
+            normalized_email = user_email.strip().lower()
+            if normalized_email in seen_emails:
+                report.append({"email": user_email, "status": "duplicate"})
+            elif normalized_email in pending_emails:
+                report.append({"email": user_email, "status": "already_invited"})
+            else:
+                report.append({"email": user_email, "status": "pending"})
+                emails_to_invite.append((len(report) - 1, user_email.strip()))
+            seen_emails.add(normalized_email)
+
+        async def invite(item):
+            return await self.invite_user_to_organization(item[1], organization_id)
+
+        async for index, _, exc in run_with_concurrency(
+            emails_to_invite,
+            invite,
+            concurrency or settings.bulk_invitations_concurrency,
+            priority=PRIORITY_BULK,
+        ):
+            report_index = emails_to_invite[index][0]
+            report[report_index].update(
+                {"status": "invited"} if exc is None else error_result(exc)
+            )
+
+        return report
+
     async def add_roles_to_already_exsisting_user_in_organization(
         self, user_id: str, organization_id: str, roles: list
     ):
 
-        url = f"https://{settings.tenant_domain}.eu.auth0.com/api/v2/organizations/{organization_id}/members/{user_id}/roles"
+        url = settings.auth0_url(
+            f"/api/v2/organizations/{organization_id}/members/{user_id}/roles"
+        )
 
         payload = json.dumps({"roles": roles})
         headers = {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.management_api_token}",
         }
 
         response = await make_request_with_error_handling(
             "POST", url, headers=headers, data=payload
         )
 
+        await organization_manager_obj.invalidate_members(organization_id)
+
+        return response.get("body")
+
+    async def remove_roles_from_user_in_organization(
+        self, user_id: str, organization_id: str, roles: list
+    ):
+
+        url = settings.auth0_url(
+            f"/api/v2/organizations/{organization_id}/members/{user_id}/roles"
+        )
+
+        payload = json.dumps({"roles": roles})
+        headers = {
+            "Content-Type": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "DELETE", url, headers=headers, data=payload
+        )
+
+        await organization_manager_obj.invalidate_members(organization_id)
+
         return response.get("body")
 
+    async def get_roles_of_user_in_organization(
+        self, user_id: str, organization_id: str
+    ):
+
+        url = settings.auth0_url(
+            f"/api/v2/organizations/{organization_id}/members/{user_id}/roles"
+        )
+
+        payload = {}
+        headers = {
+            "Accept": "application/json",
+        }
+
+        response = await make_request_with_error_handling(
+            "GET", url, headers=headers, data=payload
+        )
+
+        return [role["id"] for role in orjson.loads(response.get("body"))]
+
+    async def replace_roles_of_user_in_organization(
+        self, user_id: str, organization_id: str, roles: list
+    ):
+        current_roles = await self.get_roles_of_user_in_organization(
+            user_id, organization_id
+        )
+        roles_to_remove = [role for role in current_roles if role not in roles]
+        roles_to_add = [role for role in roles if role not in current_roles]
+
+        if roles_to_remove:
+            await self.remove_roles_from_user_in_organization(
+                user_id, organization_id, roles_to_remove
+            )
+        if roles_to_add:
+            await self.add_roles_to_already_exsisting_user_in_organization(
+                user_id, organization_id, roles_to_add
+            )
+
+        return {"added": roles_to_add, "removed": roles_to_remove}
+
+    async def modify_roles_in_batch(
+        self,
+        user_ids: list,
+        organization_id: str,
+        roles: list,
+        operation: str = "add",
+        concurrency: int = None,
+    ):
+        """Apply one role change to many members of an organization.
+
+        ``operation`` is ``add``, ``remove`` or ``replace``; the calls run
+        concurrently at bulk priority. Returns one result per user id, in
+        input order; repeated ids are reported as ``duplicate``.
+        """
+        operations = {
+            "add": self.add_roles_to_already_exsisting_user_in_organization,
+            "remove": self.remove_roles_from_user_in_organization,
+            "replace": self.replace_roles_of_user_in_organization,
+        }
+        modify_roles = operations[operation]
+
+        report, users_to_modify, seen_user_ids = [], [], set()
+        for user_id in user_ids:
+            if user_id in seen_user_ids:
+                report.append({"user_id": user_id, "status": "duplicate"})
+            else:
+                report.append({"user_id": user_id, "status": "pending"})
+                users_to_modify.append((len(report) - 1, user_id))
+            seen_user_ids.add(user_id)
+
+        async def modify(item):
+            return await modify_roles(item[1], organization_id, roles)
+
+        async for index, result, exc in run_with_concurrency(
+            users_to_modify,
+            modify,
+            concurrency or settings.bulk_roles_concurrency,
+            priority=PRIORITY_BULK,
+        ):
+            report_index = users_to_modify[index][0]
+            if exc is not None:
+                report[report_index].update(error_result(exc))
+            elif operation == "replace":
+                report[report_index].update({"status": "ok", **result})
+            else:
+                report[report_index].update({"status": "ok"})
+
+        return report
+
 
 user_manager_obj = UserManager()
+register_cache("user_id", user_manager_obj.user_id_cache)
@@ -1,16 +1,119 @@
-from fastapi import FastAPI
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager, suppress
 
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from employees.routers import employees as employees_router
+from employees.routers import metrics as metrics_router
 from employees.routers import organization as organization_router
 from employees.routers import users as users_router
+from database_structure.database import init_db
+from employees.services.auth0_client import auth0_client_obj, tenant_clients_obj
+from employees.services.background import email_queue_obj
+from employees.services.deadline import DeadlineMiddleware
+from employees.services.idempotency import idempotency_manager_obj
+from employees.services.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+)
+from employees.services.mirror import mirror_synchronizer_obj
+from employees.services.profiling import ProfilingMiddleware
+from settings import current_tenant, settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await auth0_client_obj.start()
+    await email_queue_obj.start()
+
+    if mirror_synchronizer_obj.enabled or idempotency_manager_obj.enabled:
+        await init_db()
+
+    background_tasks = []
+    if mirror_synchronizer_obj.enabled:
+        background_tasks.append(
+            asyncio.create_task(mirror_synchronizer_obj.run_forever())
+        )
+    if idempotency_manager_obj.enabled:
+        background_tasks.append(
+            asyncio.create_task(idempotency_manager_obj.run_forever())
+        )
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await email_queue_obj.close(timeout=settings.background_queue_drain_timeout)
+    await tenant_clients_obj.close()
+    await auth0_client_obj.close()
+
+
+app = FastAPI(lifespan=lifespan)
+# Added first so it sits innermost: it sees the tenant-stripped path and its
+# 504s are recorded by the metrics middleware.
+app.add_middleware(DeadlineMiddleware)
+
+TENANT_PATH = re.compile(r"^/tenants/(?P<tenant>[^/]+)(?P<path>/.*)$")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started_at = time.perf_counter()
+    status = 500
+    http_requests_in_flight.inc(method=request.method)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec(method=request.method)
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "<unmatched>")
+        http_request_duration_seconds.observe(
+            time.perf_counter() - started_at, method=request.method, route=route_path
+        )
+        http_requests_total.inc(method=request.method, route=route_path, status=status)
+
+
+@app.middleware("http")
+async def select_tenant(request: Request, call_next):
+    # The tenant comes from a /tenants/{tenant}/... prefix or the tenant
+    # header; without either the default tenant is used.
+    tenant = request.headers.get(settings.tenant_header)
+    match = TENANT_PATH.match(request.scope["path"])
+    if match is not None:
+        tenant = match.group("tenant")
+        request.scope["path"] = match.group("path")
+
+    if tenant is None:
+        return await call_next(request)
+    if not settings.is_known_tenant(tenant):
+        return JSONResponse(status_code=400, content={"detail": "Unknown tenant"})
+
+    token = current_tenant.set(tenant)
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
+
 
-app = FastAPI()
+if settings.profiling_enabled:
+    # Added last so it is outermost and the profile covers the whole stack.
+    app.add_middleware(ProfilingMiddleware)
 
 
 def register_routers():
 
     app.include_router(users_router.router)
     app.include_router(organization_router.router)
+    app.include_router(employees_router.router)
+    app.include_router(metrics_router.router)
 
 
 register_routers()
-#
\ No newline at end of file
@@ -1,8 +1,42 @@
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Literal, Optional
 
-from pydantic import Field
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Name of the tenant the current request is served for; None means the
+# default tenant configured by the top-level settings.
+current_tenant = ContextVar("current_tenant", default=None)
+
+
+def require_management_api_credentials(tenant_settings, name: str):
+    if tenant_settings.management_api_token or (
+        tenant_settings.management_api_client_id
+        and tenant_settings.management_api_client_secret
+    ):
+        return tenant_settings
+    raise ValueError(
+        f"Tenant {name} needs MANAGEMENT_API_TOKEN or both "
+        "MANAGEMENT_API_CLIENT_ID and MANAGEMENT_API_CLIENT_SECRET"
+    )
+
+
+class TenantSettings(BaseModel):
+    domain: str
+    client_id: Optional[str] = None
+    database_id_connection: Optional[str] = None
+    management_api_token: Optional[str] = None
+    management_api_client_id: Optional[str] = None
+    management_api_client_secret: Optional[str] = None
+    management_api_audience: Optional[str] = None
+    rate_limit_requests_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_management_api_credentials(self):
+        return require_management_api_credentials(self, self.domain)
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=Path(__file__).parent / ".env")
@@ -13,10 +47,146 @@ class Settings(BaseSettings):
     postgres_name: str = Field()
     tenant_domain: str = Field()
     database_id_connection: str = Field()
-    management_api_token: str = Field()
+    management_api_token: Optional[str] = Field(default=None)
+    management_api_client_id: Optional[str] = Field(default=None)
+    management_api_client_secret: Optional[str] = Field(default=None)
+    management_api_audience: Optional[str] = Field(default=None)
+    management_api_token_refresh_margin: int = Field(default=300)
     client_id: str = Field()
     organization_identifier: str = Field()
     mail_gun_api_key: str = Field()
+    auth0_connection_limit: int = Field(default=100)
+    auth0_connection_limit_per_host: int = Field(default=20)
+    auth0_dns_cache_ttl: int = Field(default=300)
+    auth0_keepalive_timeout: float = Field(default=30.0)
+    cache_backend: Literal["memory", "shared"] = Field(default="memory")
+    shared_cache_path: str = Field(default="/dev/shm/users_manager_cache.sqlite3")
+    shared_cache_mmap_size: int = Field(default=64 * 1024 * 1024)
+    shared_cache_touch_interval: float = Field(default=10.0)
+    organization_cache_ttl: int = Field(default=300)
+    organization_cache_max_size: int = Field(default=1024)
+    user_id_cache_ttl: int = Field(default=600)
+    user_id_cache_max_size: int = Field(default=10000)
+    user_id_not_found_cache_ttl: int = Field(default=30)
+    organization_members_per_page: int = Field(default=50)
+    organization_members_cache_ttl: int = Field(default=30)
+    organization_members_cache_max_size: int = Field(default=256)
+    organization_members_roles_concurrency: int = Field(default=10)
+    users_per_page: int = Field(default=50)
+    users_fetch_concurrency: int = Field(default=5)
+    users_export_poll_interval: float = Field(default=2.0)
+    users_export_timeout: float = Field(default=600.0)
+    users_export_spool_max_size: int = Field(default=16 * 1024 * 1024)
+    bulk_users_concurrency: int = Field(default=10)
+    bulk_users_max_concurrency: int = Field(default=50)
+    bulk_users_import_threshold: int = Field(default=500)
+    users_import_poll_interval: float = Field(default=5.0)
+    users_import_timeout: float = Field(default=3600.0)
+    bulk_invitations_concurrency: int = Field(default=10)
+    bulk_roles_concurrency: int = Field(default=10)
+    request_timeout: float = Field(default=30.0)
+    request_timeout_max: float = Field(default=120.0)
+    route_timeouts: dict[str, float] = Field(default_factory=dict)
+    deadline_header: str = Field(default="X-Request-Timeout")
+    upstream_request_timeout: float = Field(default=10.0)
+    rate_limit_requests_per_second: float = Field(default=15.0)
+    rate_limit_burst: int = Field(default=30)
+    rate_limit_max_retries: int = Field(default=3)
+    rate_limit_max_wait: float = Field(default=30.0)
+    retry_max_attempts: int = Field(default=3)
+    retry_backoff_base: float = Field(default=0.2)
+    retry_backoff_max: float = Field(default=2.0)
+    circuit_breaker_failure_threshold: int = Field(default=5)
+    circuit_breaker_reset_timeout: float = Field(default=30.0)
+    mirror_enabled: bool = Field(default=False)
+    mirror_sync_interval: int = Field(default=60)
+    mirror_full_sync_interval: int = Field(default=3600)
+    mirror_max_staleness: int = Field(default=300)
+    mirror_freshness_check_interval: int = Field(default=5)
+    mirror_sync_concurrency: int = Field(default=5)
+    idempotency_enabled: bool = Field(default=False)
+    idempotency_key_ttl: int = Field(default=86400)
+    idempotency_lock_timeout: int = Field(default=60)
+    idempotency_wait_timeout: float = Field(default=10.0)
+    idempotency_purge_interval: int = Field(default=3600)
+    employee_ingest_batch_size: int = Field(default=5000)
+    upstream_etag_cache_max_size: int = Field(default=1000)
+    upstream_etag_cache_ttl: int = Field(default=3600)
+    email_queue_max_size: int = Field(default=1000)
+    email_queue_workers: int = Field(default=4)
+    email_queue_max_attempts: int = Field(default=3)
+    background_job_history_size: int = Field(default=10000)
+    background_job_history_ttl: int = Field(default=3600)
+    background_queue_drain_timeout: float = Field(default=10.0)
+    profiling_enabled: bool = Field(default=False)
+    profiling_token: Optional[str] = Field(default=None)
+    profiling_header: str = Field(default="X-Profile")
+    profiling_sample_rate: float = Field(default=0.0)
+    profiling_dir: str = Field(default="/tmp/users_manager_profiles")
+    profiling_max_files: int = Field(default=100)
+    auth0_base_url_template: str = Field(default="https://{tenant}.eu.auth0.com")
+    tenants: dict[str, TenantSettings] = Field(default_factory=dict)
+    tenant_header: str = Field(default="X-Tenant")
+    # TenantSettings built by tenant(), by name; emptied whenever a field
+    # changes so it never outlives the values it was built from.
+    _tenant_settings: dict = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode="after")
+    def check_management_api_credentials(self):
+        return require_management_api_credentials(self, self.tenant_domain)
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_"):
+            self._tenant_settings.clear()
+        super().__setattr__(name, value)
+
+    @property
+    def tenant_name(self):
+        return current_tenant.get() or self.tenant_domain
+
+    def is_known_tenant(self, name: str):
+        return name == self.tenant_domain or name in self.tenants
+
+    def tenant(self, name: str = None):
+        """Settings of tenant ``name``, by default the one of the current request.
+
+        A registered tenant without its own rate limits uses the top-level
+        ones; identifiers and credentials are never shared between tenants.
+        """
+        name = name or self.tenant_name
+        tenant = self._tenant_settings.get(name)
+        if tenant is None:
+            tenant = self._tenant_settings[name] = self._build_tenant(name)
+        return tenant
+
+    def _build_tenant(self, name: str):
+        default = TenantSettings(
+            domain=self.tenant_domain,
+            client_id=self.client_id,
+            database_id_connection=self.database_id_connection,
+            management_api_token=self.management_api_token,
+            management_api_client_id=self.management_api_client_id,
+            management_api_client_secret=self.management_api_client_secret,
+            management_api_audience=self.management_api_audience,
+            rate_limit_requests_per_second=self.rate_limit_requests_per_second,
+            rate_limit_burst=self.rate_limit_burst,
+        )
+        if name == self.tenant_domain and name not in self.tenants:
+            return default
+
+        tenant = self.tenants[name]
+        shared = {
+            field: getattr(default, field)
+            for field in ("rate_limit_requests_per_second", "rate_limit_burst")
+            if getattr(tenant, field) is None
+        }
+        return tenant.model_copy(update=shared)
+
+    def auth0_url(self, path: str, tenant: str = None):
+        base_url = self.auth0_base_url_template.format(
+            tenant=tenant or self.tenant().domain
+        )
+        return f"{base_url}{path}"
 
 
 settings = Settings()
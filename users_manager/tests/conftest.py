@@ -1,6 +1,10 @@
 import pytest
 
 from employees.services import organization as services
+from employees.services.auth0_client import auth0_client_obj
+from employees.services.organization import organization_manager_obj
+from employees.services.users import user_manager_obj
+from employees.services.token_provider import StaticTokenProvider
 
 
 @pytest.fixture
@@ -14,3 +18,17 @@ def mock_request(monkeypatch):
         )
 
     return _mock_request
+
+
+@pytest.fixture(autouse=True)
+def mock_token_provider(monkeypatch):
+    provider = StaticTokenProvider("test-token")
+    monkeypatch.setattr(auth0_client_obj, "token_provider", provider)
+    return provider
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    organization_manager_obj.cache.clear()
+    organization_manager_obj.members_cache.clear()
+    user_manager_obj.user_id_cache.clear()
@@ -0,0 +1,94 @@
+import pytest
+
+from benchmarks.fake_auth0 import FakeAuth0Config
+from benchmarks.run import reset_service_state, run_benchmark
+from employees.services.metrics import registered_caches
+from employees.services.organization import organization_manager_obj
+
+
+@pytest.mark.asyncio
+async def test_benchmark_reports_latency_percentiles():
+    config = FakeAuth0Config(latency_ms=0, latency_jitter_ms=0, users=10)
+
+    report = await run_benchmark(
+        config,
+        concurrency_levels=(2,),
+        requests=4,
+        scenarios=["get_organization", "list_users"],
+    )
+
+    assert [result["scenario"] for result in report["results"]] == [
+        "get_organization",
+        "list_users",
+    ]
+    for result in report["results"]:
+        assert result["statuses"] == {"200": 4}
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["requests_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_queued_emails_are_charged_to_their_own_scenario():
+    config = FakeAuth0Config(latency_ms=20, latency_jitter_ms=0, users=10)
+
+    report = await run_benchmark(
+        config,
+        concurrency_levels=(1,),
+        requests=2,
+        scenarios=["create_users_bulk", "get_organization"],
+    )
+
+    create_users_bulk, get_organization = report["results"]
+    # Ten users per request, each created and sent a password-change email.
+    assert create_users_bulk["upstream_calls"] == 40
+    # One lookup per organization name, none of the emails above.
+    assert get_organization["upstream_calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_every_level_sends_new_invitations():
+    config = FakeAuth0Config(latency_ms=0, latency_jitter_ms=0, users=10)
+
+    report = await run_benchmark(
+        config,
+        concurrency_levels=(1, 2),
+        requests=2,
+        scenarios=["invite_users_batch"],
+    )
+
+    for result in report["results"]:
+        assert result["statuses"] == {"200": 2}
+    invited = [result["upstream_calls"] for result in report["results"]]
+    # Two batches of ten invitations plus one pending-invitations read each.
+    assert invited == [22, 22]
+
+
+@pytest.mark.asyncio
+async def test_added_scenarios_succeed():
+    config = FakeAuth0Config(latency_ms=0, latency_jitter_ms=0, users=30)
+    scenarios = {
+        "delete_user": "204",
+        "delete_organization": "204",
+        "modify_roles_batch": "200",
+        "list_organization_members": "200",
+        "list_organization_members_with_roles": "200",
+        "import_job_status": "200",
+        "export_job_status": "200",
+    }
+
+    report = await run_benchmark(
+        config, concurrency_levels=(1, 2), requests=2, scenarios=list(scenarios)
+    )
+
+    for result in report["results"]:
+        assert result["statuses"] == {scenarios[result["scenario"]]: 2}
+
+
+@pytest.mark.asyncio
+async def test_reset_clears_every_registered_cache():
+    key = ("tenant", "org_1", None, 25, False)
+    await organization_manager_obj.members_cache.set(key, {"members": []})
+
+    reset_service_state(keep_caches=False)
+
+    assert all(len(cache) == 0 for cache in registered_caches.values())
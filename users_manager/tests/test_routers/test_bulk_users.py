@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import users as services
+from employees.services.background import email_queue_obj
+from main import app
+from settings import settings
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        calls.append((method, url))
+        if url.endswith("/jobs/users-imports"):
+            return {"body": json.dumps({"id": "job_1", "status": "pending"})}
+        if url.endswith("/api/v2/users"):
+            email = json.loads(data)["email"]
+            return {"body": json.dumps({"identities": [{"user_id": email}]})}
+        return {"body": ""}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_create_users_in_bulk_from_ndjson(upstream_calls):
+    rows = [
+        {"email": "a@example.com", "name": "A", "family_name": "A", "username": "a"},
+        {"email": "b@example.com", "name": "B"},
+    ]
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/users/bulk",
+            content="\n".join(json.dumps(row) for row in rows),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    results = sorted(
+        (json.loads(line) for line in response.text.splitlines()),
+        key=lambda result: result["row"],
+    )
+
+    assert response.status_code == 201
+    assert results[0] == {
+        "row": 0,
+        "email": "a@example.com",
+        "status": "created",
+        "user_id": "a@example.com",
+    }
+    assert results[1]["status"] == "error"
+    assert results[1]["status_code"] == 422
+
+
+@pytest.mark.asyncio
+async def test_create_users_in_bulk_from_csv_with_import_job(upstream_calls):
+    csv_upload = "email,name,family_name,username\na@example.com,A,A,a\n"
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/users/bulk",
+            params={"use_import_job": "true"},
+            content=csv_upload,
+            headers={"Content-Type": "text/csv"},
+        )
+
+    assert response.status_code == 201
+    assert response.json() == {"id": "job_1", "status": "pending"}
+    assert upstream_calls[0][1].endswith("/jobs/users-imports")
+    assert "X-Password-Email-Job" in response.headers
+    await email_queue_obj.close(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_import_job_users_get_password_emails_once_it_completes(monkeypatch):
+    job_statuses = iter(["pending", "processing", "completed"])
+    password_emails = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        if url.endswith("/jobs/users-imports"):
+            return {"body": json.dumps({"id": "job_1", "status": "pending"})}
+        if url.endswith("/jobs/job_1"):
+            return {"body": json.dumps({"id": "job_1", "status": next(job_statuses)})}
+        if url.endswith("/jobs/job_1/errors"):
+            errors = [{"user": {"email": "b@example.com"}, "errors": [{}]}]
+            return {"body": json.dumps(errors).encode()}
+        if url.endswith("/dbconnections/change_password"):
+            password_emails.append(json.loads(data)["email"])
+            return {"body": "We've just sent you an email"}
+        raise AssertionError(url)
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    monkeypatch.setattr(settings, "users_import_poll_interval", 0)
+
+    rows = [
+        {
+            "email": f"{name}@example.com",
+            "name": name,
+            "family_name": name,
+            "username": name,
+        }
+        for name in "abc"
+    ]
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/users/bulk", params={"use_import_job": "true"}, json=rows
+        )
+        assert response.status_code == 201
+        await email_queue_obj.join()
+        job = await ac.get(
+            f"/user/password-email/jobs/{response.headers['X-Password-Email-Job']}"
+        )
+
+    assert job.json()["status"] == "succeeded"
+    # b@example.com was rejected by the import, so it gets no email.
+    assert sorted(password_emails) == ["a@example.com", "c@example.com"]
+    await email_queue_obj.close(timeout=1)
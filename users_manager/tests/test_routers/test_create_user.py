@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import users as services
+from employees.services.background import email_queue_obj
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_create_user_returns_before_password_email_is_sent(monkeypatch):
+    email_sent = asyncio.Event()
+    release_email = asyncio.Event()
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        if url.endswith("/dbconnections/change_password"):
+            await release_email.wait()
+            email_sent.set()
+            return {"body": "We've just sent you an email"}
+        return {"body": json.dumps({"identities": [{"user_id": "1"}]})}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/user",
+            json={
+                "email": "a@example.com",
+                "name": "A",
+                "family_name": "A",
+                "username": "a",
+            },
+        )
+        job_id = response.headers["X-Password-Email-Job"]
+
+        assert response.status_code == 201
+        assert not email_sent.is_set()
+
+        release_email.set()
+        await asyncio.wait_for(email_sent.wait(), 1)
+        await asyncio.sleep(0)
+        job = await ac.get(f"/user/password-email/jobs/{job_id}")
+
+    assert job.status_code == 200
+    assert job.json()["status"] == "succeeded"
+    await email_queue_obj.close(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_create_user_succeeds_when_email_queue_is_full(monkeypatch):
+    upstream_urls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        upstream_urls.append(url)
+        return {"body": json.dumps({"identities": [{"user_id": "1"}]})}
+
+    def _full_queue(function, *args):
+        raise asyncio.QueueFull
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    monkeypatch.setattr(email_queue_obj, "submit", _full_queue)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/user",
+            json={
+                "email": "b@example.com",
+                "name": "B",
+                "family_name": "B",
+                "username": "b",
+            },
+        )
+        job = await ac.get(
+            f"/user/password-email/jobs/{response.headers['X-Password-Email-Job']}"
+        )
+
+    assert response.status_code == 201
+    assert job.json()["status"] == "failed"
+    assert job.json()["error"] == "Email queue is full"
+    assert not any("change_password" in url for url in upstream_urls)
@@ -1,7 +1,10 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient, ASGITransport
 
+from employees.services import organization as services
 from main import app
 
 client = TestClient(app)
@@ -36,3 +39,27 @@ async def test_delete_not_existing_user_from_not_existing_organization():
 
     assert response.status_code == 404
     assert "Not Found" in response.text
+
+
+@pytest.mark.asyncio
+async def test_delete_user_from_organization_deletes_membership(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        calls.append((method, url, json.loads(data)))
+        return {"body": b""}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.request(
+            "DELETE",
+            "/organization/user",
+            json={"user_id": "auth0|1", "organization_id": "org_10"},
+        )
+
+    [(method, url, payload)] = calls
+    assert method == "DELETE"
+    assert url.endswith("/api/v2/organizations/org_10/members")
+    assert payload == {"members": ["auth0|1"]}
@@ -61,3 +61,32 @@ async def test_get_organizations_unauthorized():
 
     assert response.status_code == 401
     assert "Unauthorized" in response.text
+
+
+@pytest.mark.asyncio
+async def test_get_organizations_honors_if_none_match(mock_request):
+    mock_request([{"id": "1", "name": "FirstOrganization"}])
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.request(
+            "GET", "/organizations", json={"tenant_domain": "test-domain"}
+        )
+        second = await ac.request(
+            "GET",
+            "/organizations",
+            json={"tenant_domain": "test-domain"},
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+        stale = await ac.request(
+            "GET",
+            "/organizations",
+            json={"tenant_domain": "test-domain"},
+            headers={"If-None-Match": '"outdated"'},
+        )
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert stale.status_code == 200
+    assert stale.json() == [{"id": "1", "name": "FirstOrganization"}]
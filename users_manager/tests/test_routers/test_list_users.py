@@ -0,0 +1,138 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from benchmarks.fake_auth0 import FakeAuth0, FakeAuth0Config, serve
+from employees.services import users as services
+from employees.services.auth0_client import auth0_client_obj
+from main import app
+from settings import settings
+
+ALL_USERS = [{"user_id": str(number)} for number in range(7)]
+
+
+@pytest.fixture
+def paged_users(monkeypatch):
+    requested_pages = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        query = parse_qs(urlparse(url).query)
+        page, per_page = int(query["page"][0]), int(query["per_page"][0])
+        requested_pages.append(page)
+        users = ALL_USERS[page * per_page : (page + 1) * per_page]
+        if query["include_totals"] == ["false"]:
+            return {"body": json.dumps(users).encode()}
+        return {"body": json.dumps({"users": users, "total": len(ALL_USERS)})}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return requested_pages
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_fetches_every_page(paged_users):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/users", params={"fetch_all": "true", "per_page": 2})
+
+    assert response.status_code == 200
+    assert response.json() == ALL_USERS
+    assert sorted(paged_users) == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_get_users_with_cursor(paged_users):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.get("/users", params={"per_page": 5})
+        second = await ac.get("/users", params={"cursor": first.json()["next_cursor"]})
+
+    assert first.json()["users"] == ALL_USERS[:5]
+    assert second.json()["users"] == ALL_USERS[5:]
+    assert second.json()["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_users_page_is_passed_through(paged_users):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/users", params={"page": 1, "per_page": 2})
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"users": ALL_USERS[2:4], "total": len(ALL_USERS)}
+
+
+@pytest.mark.asyncio
+async def test_get_users_cursor_stops_at_the_page_limit(monkeypatch):
+    async def _mocked_function(method, url, headers=None, data=None):
+        query = parse_qs(urlparse(url).query)
+        page, per_page = int(query["page"][0]), int(query["per_page"][0])
+        users = [{"user_id": str(page * per_page + i)} for i in range(per_page)]
+        return {"body": json.dumps({"users": users, "total": 2500})}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        last = await ac.get(
+            "/users", params={"cursor": services.encode_users_cursor(9, 100)}
+        )
+        past_limit = await ac.get(
+            "/users", params={"cursor": services.encode_users_cursor(10, 100)}
+        )
+
+    assert last.status_code == 200
+    assert last.json()["next_cursor"] is None
+    assert last.json()["truncated"] is True
+    assert past_limit.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_past_the_page_limit_uses_an_export(monkeypatch):
+    fake = FakeAuth0(FakeAuth0Config(latency_ms=0, latency_jitter_ms=0, users=1005))
+    runner, base_url = await serve(fake)
+    monkeypatch.setattr(settings, "auth0_base_url_template", base_url)
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.get(
+                "/users", params={"fetch_all": "true", "per_page": 100}
+            )
+    finally:
+        await auth0_client_obj.close()
+        await runner.cleanup()
+
+    assert response.status_code == 200
+    users = response.json()
+    assert len(users) == 1005
+    assert [user["user_id"] for user in users] == list(fake.users)
+    assert users[0]["identities"][0]["provider"] == "auth0"
+    assert fake.export_jobs
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "page, per_page", [(0, 0), (0, -5), (-1, 10), (0, 101)], ids=str
+)
+async def test_get_users_rejects_cursor_out_of_range(paged_users, page, per_page):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            "/users", params={"cursor": services.encode_users_cursor(page, per_page)}
+        )
+
+    assert response.status_code == 400
+    assert paged_users == []
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_is_streamed_page_by_page(paged_users):
+    chunks = [
+        chunk async for chunk in await services.user_manager_obj.list_all_users(2)
+    ]
+
+    assert chunks[0] == b"["
+    assert chunks[-1] == b"]"
+    assert len(chunks) == 2 + 4
+    assert json.loads(b"".join(chunks)) == ALL_USERS
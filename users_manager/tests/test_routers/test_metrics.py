@@ -0,0 +1,26 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_route_latency_and_status(mock_request):
+    mock_request({"id": "1", "name": "FirstOrganization"})
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.request("GET", "/organization", json={"name": "FirstOrganization"})
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",route="/organization",status="200"}'
+        in response.text
+    )
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/organization"}'
+        in response.text
+    )
+    assert 'cache_misses_total{cache="organization"}' in response.text
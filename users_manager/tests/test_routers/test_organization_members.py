@@ -0,0 +1,64 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import organization as services
+from main import app
+
+MEMBERS = [
+    {"user_id": f"auth0|{number}", "email": f"{number}@x.com"} for number in range(3)
+]
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        calls.append(url)
+        parsed = urlparse(url)
+        if parsed.path.endswith("/roles"):
+            user_id = parsed.path.split("/")[-2]
+            return {"body": json.dumps([{"name": f"role-{user_id}"}])}
+
+        query = parse_qs(parsed.query)
+        start, take = int(query.get("from", ["0"])[0]), int(query["take"][0])
+        page = {"members": MEMBERS[start : start + take]}
+        if start + take < len(MEMBERS):
+            page["next"] = str(start + take)
+        return {"body": json.dumps(page)}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_list_members_pages_with_cursor(upstream_calls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.get("/organization/org_1/members", params={"limit": 2})
+        second = await ac.get(
+            "/organization/org_1/members",
+            params={"limit": 2, "cursor": first.json()["next_cursor"]},
+        )
+
+    assert first.json()["members"] == MEMBERS[:2]
+    assert second.json() == {"members": MEMBERS[2:], "next_cursor": None}
+
+
+@pytest.mark.asyncio
+async def test_list_members_expands_roles_and_is_cached(upstream_calls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            "/organization/org_1/members", params={"expand": "roles"}
+        )
+        await ac.get("/organization/org_1/members", params={"expand": "roles"})
+
+    members = response.json()["members"]
+    assert [member["roles"] for member in members] == [
+        [{"name": f"role-{member['user_id']}"}] for member in MEMBERS
+    ]
+    assert len(upstream_calls) == 1 + len(MEMBERS)
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import users as services
+from main import app
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        user_id = url.split("/members/")[1].split("/")[0]
+        calls.append((method, user_id, json.loads(data)["roles"] if data else None))
+        if user_id == "failing":
+            raise services.HTTPException(status_code=404, detail="Not a member")
+        if method == "GET":
+            return {"body": json.dumps([{"id": "rol_employee"}, {"id": "rol_keep"}])}
+        return {"body": b""}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_add_roles_in_batch(upstream_calls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/user/roles/batch",
+            json={
+                "organization_id": "org_1",
+                "user_ids": ["auth0|1", "failing", "auth0|1", "auth0|2"],
+                "roles": ["rol_manager"],
+            },
+        )
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == [
+        "ok",
+        "error",
+        "duplicate",
+        "ok",
+    ]
+    assert response.json()[1]["status_code"] == 404
+    assert sorted(call[1] for call in upstream_calls) == [
+        "auth0|1",
+        "auth0|2",
+        "failing",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replace_roles_in_batch(upstream_calls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/user/roles/batch",
+            json={
+                "organization_id": "org_1",
+                "user_ids": ["auth0|1"],
+                "roles": ["rol_keep", "rol_manager"],
+                "operation": "replace",
+            },
+        )
+
+    assert response.json() == [
+        {
+            "user_id": "auth0|1",
+            "status": "ok",
+            "added": ["rol_manager"],
+            "removed": ["rol_employee"],
+        }
+    ]
+    assert upstream_calls == [
+        ("GET", "auth0|1", None),
+        ("DELETE", "auth0|1", ["rol_employee"]),
+        ("POST", "auth0|1", ["rol_manager"]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_add_roles_returns_upstream_json(monkeypatch):
+    async def _mocked_function(method, url, headers=None, data=None):
+        return {"body": b'{"ok": true}'}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/user/roles",
+            json={
+                "user_id": "auth0|1",
+                "organization": "org_1",
+                "roles": ["rol_manager"],
+            },
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
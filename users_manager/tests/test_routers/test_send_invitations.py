@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import users as services
+from main import app
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        calls.append((method, url))
+        if method == "GET":
+            invitations = [{"invitee": {"email": "pending@example.com"}}]
+            return {"body": json.dumps({"invitations": invitations, "total": 1})}
+        if "failing" in data:
+            raise services.HTTPException(status_code=409, detail="Conflict")
+        return {"body": json.dumps({"id": "inv_1"})}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_send_invitations(upstream_calls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/user/organization/invitations",
+            json={
+                "organization_id": "org_1",
+                "emails": [
+                    "new@example.com",
+                    "NEW@example.com",
+                    "pending@example.com",
+                    "failing@example.com",
+                ],
+            },
+        )
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"email": "new@example.com", "status": "invited"},
+        {"email": "NEW@example.com", "status": "duplicate"},
+        {"email": "pending@example.com", "status": "already_invited"},
+        {
+            "email": "failing@example.com",
+            "status": "error",
+            "status_code": 409,
+            "detail": "Conflict",
+        },
+    ]
+    assert [method for method, _ in upstream_calls].count("POST") == 2
@@ -0,0 +1,54 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from employees.services.auth0_client import Auth0Client
+from employees.services.token_provider import StaticTokenProvider
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused_between_calls():
+    client = Auth0Client()
+
+    first_session = client.session
+    second_session = client.session
+
+    assert first_session is second_session
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_session_is_closed_on_shutdown():
+    client = Auth0Client()
+    session = await client.start()
+
+    await client.close()
+
+    assert session.closed
+    assert client.session is not session
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_is_revalidated_with_upstream_etag():
+    conditional_headers = []
+
+    async def handler(request):
+        conditional_headers.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.json_response({"id": "1"}, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/api/v2/organizations", handler)
+    client = Auth0Client(token_provider=StaticTokenProvider("token"))
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/api/v2/organizations"))
+        first = await client.request("GET", url)
+        second = await client.request("GET", url)
+
+    await client.close()
+    assert conditional_headers == [None, '"v1"']
+    assert second["status"] == 200
+    assert second["body"] == first["body"] == b'{"id": "1"}'
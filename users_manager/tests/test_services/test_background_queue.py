@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from employees.services.background import BackgroundQueue
+from settings import settings
+
+
+def make_queue(**overrides):
+    options = {
+        "name": "test",
+        "max_size": 10,
+        "workers": 2,
+        "max_attempts": 3,
+        "history_size": 100,
+        "history_ttl": 60,
+    }
+    return BackgroundQueue(**{**options, **overrides})
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_background_and_reports_success():
+    queue = make_queue()
+    sent = []
+
+    async def send(email):
+        sent.append(email)
+
+    job_id = queue.submit(send, "a@example.com")
+    assert queue.status(job_id)["status"] == BackgroundQueue.QUEUED
+
+    await queue.close(timeout=1)
+
+    assert sent == ["a@example.com"]
+    assert queue.status(job_id)["status"] == BackgroundQueue.SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried(monkeypatch):
+    monkeypatch.setattr(settings, "retry_backoff_base", 0.001)
+    queue = make_queue()
+    attempts = []
+
+    async def send():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise HTTPException(status_code=503)
+
+    job_id = queue.submit(send)
+    await queue.close(timeout=1)
+
+    job = queue.status(job_id)
+    assert job["status"] == BackgroundQueue.SUCCEEDED
+    assert job["attempts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried():
+    queue = make_queue()
+
+    async def send():
+        raise HTTPException(status_code=400, detail="Bad email")
+
+    job_id = queue.submit(send)
+    await queue.close(timeout=1)
+
+    job = queue.status(job_id)
+    assert job["status"] == BackgroundQueue.FAILED
+    assert job["attempts"] == 1
+    assert job["error"] == "Bad email"
+
+
+@pytest.mark.asyncio
+async def test_submit_raises_when_queue_is_full():
+    queue = make_queue(max_size=1, workers=1)
+    release = asyncio.Event()
+
+    queue.submit(release.wait)
+    await asyncio.sleep(0)
+    queue.submit(release.wait)
+
+    with pytest.raises(asyncio.QueueFull):
+        queue.submit(release.wait)
+
+    release.set()
+    await queue.close(timeout=1)
+
+
+def test_unknown_job_is_not_found():
+    with pytest.raises(HTTPException) as exc_info:
+        make_queue().status("missing")
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_spawned_job_does_not_hold_a_worker():
+    queue = make_queue(workers=1)
+    release = asyncio.Event()
+    sent = []
+
+    async def wait_then_queue():
+        await release.wait()
+        await queue.put(send, "later@example.com")
+
+    async def send(email):
+        sent.append(email)
+
+    waiting_job = queue.spawn(wait_then_queue)
+    queue.submit(send, "now@example.com")
+    await asyncio.sleep(0.01)
+
+    assert sent == ["now@example.com"]
+    assert queue.status(waiting_job)["status"] == BackgroundQueue.RUNNING
+
+    release.set()
+    await queue.join()
+
+    assert sent == ["now@example.com", "later@example.com"]
+    assert queue.status(waiting_job)["status"] == BackgroundQueue.SUCCEEDED
+    await queue.close(timeout=1)
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from employees.services import auth0_client as services
+from employees.services.coalescing import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_execution():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "1"}
+
+    results = await asyncio.gather(*(single_flight.do("key", fetch) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert results == [{"id": "1"}] * 5
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_error_is_raised_to_every_waiter():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(
+        *(single_flight.do("key", fetch) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_others():
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(single_flight.do("key", fetch))
+    second = asyncio.create_task(single_flight.do("key", fetch))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_shared_call_is_cancelled_when_every_waiter_leaves():
+    single_flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(single_flight.do("key", fetch))
+    await started.wait()
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert "key" not in single_flight
+
+
+@pytest.mark.asyncio
+async def test_only_reads_are_coalesced(monkeypatch):
+    calls = []
+
+    async def request(method, url, headers=None, data=None):
+        calls.append(method)
+        await asyncio.sleep(0.01)
+        return {"status": 200, "headers": {}, "body": "{}"}
+
+    monkeypatch.setattr(services, "_timed_request", request)
+    url = "https://tenant.eu.auth0.com/api/v2/users/1"
+
+    await asyncio.gather(
+        *(services.make_request_with_error_handling("GET", url) for _ in range(3)),
+        *(
+            services.make_request_with_error_handling("PATCH", url, data={"a": 1})
+            for _ in range(2)
+        ),
+    )
+
+    assert calls.count("GET") == 1
+    assert calls.count("PATCH") == 2
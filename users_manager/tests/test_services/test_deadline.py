@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import HTTPException
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import auth0_client as services
+from employees.services import users as user_services
+from employees.services.auth0_client import Auth0Client
+from employees.services.deadline import _route_timeout, request_deadline
+from employees.services.token_provider import StaticTokenProvider
+from main import app
+from settings import settings
+
+
+@pytest.fixture
+def slow_upstream(monkeypatch):
+    cancelled = asyncio.Event()
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(
+        user_services, "make_request_with_error_handling", _mocked_function
+    )
+    return cancelled
+
+
+@pytest.mark.asyncio
+async def test_request_past_header_deadline_gets_504(slow_upstream):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get(
+            "/user/id/a@example.com", headers={"X-Request-Timeout": "0.05"}
+        )
+
+    assert response.status_code == 504
+    assert slow_upstream.is_set()
+
+
+@pytest.mark.asyncio
+async def test_route_timeout_is_applied(slow_upstream, monkeypatch):
+    monkeypatch.setattr(settings, "route_timeouts", {"GET /user/id/{email}": 0.05})
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        started_at = time.perf_counter()
+        response = await ac.get("/user/id/a@example.com")
+
+    assert response.status_code == 504
+    assert time.perf_counter() - started_at < 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_call_gets_remaining_budget(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(5)
+        return web.json_response({})
+
+    upstream = web.Application()
+    upstream.router.add_get("/api/v2/users", handler)
+    client = Auth0Client(token_provider=StaticTokenProvider("token"))
+    monkeypatch.setattr(services, "auth0_client_obj", client)
+
+    async with TestServer(upstream) as server:
+        url = str(server.make_url("/api/v2/users"))
+        token = request_deadline.set(asyncio.get_running_loop().time() + 0.1)
+        started_at = time.perf_counter()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await services.make_request_with_error_handling("GET", url)
+        request_deadline.reset(token)
+
+    await client.close()
+    assert exc_info.value.status_code == 504
+    assert time.perf_counter() - started_at < 1
+    # Our own deadline running out is not held against the upstream.
+    assert client.circuit_breakers.get("GET", url).failures == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_read_is_not_bound_by_the_first_callers_deadline(
+    monkeypatch,
+):
+    async def request(method, url, headers=None, data=None):
+        await asyncio.sleep(0.3)
+        # Raises a 504 if the call still carried the first caller's deadline.
+        services.upstream_timeout()
+        return {"status": 200, "headers": {}, "body": b"{}"}
+
+    monkeypatch.setattr(services, "_timed_request", request)
+    url = "https://tenant.eu.auth0.com/api/v2/users/1"
+
+    async def call_with_budget(budget):
+        request_deadline.set(asyncio.get_running_loop().time() + budget)
+        return await services.make_request_with_error_handling("GET", url)
+
+    impatient = asyncio.ensure_future(call_with_budget(0.1))
+    await asyncio.sleep(0)
+    patient = asyncio.ensure_future(call_with_budget(5))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await impatient
+    assert exc_info.value.status_code == 504
+    assert (await patient)["body"] == b"{}"
+
+
+@pytest.mark.asyncio
+async def test_started_stream_is_not_cut_by_the_deadline(monkeypatch):
+    async def _mocked_function(method, url, headers=None, data=None):
+        await asyncio.sleep(0.05)
+        services.upstream_timeout()
+        email = json.loads(data)["email"] if data else ""
+        return {"body": json.dumps({"identities": [{"user_id": email}]})}
+
+    monkeypatch.setattr(
+        user_services, "make_request_with_error_handling", _mocked_function
+    )
+    rows = [
+        {
+            "email": f"{index}@example.com",
+            "name": "A",
+            "family_name": "A",
+            "username": f"user{index}",
+        }
+        for index in range(10)
+    ]
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/users/bulk?concurrency=2",
+            content="\n".join(json.dumps(row) for row in rows),
+            headers={
+                "Content-Type": "application/x-ndjson",
+                "X-Request-Timeout": "0.1",
+            },
+        )
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 201
+    assert len(results) == 10
+    assert {result["status"] for result in results} == {"created"}
+
+
+def test_listing_users_may_wait_for_an_export(monkeypatch):
+    monkeypatch.setattr(settings, "route_timeouts", {})
+    monkeypatch.setattr(settings, "users_export_timeout", 600)
+    monkeypatch.setattr(settings, "request_timeout", 30)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/users",
+        "root_path": "",
+        "app": app,
+    }
+
+    assert _route_timeout(scope) == 630
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.dialects import postgresql
+
+from employees.services.employees import (
+    employee_manager_obj,
+    encode_employees_cursor,
+)
+from main import app
+
+
+def _compile(query):
+    return str(
+        query.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_search_query_uses_keyset_pagination():
+    query = employee_manager_obj.build_search_query(
+        organization_id=3,
+        role="manager",
+        employment_status="full-time",
+        cursor=encode_employees_cursor(42),
+        limit=20,
+    )
+
+    sql = _compile(query)
+
+    assert "employee.organization_id = 3" in sql
+    assert "employee.role = 'manager'" in sql
+    assert "employee.id > 42" in sql
+    assert "ORDER BY employee.id" in sql
+    assert "LIMIT 21" in sql
+    assert "OFFSET" not in sql
+
+
+def test_search_query_orders_name_prefix_by_the_name_index():
+    query = employee_manager_obj.build_search_query(
+        organization_id=3,
+        name_prefix="An_",
+        born_after=date(1990, 1, 1),
+        cursor=encode_employees_cursor("ann", 42),
+    )
+
+    sql = _compile(query)
+
+    name = 'lower(employee.name) COLLATE "C"'
+    assert f"{name}) LIKE 'an" in sql
+    assert "ESCAPE" in sql
+    assert "employee.birthdate >= '1990-01-01'" in sql
+    assert f"({name}, employee.id) > ('ann', 42)" in sql
+    assert f"ORDER BY {name}, employee.id" in sql
+
+
+def test_search_query_orders_birthdate_range_by_the_birthdate_index():
+    query = employee_manager_obj.build_search_query(
+        organization_id=3,
+        born_before=date(2000, 1, 1),
+        cursor=encode_employees_cursor(date(1991, 2, 3), 42),
+    )
+
+    sql = _compile(query)
+
+    assert "(employee.birthdate, employee.id) > ('1991-02-03', 42)" in sql
+    assert "ORDER BY employee.birthdate, employee.id" in sql
+
+
+def test_search_query_rejects_cursor_of_another_order():
+    with pytest.raises(HTTPException) as exc_info:
+        employee_manager_obj.build_search_query(
+            name_prefix="an", cursor=encode_employees_cursor(42)
+        )
+
+    assert exc_info.value.status_code == 400
+
+
+def test_search_query_rejects_unknown_role():
+    with pytest.raises(HTTPException) as exc_info:
+        employee_manager_obj.build_search_query(role="owner")
+
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_search_employees_rejects_invalid_cursor():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/employees", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
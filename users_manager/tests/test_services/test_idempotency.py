@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy.dialects import postgresql
+
+from database_structure.models import IdempotencyKey
+from employees.services.idempotency import (
+    COMPLETED,
+    IN_PROGRESS,
+    IdempotencyManager,
+)
+from settings import settings
+
+
+def make_request(body=b'{"name": "acme"}', key="key-1"):
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/organization",
+        "query_string": b"",
+        "headers": [(b"idempotency-key", key.encode())],
+    }
+    return Request(scope, receive)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_enabled", True)
+    monkeypatch.setattr(settings, "idempotency_wait_timeout", 1)
+    manager = IdempotencyManager()
+    records = {}
+
+    async def _claim(tenant, key, fingerprint):
+        if key not in records:
+            records[key] = IdempotencyKey(
+                tenant=tenant, key=key, fingerprint=fingerprint, status=IN_PROGRESS
+            )
+            return None
+        return records[key]
+
+    async def _complete(tenant, key, response):
+        record = records[key]
+        record.status = COMPLETED
+        record.response_status = response.status_code
+        record.response_headers = {"content-type": "application/json"}
+        record.response_body = response.body
+
+    async def _release(tenant, key):
+        records.pop(key, None)
+
+    monkeypatch.setattr(manager, "_claim", _claim)
+    monkeypatch.setattr(manager, "_complete", _complete)
+    monkeypatch.setattr(manager, "_release", _release)
+    manager.records = records
+    return manager
+
+
+def test_claim_takes_over_expired_and_abandoned_keys():
+    statement = IdempotencyManager().claim_statement(
+        "tenant", "key-1", "fingerprint", datetime.now(timezone.utc)
+    )
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (tenant, key) DO UPDATE" in sql
+    assert "idempotency_keys.expires_at <=" in sql
+    assert "idempotency_keys.locked_until <=" in sql
+    assert "RETURNING idempotency_keys.key" in sql
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_and_replays(manager):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return Response(content=b'{"id": "org_1"}', status_code=201)
+
+    first, second = await asyncio.gather(
+        manager.execute(make_request(), handler),
+        manager.execute(make_request(), handler),
+    )
+
+    assert len(calls) == 1
+    assert first.body == second.body == b'{"id": "org_1"}'
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_key_reused_for_other_request_is_rejected(manager):
+    async def handler():
+        return Response(content=b"{}", status_code=201)
+
+    await manager.execute(make_request(), handler)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await manager.execute(make_request(body=b'{"name": "other"}'), handler)
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_stored_and_server_errors_released(manager):
+    async def conflict():
+        raise HTTPException(status_code=409, detail="Already exists")
+
+    async def unavailable():
+        raise HTTPException(status_code=503)
+
+    with pytest.raises(HTTPException):
+        await manager.execute(make_request(key="conflict"), conflict)
+    with pytest.raises(HTTPException):
+        await manager.execute(make_request(key="unavailable"), unavailable)
+
+    replay = await manager.execute(make_request(key="conflict"), conflict)
+    assert replay.status_code == 409
+    assert replay.body == b'{"detail":"Already exists"}'
+    assert "unavailable" not in manager.records
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code", [408, 429])
+async def test_transient_client_errors_are_released(manager, status_code):
+    attempts = []
+
+    async def rate_limited():
+        attempts.append(status_code)
+        if len(attempts) == 1:
+            raise HTTPException(status_code=status_code)
+        return Response(content=b"{}", status_code=201)
+
+    with pytest.raises(HTTPException):
+        await manager.execute(make_request(key="transient"), rate_limited)
+
+    retried = await manager.execute(make_request(key="transient"), rate_limited)
+    assert retried.status_code == 201
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_are_not_tracked(manager):
+    async def handler():
+        return Response(content=b"{}", status_code=201)
+
+    request = make_request()
+    request.scope["headers"] = []
+
+    await manager.execute(request, handler)
+
+    assert manager.records == {}
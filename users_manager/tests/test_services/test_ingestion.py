@@ -0,0 +1,54 @@
+from datetime import date
+
+import pytest
+
+from employees.services.ingestion import iter_rows, validate_batch
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_csv_rows_are_parsed_across_chunk_boundaries():
+    chunks = _chunks(
+        b"name,surname,ro", b"le\nAnna,Nowak,manager\nJan,Kow", b"alski,employee"
+    )
+
+    rows = [row async for row in iter_rows(chunks, "text/csv")]
+
+    assert rows == [
+        {"name": "Anna", "surname": "Nowak", "role": "manager"},
+        {"name": "Jan", "surname": "Kowalski", "role": "employee"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_csv_quoted_fields_may_contain_newlines():
+    chunks = _chunks(
+        b'name,surname\r\n"Anna\r\nMaria","No', b'wak, ""Jr""\n"\nJan,Kowalski\n'
+    )
+
+    rows = [row async for row in iter_rows(chunks, "text/csv")]
+
+    assert rows == [
+        {"name": "Anna\nMaria", "surname": 'Nowak, "Jr"\n'},
+        {"name": "Jan", "surname": "Kowalski"},
+    ]
+
+
+def test_validate_batch_rejects_invalid_rows_and_builds_records():
+    rows = [
+        {"name": "Anna", "birthdate": "1990-05-01", "organization_id": "2"},
+        {"name": "Jan", "role": "owner"},
+        {"name": "Ewa", "employment_status": "freelance"},
+        {"name": "Ola", "birthdate": "not-a-date"},
+    ]
+
+    records, errors = validate_batch(rows, first_line=1)
+
+    assert records == [
+        (1, None, "Anna", None, date(1990, 5, 1), "employee", None, 2),
+    ]
+    assert [error["line"] for error in errors] == [2, 3, 4]
@@ -0,0 +1,291 @@
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from database_structure.models import MirrorSyncState
+from employees.services import mirror as mirror_module
+from employees.services import organization as organization_services
+from employees.services import users as user_services
+from employees.services.mirror import MirrorSynchronizer, mirror_synchronizer_obj
+from employees.services.organization import organization_manager_obj
+from employees.services.users import user_manager_obj
+from settings import settings
+
+
+class FakeSession:
+    """Records the statements a mirror transaction executes."""
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def begin(self):
+        return self
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+    async def stream_scalars(self, statement):
+        self.statements.append(statement)
+
+        async def profiles():
+            yield {"user_id": "auth0|1"}
+
+        return profiles()
+
+
+class FakeLockConnection(FakeSession):
+
+    async def scalar(self, statement, parameters=None):
+        return True
+
+    async def execute(self, statement, parameters=None):
+        pass
+
+
+class FakeEngine:
+
+    def connect(self):
+        return FakeLockConnection([])
+
+
+def _compile(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    executed = []
+    monkeypatch.setattr(mirror_module, "SesionLocal", lambda: FakeSession(executed))
+    return executed
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    monkeypatch.setattr(settings, "mirror_enabled", True)
+    monkeypatch.setattr(settings, "mirror_max_staleness", 300)
+    return MirrorSynchronizer()
+
+
+def _export_file(users):
+    lines = "\n".join(json.dumps(user) for user in users)
+    return io.BytesIO(gzip.compress(lines.encode()))
+
+
+def _state(age_in_seconds):
+    synced_at = datetime.now(timezone.utc) - timedelta(seconds=age_in_seconds)
+    return MirrorSyncState(resource="auth0", synced_at=synced_at)
+
+
+@pytest.mark.asyncio
+async def test_mirror_is_fresh_within_staleness_bound(mirror, monkeypatch):
+    async def _load_state():
+        return _state(10)
+
+    monkeypatch.setattr(mirror, "_load_state", _load_state)
+
+    assert await mirror.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_mirror_is_stale_past_staleness_bound(mirror, monkeypatch):
+    async def _load_state():
+        return _state(600)
+
+    monkeypatch.setattr(mirror, "_load_state", _load_state)
+
+    assert not await mirror.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_disabled_mirror_is_never_read(monkeypatch):
+    monkeypatch.setattr(settings, "mirror_enabled", False)
+
+    assert not await MirrorSynchronizer().is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_full_sync_loads_users_from_an_export(mirror, statements, monkeypatch):
+    organization = {"id": "org_1", "name": "salon", "display_name": "Salon"}
+    exported = [
+        {"user_id": f"auth0|{n}", "email": f"U{n}@example.com", "name": f"U{n}"}
+        | {"identities[0].user_id": str(n), "identities[0].provider": "auth0"}
+        for n in range(3)
+    ]
+
+    async def _fetch_organizations():
+        return [organization]
+
+    async def _fetch_memberships(organizations):
+        return {"org_1": ["auth0|0", "auth0|2"]}
+
+    async def _export():
+        return _export_file(exported)
+
+    monkeypatch.setattr(mirror, "fetch_organizations", _fetch_organizations)
+    monkeypatch.setattr(mirror, "fetch_memberships", _fetch_memberships)
+    monkeypatch.setattr(mirror_module.user_exporter_obj, "export", _export)
+
+    await mirror.full_sync()
+
+    sql = [str(_compile(statement)).split("\n")[0] for statement in statements]
+    assert [line.split(" (")[0].split(" WHERE")[0] for line in sql] == [
+        "INSERT INTO organization",
+        "INSERT INTO employee",
+        "DELETE FROM organization",
+        "DELETE FROM employee",
+        "DELETE FROM organization_member",
+        "INSERT INTO organization_member",
+        "INSERT INTO mirror_sync_state",
+    ]
+    users = _compile(statements[1]).params
+    assert [users[f"user_id_m{n}"] for n in range(3)] == [
+        "auth0|0",
+        "auth0|1",
+        "auth0|2",
+    ]
+    assert users["email_m0"] == "u0@example.com"
+    assert users["profile_m0"]["identities"] == [{"user_id": "0", "provider": "auth0"}]
+
+
+@pytest.mark.asyncio
+async def test_memberships_are_replaced_per_organization(mirror, statements):
+    await mirror._replace_memberships(
+        FakeSession(statements), {"org_1": ["auth0|1", "auth0|2"]}
+    )
+
+    delete, insert = (str(_compile(statement)) for statement in statements)
+    assert delete.startswith("DELETE FROM organization_member")
+    assert "organization.auth0_id = %(auth0_id_1)s" in delete
+    assert insert.startswith(
+        "INSERT INTO organization_member (organization_id, employee_id) SELECT"
+    )
+    assert "employee.user_id IN (__[POSTCOMPILE_user_id_1])" in insert
+    assert insert.endswith("ON CONFLICT DO NOTHING")
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_past_the_page_limit_runs_a_full_sync(
+    mirror, monkeypatch
+):
+    full_syncs = []
+
+    async def _load_state():
+        state = _state(10)
+        state.full_synced_at = state.synced_at
+        return state
+
+    async def _get_json(path, query):
+        return {"users": [{"user_id": "auth0|1"}], "total": 5000}
+
+    async def _full_sync():
+        full_syncs.append(True)
+
+    monkeypatch.setattr(mirror_module, "async_engine", FakeEngine())
+    monkeypatch.setattr(mirror, "_load_state", _load_state)
+    monkeypatch.setattr(mirror, "_get_json", _get_json)
+    monkeypatch.setattr(mirror, "full_sync", _full_sync)
+
+    assert await mirror.sync_once()
+    assert full_syncs == [True]
+
+
+@pytest.mark.asyncio
+async def test_modify_user_updates_the_mirrored_row_in_place(statements, monkeypatch):
+    async def _mocked_function(method, url, headers=None, data=None):
+        user = {"user_id": "auth0|abc", "email": "A@example.com", "nickname": "a"}
+        return {"body": json.dumps(user).encode()}
+
+    monkeypatch.setattr(settings, "mirror_enabled", True)
+    monkeypatch.setattr(
+        user_services, "make_request_with_error_handling", _mocked_function
+    )
+
+    await user_manager_obj.modify_user(user_id="abc", nickname="a")
+
+    (statement,) = statements
+    sql = str(_compile(statement))
+    assert sql.startswith("INSERT INTO employee")
+    assert "ON CONFLICT (user_id) DO UPDATE" in sql
+    assert _compile(statement).params["user_id_m0"] == "auth0|abc"
+
+
+@pytest.mark.asyncio
+async def test_modify_organization_updates_the_mirrored_row_in_place(
+    statements, monkeypatch
+):
+    async def _mocked_function(method, url, headers=None, data=None):
+        organization = {"id": "org_1", "name": "salon", "display_name": "New"}
+        return {"body": json.dumps(organization).encode()}
+
+    monkeypatch.setattr(settings, "mirror_enabled", True)
+    monkeypatch.setattr(
+        organization_services, "make_request_with_error_handling", _mocked_function
+    )
+
+    await organization_manager_obj.modify_organization("org_1", display_name="New")
+
+    (statement,) = statements
+    sql = str(_compile(statement))
+    assert sql.startswith("INSERT INTO organization")
+    assert "ON CONFLICT (auth0_id) DO UPDATE" in sql
+
+
+@pytest.mark.asyncio
+async def test_user_id_lookup_falls_back_upstream_when_the_mirror_misses(
+    monkeypatch,
+):
+    upstream_urls = []
+
+    async def _is_fresh():
+        return True
+
+    async def _mirrored_user_id(email):
+        return "mirrored" if email == "known@example.com" else None
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        upstream_urls.append(url)
+        return {"body": json.dumps([{"identities": [{"user_id": "upstream"}]}])}
+
+    monkeypatch.setattr(mirror_synchronizer_obj, "is_fresh", _is_fresh)
+    monkeypatch.setattr(
+        mirror_synchronizer_obj, "get_user_id_by_email", _mirrored_user_id
+    )
+    monkeypatch.setattr(
+        user_services, "make_request_with_error_handling", _mocked_function
+    )
+    user_manager_obj.user_id_cache.clear()
+
+    assert await user_manager_obj.get_user_id_by_email("known@example.com") == (
+        "mirrored"
+    )
+    assert upstream_urls == []
+    assert await user_manager_obj.get_user_id_by_email("new@example.com") == (
+        "upstream"
+    )
+    assert len(upstream_urls) == 1
+    user_manager_obj.user_id_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_mirrored_user_list_is_one_page_of_synced_users(
+    mirror, statements, monkeypatch
+):
+    monkeypatch.setattr(settings, "users_per_page", 50)
+
+    body = await mirror.list_users()
+
+    assert json.loads(body) == [{"user_id": "auth0|1"}]
+    (statement,) = statements
+    sql = str(_compile(statement))
+    assert "employee.profile IS NOT NULL" in sql
+    assert _compile(statement).params["param_1"] == 50
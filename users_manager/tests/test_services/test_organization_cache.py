@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from employees.services import organization as services
+from employees.services.organization import organization_manager_obj
+from settings import settings
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        calls.append((method, url))
+        return {"body": json.dumps({"id": "org_1", "name": "FirstOrganization"})}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_organization_is_served_from_cache(upstream_calls):
+    first = await organization_manager_obj.get_organization_by_name("FirstOrganization")
+    second = await organization_manager_obj.get_organization_by_name(
+        "FirstOrganization"
+    )
+
+    assert first == second
+    assert len(upstream_calls) == 1
+    assert organization_manager_obj.cache.stats()["hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_modify_organization_invalidates_cached_entries(upstream_calls):
+    await organization_manager_obj.get_organization_by_name("FirstOrganization")
+    await organization_manager_obj.get_organizations_list(settings.tenant_domain)
+
+    await organization_manager_obj.modify_organization("org_1", display_name="New")
+    await organization_manager_obj.get_organization_by_name("FirstOrganization")
+    await organization_manager_obj.get_organizations_list(settings.tenant_domain)
+
+    assert [method for method, _ in upstream_calls] == [
+        "GET",
+        "GET",
+        "PATCH",
+        "GET",
+        "GET",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_create_organization_invalidates_list(upstream_calls):
+    await organization_manager_obj.get_organizations_list(settings.tenant_domain)
+    await organization_manager_obj.create_organization("Second", "Second salon")
+    await organization_manager_obj.get_organizations_list(settings.tenant_domain)
+
+    assert [method for method, _ in upstream_calls] == ["GET", "POST", "GET"]
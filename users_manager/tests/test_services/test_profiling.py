@@ -0,0 +1,51 @@
+import pstats
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from employees.services.profiling import ProfilingMiddleware
+from main import app
+from settings import settings
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path, mock_request):
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+    monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_max_files", 2)
+    mock_request({"id": "1", "name": "FirstOrganization"})
+    return ProfilingMiddleware(app)
+
+
+async def get_organization(profiled_app, headers=None):
+    transport = ASGITransport(app=profiled_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await ac.request(
+            "GET", "/organization", json={"name": "FirstOrganization"}, headers=headers
+        )
+
+
+@pytest.mark.asyncio
+async def test_request_with_token_is_profiled(profiled_app, tmp_path):
+    response = await get_organization(profiled_app, {"X-Profile": "secret"})
+
+    assert response.status_code == 200
+    profile = tmp_path / response.headers["X-Profile-File"]
+    assert pstats.Stats(str(profile)).total_calls > 0
+
+
+@pytest.mark.asyncio
+async def test_request_without_token_is_not_profiled(profiled_app, tmp_path):
+    response = await get_organization(profiled_app, {"X-Profile": "wrong"})
+
+    assert "X-Profile-File" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_only_newest_profiles_are_kept(profiled_app, tmp_path):
+    for _ in range(3):
+        await get_organization(profiled_app, {"X-Profile": "secret"})
+
+    assert len(list(tmp_path.glob("*.prof"))) == 2
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from employees.services.auth0_client import Auth0Client
+from employees.services.rate_limiter import (
+    PRIORITY_BULK,
+    PRIORITY_READ,
+    RateLimitScheduler,
+)
+from employees.services.token_provider import StaticTokenProvider
+
+
+@pytest.mark.asyncio
+async def test_waiting_reads_go_before_bulk_calls():
+    rate_limiter = RateLimitScheduler(rate=100, burst=1)
+    released = []
+
+    async def call(name, priority):
+        await rate_limiter.acquire(priority)
+        released.append(name)
+
+    await rate_limiter.acquire(PRIORITY_READ)
+    await asyncio.gather(
+        call("bulk-1", PRIORITY_BULK),
+        call("bulk-2", PRIORITY_BULK),
+        call("read", PRIORITY_READ),
+    )
+
+    assert released == ["read", "bulk-1", "bulk-2"]
+
+
+def test_bucket_follows_rate_limit_headers():
+    rate_limiter = RateLimitScheduler(rate=100, burst=100)
+
+    rate_limiter.update_from_headers(
+        {
+            "X-RateLimit-Limit": "10",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(time.time() + 10),
+        }
+    )
+
+    assert rate_limiter.capacity == 10
+    assert rate_limiter.rate == pytest.approx(1, rel=0.1)
+    assert rate_limiter.stats()["tokens"] < 1
+
+
+@pytest.mark.asyncio
+async def test_too_many_requests_is_waited_out_and_retried():
+    attempts = []
+
+    async def handler(request):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            return web.json_response({}, status=429, headers={"Retry-After": "0.2"})
+        return web.json_response({"id": "1"})
+
+    app = web.Application()
+    app.router.add_get("/api/v2/users", handler)
+
+    async with TestServer(app) as server:
+        client = Auth0Client(
+            token_provider=StaticTokenProvider("token"),
+            rate_limiter=RateLimitScheduler(rate=100, burst=10),
+        )
+        response = await client.request("GET", str(server.make_url("/api/v2/users")))
+        await client.close()
+
+    assert response["status"] == 200
+    assert attempts[1] - attempts[0] >= 0.2
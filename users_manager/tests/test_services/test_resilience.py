@@ -0,0 +1,75 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import HTTPException
+
+from employees.services import auth0_client as services
+from employees.services.auth0_client import Auth0Client
+from employees.services.resilience import CircuitBreaker, template_path
+from employees.services.token_provider import StaticTokenProvider
+from settings import settings
+
+
+@pytest_asyncio.fixture
+async def upstream(monkeypatch):
+    monkeypatch.setattr(settings, "retry_backoff_base", 0.001)
+    statuses = []
+
+    async def handler(request):
+        status = statuses.pop(0) if statuses else 200
+        return web.json_response({"id": "1"}, status=status)
+
+    app = web.Application()
+    app.router.add_route("*", "/api/v2/users/{user_id}", handler)
+
+    client = Auth0Client(token_provider=StaticTokenProvider("token"))
+    monkeypatch.setattr(services, "auth0_client_obj", client)
+
+    async with TestServer(app) as server:
+        yield server, statuses
+
+    await client.close()
+
+
+def test_template_path_replaces_identifiers():
+    url = "https://tenant.eu.auth0.com/api/v2/organizations/org_1/members/auth0|2/roles?page=1"
+
+    assert template_path(url) == "/api/v2/organizations/{id}/members/{id}/roles"
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    with pytest.raises(HTTPException) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_idempotent_request_is_retried_after_bad_gateway(upstream):
+    server, statuses = upstream
+    statuses.extend([502, 503])
+
+    response = await services.make_request_with_error_handling(
+        "GET", str(server.make_url("/api/v2/users/1"))
+    )
+
+    assert response["status"] == 200
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_request_is_not_retried(upstream):
+    server, statuses = upstream
+    statuses.append(503)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await services.make_request_with_error_handling(
+            "PATCH", str(server.make_url("/api/v2/users/1"))
+        )
+
+    assert exc_info.value.status_code == 503
@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from employees.services.shared_cache import SharedTTLCache
+
+
+def make_cache(path, **overrides):
+    options = {
+        "namespace": "test",
+        "max_size": 10,
+        "ttl": 60,
+        "mmap_size": 0,
+        "touch_interval": 0,
+    }
+    return SharedTTLCache(path=str(path), **{**options, **overrides})
+
+
+def _set_in_other_process(path):
+    asyncio.run(make_cache(path).set(("name", "tenant", "acme"), b'{"id": "org_1"}'))
+
+
+@pytest.mark.asyncio
+async def test_values_round_trip(tmp_path):
+    cache = make_cache(tmp_path / "cache.sqlite3")
+
+    await cache.set(("name", "tenant", "acme"), b'{"id": "org_1"}')
+    await cache.set("a@example.com", "auth0|1")
+    await cache.set(("tenant", "org_1", None, 50, True), {"members": [], "next": None})
+
+    assert cache.get(("name", "tenant", "acme")) == b'{"id": "org_1"}'
+    assert cache.get("a@example.com") == "auth0|1"
+    assert cache.get(("tenant", "org_1", None, 50, True)) == {
+        "members": [],
+        "next": None,
+    }
+    assert cache.get("missing", "default") == "default"
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire(tmp_path):
+    cache = make_cache(tmp_path / "cache.sqlite3")
+
+    await cache.set("key", "value", ttl=-1)
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = make_cache(tmp_path / "cache.sqlite3", max_size=2)
+
+    await cache.set("first", 1)
+    await cache.set("second", 2)
+    cache.get("first")
+    await cache.set("third", 3)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+
+
+@pytest.mark.asyncio
+async def test_hits_only_write_recency_after_touch_interval(tmp_path):
+    cache = make_cache(tmp_path / "cache.sqlite3", touch_interval=60)
+    await cache.set("key", "value")
+    statements = []
+    cache.connection.set_trace_callback(statements.append)
+
+    assert cache.get("key") == "value"
+    assert not any(statement.startswith("UPDATE") for statement in statements)
+
+
+@pytest.mark.asyncio
+async def test_hit_does_not_wait_for_another_writer(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = make_cache(path)
+    await cache.set("key", "value")
+    writer = make_cache(path)
+    writer.connection.execute("BEGIN IMMEDIATE")
+
+    try:
+        started = time.monotonic()
+        assert cache.get("key") == "value"
+        assert time.monotonic() - started < 1
+    finally:
+        writer.connection.execute("ROLLBACK")
+
+
+@pytest.mark.asyncio
+async def test_namespaces_are_separate(tmp_path):
+    organizations = make_cache(tmp_path / "cache.sqlite3", namespace="organization")
+    user_ids = make_cache(tmp_path / "cache.sqlite3", namespace="user_id")
+
+    await organizations.set("key", "organization")
+    await user_ids.set("key", "user")
+    user_ids.clear()
+
+    assert organizations.get("key") == "organization"
+    assert user_ids.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_entries_are_shared_and_invalidated_across_processes(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = make_cache(path)
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=_set_in_other_process, args=(path,)
+    )
+    process.start()
+    process.join(10)
+
+    assert cache.get(("name", "tenant", "acme")) == b'{"id": "org_1"}'
+
+    await make_cache(path).delete_matching(lambda key, value: key[2] == "acme")
+
+    assert cache.get(("name", "tenant", "acme")) is None
+
+
+@pytest.mark.asyncio
+async def test_write_waiting_for_another_worker_does_not_block_reads(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = make_cache(path)
+    await cache.set("key", "value")
+    writer = make_cache(path)
+    writer.connection.execute("BEGIN IMMEDIATE")
+
+    try:
+        write = asyncio.ensure_future(cache.set("other", "value"))
+        await asyncio.sleep(0.05)
+
+        started = time.monotonic()
+        assert cache.get("key") == "value"
+        assert time.monotonic() - started < 1
+        assert not write.done()
+    finally:
+        writer.connection.execute("ROLLBACK")
+    await write
+
+    assert cache.get("other") == "value"
+
+
+@pytest.mark.asyncio
+async def test_delete_matching_reads_only_keys_with_the_prefix(tmp_path):
+    cache = make_cache(tmp_path / "cache.sqlite3", max_size=1000)
+    for number in range(600):
+        await cache.set(("tenant", "org_1", number), number)
+    await cache.set(("tenant", "org_10", 0), 0)
+    await cache.set(("other", "org_1", 0), 0)
+    seen = []
+
+    def predicate(key, value):
+        seen.append(key)
+        return True
+
+    await cache.delete_matching(predicate, prefix=("tenant", "org_1"))
+
+    assert len(seen) == 600
+    assert cache.get(("tenant", "org_1", 599)) is None
+    assert cache.get(("tenant", "org_10", 0)) == 0
+    assert cache.get(("other", "org_1", 0)) == 0
@@ -0,0 +1,108 @@
+import pytest
+from pydantic import ValidationError
+from httpx import AsyncClient, ASGITransport
+
+from employees.services import organization as services
+from employees.services.auth0_client import auth0_client_obj, tenant_clients_obj
+from main import app
+from settings import Settings, TenantSettings, settings
+
+
+@pytest.fixture
+def tenants(monkeypatch):
+    registered = {
+        "brand-b": TenantSettings(domain="brand-b-domain", management_api_token="b")
+    }
+    monkeypatch.setattr(settings, "tenants", registered)
+    return registered
+
+
+@pytest.fixture
+def upstream_urls(monkeypatch):
+    urls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        urls.append(url)
+        return {"body": b'{"id": "org_1"}'}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return urls
+
+
+def test_registered_tenant_does_not_inherit_credentials(tenants):
+    tenant = settings.tenant("brand-b")
+
+    assert tenant.management_api_token == "b"
+    assert tenant.management_api_client_id is None
+    assert tenant.rate_limit_burst == settings.rate_limit_burst
+
+
+def test_tenant_settings_are_built_once_per_name(tenants, monkeypatch):
+    tenant = settings.tenant("brand-b")
+
+    assert settings.tenant("brand-b") is tenant
+
+    monkeypatch.setattr(settings, "rate_limit_burst", 7)
+
+    assert settings.tenant("brand-b").rate_limit_burst == 7
+
+
+def test_tenant_without_management_api_credentials_is_rejected():
+    with pytest.raises(ValidationError):
+        TenantSettings(domain="brand-c-domain", management_api_client_id="id")
+
+    with pytest.raises(ValidationError):
+        Settings(
+            _env_file=None,
+            **settings.model_dump(
+                exclude={
+                    "management_api_token",
+                    "management_api_client_id",
+                    "management_api_client_secret",
+                }
+            ),
+        )
+
+
+def test_each_tenant_gets_its_own_client(tenants):
+    client = tenant_clients_obj.get("brand-b")
+
+    assert tenant_clients_obj.get("brand-b") is client
+    assert tenant_clients_obj.get(settings.tenant_domain) is auth0_client_obj
+    assert client.rate_limiter is not auth0_client_obj.rate_limiter
+    assert client.token_provider.token == "b"
+
+
+@pytest.mark.asyncio
+async def test_tenant_is_selected_by_header_or_path(tenants, upstream_urls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        by_header = await ac.request(
+            "GET",
+            "/organization",
+            json={"name": "acme"},
+            headers={"X-Tenant": "brand-b"},
+        )
+        by_path = await ac.request(
+            "GET", "/tenants/brand-b/organization", json={"name": "other"}
+        )
+        default = await ac.request("GET", "/organization", json={"name": "acme"})
+
+    assert by_header.status_code == by_path.status_code == default.status_code == 200
+    assert [url.split("/api/")[0] for url in upstream_urls] == [
+        settings.auth0_url("", "brand-b-domain"),
+        settings.auth0_url("", "brand-b-domain"),
+        settings.auth0_url("", settings.tenant_domain),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unknown_tenant_is_rejected(upstream_urls):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.request(
+            "GET", "/organization", json={"name": "acme"}, headers={"X-Tenant": "x"}
+        )
+
+    assert response.status_code == 400
+    assert upstream_urls == []
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from employees.services.auth0_client import Auth0Client
+from employees.services.token_provider import (
+    ClientCredentialsTokenProvider,
+    build_token_provider,
+)
+from settings import TenantSettings, settings
+
+
+class CountingTokenProvider(ClientCredentialsTokenProvider):
+    def __init__(self, expires_in=3600, refresh_margin=300):
+        super().__init__(
+            client=None,
+            token_url="http://test/oauth/token",
+            client_id="client",
+            client_secret="secret",
+            audience="audience",
+            refresh_margin=refresh_margin,
+        )
+        self.expires_in = expires_in
+        self.fetch_count = 0
+
+    async def _fetch_token(self):
+        self.fetch_count += 1
+        await asyncio.sleep(0.01)
+        return f"token-{self.fetch_count}", self.expires_in
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_token_fetch():
+    provider = CountingTokenProvider()
+
+    tokens = await asyncio.gather(*(provider.get_token() for _ in range(20)))
+
+    assert provider.fetch_count == 1
+    assert set(tokens) == {"token-1"}
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_before_expiry():
+    provider = CountingTokenProvider(expires_in=100, refresh_margin=300)
+
+    assert await provider.get_token() == "token-1"
+    assert await provider.get_token() == "token-1"
+    await asyncio.sleep(0.02)
+
+    assert provider.fetch_count == 2
+    assert await provider.get_token() == "token-2"
+
+
+@pytest.mark.asyncio
+async def test_request_is_retried_once_after_unauthorized():
+    provider = CountingTokenProvider()
+    seen_tokens = []
+
+    async def handler(request):
+        seen_tokens.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer token-1":
+            return web.json_response({"message": "Unauthorized"}, status=401)
+        return web.json_response({"id": "1"})
+
+    app = web.Application()
+    app.router.add_get("/api/v2/organizations", handler)
+
+    async with TestServer(app) as server:
+        client = Auth0Client(token_provider=provider)
+        response = await client.request(
+            "GET", str(server.make_url("/api/v2/organizations"))
+        )
+        await client.close()
+
+    assert response["status"] == 200
+    assert seen_tokens == ["Bearer token-1", "Bearer token-2"]
+
+
+def test_default_audience_follows_the_base_url_template(monkeypatch):
+    monkeypatch.setattr(
+        settings, "auth0_base_url_template", "https://{tenant}.us.auth0.com"
+    )
+    tenant = TenantSettings(
+        domain="brand", management_api_client_id="id", management_api_client_secret="s"
+    )
+
+    provider = build_token_provider(client=None, tenant=tenant)
+
+    assert provider.audience == "https://brand.us.auth0.com/api/v2/"
+    assert provider.token_url == "https://brand.us.auth0.com/oauth/token"
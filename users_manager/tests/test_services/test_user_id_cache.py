@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from employees.services import users as services
+from employees.services.users import user_manager_obj
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    async def _mocked_function(method, url, headers=None, data=None):
+        calls.append((method, url))
+        if "users-by-email" in url and "missing" in url:
+            return {"body": "[]"}
+        return {"body": json.dumps([{"identities": [{"user_id": "123"}]}])}
+
+    monkeypatch.setattr(services, "make_request_with_error_handling", _mocked_function)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_delete_user_uses_cached_user_id(upstream_calls):
+    await user_manager_obj.get_user_id_by_email("john@example.com")
+    await user_manager_obj.delete_user("john@example.com")
+
+    assert [method for method, _ in upstream_calls] == ["GET", "DELETE"]
+    assert upstream_calls[1][1].endswith("/users/auth0|123")
+
+
+@pytest.mark.asyncio
+async def test_delete_user_evicts_cached_user_id(upstream_calls):
+    await user_manager_obj.delete_user("john@example.com")
+    await user_manager_obj.get_user_id_by_email("john@example.com")
+
+    assert [method for method, _ in upstream_calls] == ["GET", "DELETE", "GET"]
+
+
+@pytest.mark.asyncio
+async def test_missing_user_is_cached_as_not_found(upstream_calls):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            await user_manager_obj.get_user_id_by_email("missing@example.com")
+        assert exc_info.value.status_code == 404
+
+    assert len(upstream_calls) == 1